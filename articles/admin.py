@@ -1,5 +1,26 @@
 from django.contrib import admin
+from django.db import connection
 
+from articles import search
 from articles.models import Article
+from blog_rest.admin import ScalableModelAdmin
 
-admin.site.register(Article)
+
+@admin.register(Article)
+class ArticleAdmin(ScalableModelAdmin):
+    list_display = ('title', 'author', 'created_date', 'last_modified_date', 'comment_count')
+    list_select_related = ('author',)
+    list_defer = ('content', 'content_html', 'content_hash')
+    list_filter = ('last_modified_date',)
+    date_hierarchy = 'created_date'
+    # the (created_date, id) index
+    ordering = ('-created_date', '-id')
+    # also used by the article autocomplete of the comment form
+    search_fields = ('title',)
+
+    def get_search_results(self, request, queryset, search_term):
+        """ Searches the full text index rather than scanning the titles with LIKE, where it exists. """
+        ids = search.match_ids(search_term) if connection.vendor == 'sqlite' else None
+        if ids is None:
+            return super().get_search_results(request, queryset, search_term)
+        return queryset.filter(id__in=ids), False
@@ -0,0 +1,114 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.response import Response
+
+from blog_rest.conditional import conditional_response, get_validators, set_validators
+from blog_rest.routers import pinned_to_primary
+
+VERSION_KEY = 'articles:version'
+LIST_VERSION_KEY = 'articles:list:version'
+DETAIL_VERSION_KEY = 'articles:detail:%s:version'
+FEED_VERSION_KEY = 'articles:feed:version'
+SITEMAP_VERSION_KEY = 'articles:sitemap:version'
+SITEMAP_SECTION_VERSION_KEY = 'articles:sitemap:%s:version'
+
+
+def get_version(key):
+    """ Returns the current version stored under `key`, starting a new one if it has been evicted. New versions are
+     seeded from the clock so they never collide with entries written under an earlier, evicted version. """
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def list_cache_key(request, *args, **kwargs):
+    return 'articles:list:%s:%s:%s' % (get_version(VERSION_KEY), get_version(LIST_VERSION_KEY), _hash_uri(request))
+
+
+def detail_cache_key(request, *args, **kwargs):
+    pk = kwargs['pk']
+    return 'articles:detail:%s:%s:%s:%s' % (
+        pk, get_version(VERSION_KEY), get_version(DETAIL_VERSION_KEY % pk), _hash_uri(request)
+    )
+
+
+def _hash_uri(request):
+    # the data of a list page embeds the absolute next/previous links, so the host is part of the key, and the
+    # cached ETag depends on the negotiated format
+    uri = '%s|%s' % (request.build_absolute_uri(), request.accepted_renderer.format)
+    return hashlib.md5(uri.encode('utf-8')).hexdigest()
+
+
+def invalidate_article(pk):
+    """ Drops every cached list page and the cached representations of the article with the given primary key.
+
+     The versions are bumped immediately so the change is visible to the current thread, and again once the
+     surrounding transaction commits, discarding anything a concurrent reader cached from the old rows meanwhile. """
+    def bump():
+        bump_version(LIST_VERSION_KEY)
+        bump_version(DETAIL_VERSION_KEY % pk)
+
+    bump()
+    transaction.on_commit(bump)
+
+
+def invalidate_feeds(pk, section):
+    """ Drops the stored feeds and sitemap index, and the sitemap section holding the article with the given primary
+     key, after its `last_modified_date` changed, at once and again once the surrounding transaction commits, like
+     invalidate_article. The entries of the other articles are kept, see articles.feeds. """
+    def bump():
+        bump_version(FEED_VERSION_KEY)
+        bump_version(SITEMAP_VERSION_KEY)
+        bump_version(SITEMAP_SECTION_VERSION_KEY % section)
+
+    bump()
+    transaction.on_commit(bump)
+
+
+def invalidate_articles():
+    """ Drops every cached article response, for when rows changed behind the back of the models, e.g. after the
+     replicas were refreshed: a response cached while a replica lagged behind a write holds the old rows. """
+    bump_version(VERSION_KEY)
+
+
+def cache_anonymous_read(key_func):
+    """ Decorates a viewset action so that successful responses to anonymous users are stored in the cache under
+     `key_func(request, *args, **kwargs)`, and later anonymous requests for the same key are answered from the cache
+     without running the action. The response validators are cached alongside the data, so conditional requests
+     that hit the cache are answered with 304 Not Modified without touching the database either. Clients that just
+     wrote, whose reads are pinned to the primary database, bypass the cache. """
+    def decorator(action):
+        @wraps(action)
+        def wrapper(self, request, *args, **kwargs):
+            if request.user.is_authenticated or pinned_to_primary():
+                return action(self, request, *args, **kwargs)
+
+            key = key_func(request, *args, **kwargs)
+            cached = cache.get(key)
+            if cached is not None:
+                data, etag, last_modified = cached
+                if etag is None:
+                    return Response(data)
+                response = conditional_response(request, etag, last_modified)
+                return response or set_validators(Response(data), etag, last_modified)
+
+            response = action(self, request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(key, (response.data,) + get_validators(response), settings.ARTICLE_CACHE_TIMEOUT)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,203 @@
+import hashlib
+import time
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max
+from django.http import Http404, HttpResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.feedgenerator import Atom1Feed, Rss201rev2Feed
+from django.utils.http import quote_etag
+from django.utils.xmlutils import SimplerXMLGenerator
+from django.views.decorators.http import require_safe
+
+from articles.cache import FEED_VERSION_KEY, SITEMAP_SECTION_VERSION_KEY, SITEMAP_VERSION_KEY, VERSION_KEY, get_version
+from articles.models import Article
+from blog_rest.conditional import conditional_response, set_validators
+
+# the most URLs a sitemap may list, a section lists the articles whose primary keys fall in one such range
+SITEMAP_SECTION_SIZE = 50000
+SITEMAP_NAMESPACE = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+SITEMAP_CONTENT_TYPE = 'application/xml; charset=utf-8'
+
+FEED_COLUMNS = ('id', 'title', 'content_html', 'created_date', 'last_modified_date', 'author__username')
+
+
+class PrecomputedItemsMixin:
+    """ Feed whose items are rendered one at a time with render_item, so that the XML of an item can be stored and
+    added to later feeds with add_fragment rather than rendered again. """
+    item_element = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fragments = []
+
+    def render_item(self, **kwargs):
+        """ @:return the XML of the item with the arguments of add_item. """
+        self.add_item(**kwargs)
+        item = self.items.pop()
+        stream = StringIO()
+        handler = SimplerXMLGenerator(stream, 'utf-8')
+        handler.startElement(self.item_element, self.item_attributes(item))
+        self.add_item_elements(handler, item)
+        handler.endElement(self.item_element)
+        return stream.getvalue()
+
+    def add_fragment(self, fragment, **kwargs):
+        """ Adds an item rendered by render_item, and its arguments, which give the dates of the feed. """
+        self.add_item(**kwargs)
+        self.fragments.append(fragment)
+
+    def write_items(self, handler):
+        for fragment in self.fragments:
+            # written as is, it is escaped already
+            handler.ignorableWhitespace(fragment)
+
+
+class PrecomputedAtomFeed(PrecomputedItemsMixin, Atom1Feed):
+    item_element = 'entry'
+
+
+class PrecomputedRssFeed(PrecomputedItemsMixin, Rss201rev2Feed):
+    item_element = 'item'
+
+
+FEED_CLASSES = {
+    'atom': PrecomputedAtomFeed,
+    'rss': PrecomputedRssFeed,
+}
+
+
+def get_section(pk):
+    """ @:return the number of the sitemap section listing the article with the given primary key. """
+    return pk // SITEMAP_SECTION_SIZE
+
+
+def _hash_site(request):
+    # the documents hold absolute URLs, so they are stored per scheme and host
+    return hashlib.md5(request.build_absolute_uri('/').encode('utf-8')).hexdigest()
+
+
+def serve_document(request, key, build, content_type):
+    """ Answers the request with the document stored under `key`, building it with `build()` and storing it first if
+     there is none. The document is sent with the validators stored along with it, or a 304 Not Modified when the
+     request's conditional headers match them, so a poll costs a couple of cache reads and no query. """
+    entry = cache.get(key)
+    if entry is None:
+        body = build().encode('utf-8')
+        # a document is only built again after a change, so when it was built is when it last changed
+        entry = (body, quote_etag(hashlib.sha1(body).hexdigest()), int(time.time()))
+        cache.set(key, entry, settings.FEED_CACHE_TIMEOUT)
+
+    body, etag, last_modified = entry
+    response = conditional_response(request, etag, last_modified)
+    if response is None:
+        response = set_validators(HttpResponse(body, content_type=content_type), etag, last_modified)
+    return response
+
+
+def get_item(request, row):
+    """ @:return the add_item arguments of the article in a `.values(*FEED_COLUMNS)` row. """
+    link = request.build_absolute_uri(reverse('article-detail', args=[row['id']]))
+    return {
+        'title': row['title'],
+        'link': link,
+        'unique_id': link,
+        'description': row['content_html'],
+        'author_name': row['author__username'],
+        'pubdate': row['created_date'],
+        'updateddate': row['last_modified_date'],
+    }
+
+
+def build_feed(request, kind):
+    """ Builds the feed of the latest FEED_SIZE articles. The XML of each item is stored under the time its article
+     was last modified, so only the articles that changed since the feed was last built are rendered again. """
+    feed = FEED_CLASSES[kind](
+        title=settings.FEED_TITLE,
+        link=request.build_absolute_uri(reverse('article-list')),
+        description=settings.FEED_DESCRIPTION,
+        feed_url=request.build_absolute_uri(request.path),
+        language=settings.LANGUAGE_CODE,
+    )
+    rows = Article.objects.order_by('-created_date', '-id').values(*FEED_COLUMNS)[:settings.FEED_SIZE]
+    keys = {
+        row['id']: 'articles:feed:item:%s:%s:%s:%s:%s' % (
+            kind, get_version(VERSION_KEY), row['id'], row['last_modified_date'].timestamp(), _hash_site(request)
+        )
+        for row in rows
+    }
+    fragments = cache.get_many(list(keys.values()))
+    rendered = {}
+    for row in rows:
+        item = get_item(request, row)
+        fragment = fragments.get(keys[row['id']])
+        if fragment is None:
+            fragment = rendered[keys[row['id']]] = feed.render_item(**item)
+        feed.add_fragment(fragment, **item)
+    cache.set_many(rendered, settings.FEED_CACHE_TIMEOUT)
+    return feed.writeString('utf-8')
+
+
+def build_sitemap_index(request):
+    """ Builds the sitemap index, listing a section for every range of SITEMAP_SECTION_SIZE primary keys up to the
+     highest in use. """
+    stream = StringIO()
+    handler = SimplerXMLGenerator(stream, 'utf-8')
+    handler.startDocument()
+    handler.startElement('sitemapindex', {'xmlns': SITEMAP_NAMESPACE})
+    highest = Article.objects.aggregate(highest=Max('id'))['highest']
+    for section in range(get_section(highest) + 1 if highest is not None else 0):
+        handler.startElement('sitemap', {})
+        url = reverse('article-sitemap-section', args=[section])
+        handler.addQuickElement('loc', request.build_absolute_uri(url))
+        handler.endElement('sitemap')
+    handler.endElement('sitemapindex')
+    return stream.getvalue()
+
+
+def build_sitemap_section(request, section):
+    """ Builds a section of the sitemap, listing the articles whose primary keys fall in its range. """
+    highest = Article.objects.aggregate(highest=Max('id'))['highest']
+    if highest is None or section > get_section(highest):
+        # not stored, so that made up sections do not fill the cache
+        raise Http404('No such sitemap section.')
+    stream = StringIO()
+    handler = SimplerXMLGenerator(stream, 'utf-8')
+    handler.startDocument()
+    handler.startElement('urlset', {'xmlns': SITEMAP_NAMESPACE})
+    rows = Article.objects.filter(
+        id__gte=section * SITEMAP_SECTION_SIZE, id__lt=(section + 1) * SITEMAP_SECTION_SIZE
+    ).order_by('id').values_list('id', 'last_modified_date')
+    for pk, last_modified_date in rows.iterator():
+        handler.startElement('url', {})
+        handler.addQuickElement('loc', request.build_absolute_uri(reverse('article-detail', args=[pk])))
+        handler.addQuickElement('lastmod', last_modified_date.astimezone(timezone.utc).isoformat(timespec='seconds'))
+        handler.endElement('url')
+    handler.endElement('urlset')
+    return stream.getvalue()
+
+
+@require_safe
+def feed_view(request, kind):
+    """ Serves the Atom or RSS feed of the latest articles. """
+    key = 'articles:feed:%s:%s:%s:%s' % (kind, get_version(VERSION_KEY), get_version(FEED_VERSION_KEY),
+                                         _hash_site(request))
+    return serve_document(request, key, lambda: build_feed(request, kind), FEED_CLASSES[kind].content_type)
+
+
+@require_safe
+def sitemap_index_view(request):
+    key = 'articles:sitemap:%s:%s:%s' % (get_version(VERSION_KEY), get_version(SITEMAP_VERSION_KEY),
+                                         _hash_site(request))
+    return serve_document(request, key, lambda: build_sitemap_index(request), SITEMAP_CONTENT_TYPE)
+
+
+@require_safe
+def sitemap_section_view(request, section):
+    """ Serves a section of the sitemap, which is only built again when one of its articles changed. """
+    key = 'articles:sitemap:%s:%s:%s:%s' % (section, get_version(VERSION_KEY),
+                                            get_version(SITEMAP_SECTION_VERSION_KEY % section), _hash_site(request))
+    return serve_document(request, key, lambda: build_sitemap_section(request, section), SITEMAP_CONTENT_TYPE)
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from articles import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the full text search index of articles from the articles table.'
+
+    def handle(self, *args, **options):
+        search.rebuild_index()
+        self.stdout.write('Rebuilt the article search index.')
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from articles.cache import invalidate_articles
+from articles.models import Article
+
+
+class Command(BaseCommand):
+    help = ('Renders the content of the articles to HTML where it was never rendered, or was rendered from other '
+            'content or by an older version of the renderer, e.g. after migrating or changing articles.rendering.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='articles read and written at a time')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive.')
+
+        rendered = 0
+        last_id = 0
+        while True:
+            articles = list(
+                Article.objects.only('id', 'content', 'content_hash').filter(id__gt=last_id).order_by('id')
+                [:options['batch_size']]
+            )
+            if not articles:
+                break
+            last_id = articles[-1].id
+
+            # the representation of the articles changes, so they count as modified
+            now = timezone.now()
+            stale = [article for article in articles if article.render_content()]
+            for article in stale:
+                article.last_modified_date = now
+            with transaction.atomic():
+                Article.objects.bulk_update(stale, ['content_html', 'content_hash', 'last_modified_date'])
+            rendered += len(stale)
+
+        if rendered:
+            invalidate_articles()
+        self.stdout.write('Rendered %d articles.' % rendered)
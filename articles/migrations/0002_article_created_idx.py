@@ -0,0 +1,17 @@
+# Generated by Django 3.0.7 on 2026-10-18 07:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['-created_date', '-id'], name='article_created_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 3.0.7 on 2026-10-18 07:23
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0002_article_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='comments_modified_date',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='article',
+            name='last_modified_date',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
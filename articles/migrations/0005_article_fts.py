@@ -0,0 +1,31 @@
+from django.db import migrations
+
+
+def create_index(apps, schema_editor):
+    # the triggers keeping the index in sync are created after migrate, see articles.search
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE articles_article_fts USING fts5("
+        "title, content, content='articles_article', content_rowid='id', tokenize='porter unicode61')"
+    )
+    schema_editor.execute("INSERT INTO articles_article_fts (articles_article_fts) VALUES ('rebuild')")
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for trigger in ('insert', 'delete', 'update'):
+        schema_editor.execute('DROP TRIGGER IF EXISTS articles_article_fts_%s' % trigger)
+    schema_editor.execute('DROP TABLE articles_article_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0004_article_comment_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
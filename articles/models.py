@@ -1,13 +1,61 @@
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.utils import timezone
+
+from articles.rendering import content_hash, render_content
+
+
+class ArticleQuerySet(models.QuerySet):
+    def delete(self):
+        # imported here, comments depend on articles
+        from comments.signals import counting_deleted_comments
+
+        # the comments of the articles go with them, there is no count to keep up to date
+        with counting_deleted_comments():
+            return super().delete()
 
 
 class Article(models.Model):
     author = models.ForeignKey(get_user_model(), on_delete=models.SET_NULL, null=True)
     title = models.CharField(max_length=200)
     content = models.TextField(blank=False)
+    # the content rendered to sanitized HTML when saved, and the hash of the content and renderer it was rendered with
+    content_html = models.TextField(blank=True, default='', editable=False)
+    content_hash = models.CharField(max_length=64, blank=True, default='', editable=False)
     created_date = models.DateTimeField(auto_now_add=True)
-    last_modified_date = models.DateTimeField(auto_now=True)
+    last_modified_date = models.DateTimeField(auto_now=True, db_index=True)
+    # when a comment on this article was last added, changed or removed, and how many there are, see comments.signals
+    comments_modified_date = models.DateTimeField(default=timezone.now, db_index=True, editable=False)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = ArticleQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_date', '-id'], name='article_created_idx'),
+        ]
 
     def __str__(self):
         return self.title
+
+    def delete(self, *args, **kwargs):
+        from comments.signals import counting_deleted_comments
+
+        with counting_deleted_comments():
+            return super().delete(*args, **kwargs)
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if self.render_content() and update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {'content_html', 'content_hash'}
+        super().save(*args, **kwargs)
+
+    def render_content(self):
+        """ Renders the content again if it changed since it was last rendered.
+         @:return whether it was rendered. """
+        expected_hash = content_hash(self.content)
+        if self.content_hash == expected_hash:
+            return False
+        self.content_html = render_content(self.content)
+        self.content_hash = expected_hash
+        return True
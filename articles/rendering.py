@@ -0,0 +1,33 @@
+import hashlib
+
+import bleach
+import markdown
+
+# bump whenever the output for a given content changes, so that render_articles renders every article again
+RENDERER_VERSION = 1
+
+MARKDOWN_EXTENSIONS = ['fenced_code', 'tables', 'sane_lists']
+
+ALLOWED_TAGS = [
+    'a', 'abbr', 'b', 'blockquote', 'br', 'code', 'em', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'i', 'img', 'li',
+    'ol', 'p', 'pre', 'strong', 'table', 'tbody', 'td', 'th', 'thead', 'tr', 'ul',
+]
+ALLOWED_ATTRIBUTES = {
+    'a': ['href', 'title'],
+    'abbr': ['title'],
+    'img': ['src', 'alt', 'title'],
+    'td': ['align'],
+    'th': ['align'],
+}
+
+
+def render_content(content):
+    """ Renders the Markdown content of an article to HTML, keeping only the tags, attributes and URL schemes that
+     are safe to embed in a page. """
+    html = markdown.markdown(content, extensions=MARKDOWN_EXTENSIONS)
+    return bleach.clean(html, tags=ALLOWED_TAGS, attributes=ALLOWED_ATTRIBUTES, strip=True)
+
+
+def content_hash(content):
+    """ @:return the hash identifying the rendering of `content` by this version of the renderer. """
+    return hashlib.sha256(('%d:%s' % (RENDERER_VERSION, content)).encode('utf-8')).hexdigest()
@@ -0,0 +1,117 @@
+import html
+import re
+
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'articles_article_fts'
+
+# Titles weigh ten times as much as content when ranking matches.
+RANK = "bm25(10.0, 1.0)"
+
+# The triggers are (re)created after every migrate rather than by a migration alone, because SQLite applies most
+# schema changes to articles_article by rebuilding the table, which drops the triggers attached to it.
+TRIGGERS = (
+    """
+    CREATE TRIGGER IF NOT EXISTS articles_article_fts_insert AFTER INSERT ON articles_article BEGIN
+        INSERT INTO articles_article_fts (rowid, title, content) VALUES (new.id, new.title, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS articles_article_fts_delete AFTER DELETE ON articles_article BEGIN
+        INSERT INTO articles_article_fts (articles_article_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS articles_article_fts_update AFTER UPDATE OF title, content ON articles_article BEGIN
+        INSERT INTO articles_article_fts (articles_article_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+        INSERT INTO articles_article_fts (rowid, title, content) VALUES (new.id, new.title, new.content);
+    END
+    """,
+)
+
+# Control characters mark the highlighted terms, so the text can be escaped before they are turned into tags.
+MARK_START, MARK_END = '\x02', '\x03'
+
+
+def create_triggers(using=DEFAULT_DB_ALIAS):
+    """ Creates the triggers keeping the index in sync with the articles table, if the index exists. """
+    database = connections[using]
+    if FTS_TABLE not in database.introspection.table_names():
+        return
+    with database.cursor() as cursor:
+        for trigger in TRIGGERS:
+            cursor.execute(trigger)
+
+
+def rebuild_index():
+    """ Rebuilds the full text index from the articles table, e.g. after loading data with the triggers missing. """
+    create_triggers()
+    with connection.cursor() as cursor:
+        cursor.execute("INSERT INTO %s (%s) VALUES ('rebuild')" % (FTS_TABLE, FTS_TABLE))
+
+
+def to_match_expression(query):
+    """ Turns free text typed in a search box into an FTS5 query matching every word, the last one as a prefix so
+     results show up while it is being typed. Returns None if the text contains no words. """
+    words = re.findall(r'\w+', query)
+    if not words:
+        return None
+    return ' '.join('"%s"' % word for word in words) + '*'
+
+
+def match_ids(query):
+    """ @:return a subquery of the ids of the articles matching a search box query, to filter querysets with, or None
+     if the query contains no words. """
+    expression = to_match_expression(query)
+    if expression is None:
+        return None
+    return RawSQL('SELECT rowid FROM %s WHERE %s MATCH %%s' % (FTS_TABLE, FTS_TABLE), [expression])
+
+
+def search(query, after=None, limit=20):
+    """ Finds the articles matching a search box query, best match first.
+
+     @:param after the (rank, id) of the last match of the previous page, to continue from.
+     @:return a list of `{'id', 'rank', 'title', 'snippet'}` dicts, with the title and a snippet of the content as
+     HTML in which the matched terms are wrapped in <mark> tags, or None if the query contains no words. """
+    expression = to_match_expression(query)
+    if expression is None:
+        return None
+
+    sql = 'SELECT rowid, rank FROM %s WHERE %s MATCH %%s AND rank MATCH %%s' % (FTS_TABLE, FTS_TABLE)
+    params = [expression, RANK]
+    if after is not None:
+        sql = 'SELECT rowid, rank FROM (%s) WHERE rank > %%s OR (rank = %%s AND rowid > %%s)' % sql
+        params += [after[0], after[0], after[1]]
+
+    with connection.cursor() as cursor:
+        cursor.execute('%s ORDER BY rank, rowid LIMIT %%s' % sql, params + [limit])
+        ranks = cursor.fetchall()
+        if not ranks:
+            return []
+
+        cursor.execute(
+            'SELECT rowid, highlight(%s, 0, %%s, %%s), snippet(%s, 1, %%s, %%s, %%s, 24) FROM %s '
+            'WHERE %s MATCH %%s AND rowid IN (%s)' % (
+                FTS_TABLE, FTS_TABLE, FTS_TABLE, FTS_TABLE, ', '.join(['%s'] * len(ranks))
+            ),
+            [MARK_START, MARK_END, MARK_START, MARK_END, '…', expression] + [rowid for rowid, rank in ranks]
+        )
+        highlights = {rowid: (title, snippet) for rowid, title, snippet in cursor.fetchall()}
+
+    return [
+        {
+            'id': rowid,
+            'rank': rank,
+            'title': mark(highlights[rowid][0]),
+            'snippet': mark(highlights[rowid][1]),
+        }
+        for rowid, rank in ranks
+    ]
+
+
+def mark(text):
+    return html.escape(text).replace(MARK_START, '<mark>').replace(MARK_END, '</mark>')
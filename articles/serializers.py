@@ -1,11 +1,59 @@
+from django.utils.text import Truncator
 from rest_framework import serializers
 
 from articles.models import Article
+from blog_rest.serializers import ValuesSerializer
 
+EXCERPT_LENGTH = 200
 
-class ArticleSerializer(serializers.HyperlinkedModelSerializer):
+
+def excerpt(excerpt_source):
+    return Truncator(excerpt_source).chars(EXCERPT_LENGTH)
+
+
+class SparseFieldsetMixin:
+    """ Serializer mixin taking a `fields` keyword argument that restricts the output to the named fields. """
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class ArticleSerializer(SparseFieldsetMixin, serializers.HyperlinkedModelSerializer):
     author = serializers.ReadOnlyField(source='author.username')
 
     class Meta:
         model = Article
-        fields = ('id', 'title', 'content', 'author', 'created_date', 'last_modified_date')
+        fields = ('id', 'title', 'content', 'content_html', 'author', 'created_date', 'last_modified_date',
+                  'comment_count')
+
+
+class ArticleSummarySerializer(ArticleSerializer):
+    """ Representation of an article in lists, with an excerpt in place of the content. Expects the queryset to be
+     annotated with `excerpt_source`, the start of the content, so the full content is never read. """
+    excerpt = serializers.SerializerMethodField()
+
+    class Meta(ArticleSerializer.Meta):
+        fields = ('id', 'title', 'excerpt', 'author', 'created_date', 'last_modified_date', 'comment_count')
+
+    @staticmethod
+    def get_excerpt(article):
+        return excerpt(article.excerpt_source)
+
+
+class ArticleValuesSerializer(ValuesSerializer):
+    """ ArticleSerializer for `.values()` rows, used to read articles. """
+    serializer_class = ArticleSerializer
+
+
+class ArticleSummaryValuesSerializer(ValuesSerializer):
+    """ ArticleSummarySerializer for `.values()` rows annotated with `excerpt_source`, used to list articles. """
+    serializer_class = ArticleSummarySerializer
+    method_columns = {'excerpt': ('excerpt_source',)}
+
+    @staticmethod
+    def get_excerpt(row):
+        return excerpt(row['excerpt_source'])
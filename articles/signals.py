@@ -0,0 +1,54 @@
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.db.models.signals import post_delete, post_init, post_migrate, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from articles import search
+from articles.cache import invalidate_article, invalidate_feeds
+from articles.feeds import get_section
+from articles.models import Article
+
+
+@receiver(post_save, sender=Article)
+@receiver(post_delete, sender=Article)
+def invalidate_article_cache(sender, instance, **kwargs):
+    invalidate_article(instance.pk)
+    invalidate_feeds(instance.pk, get_section(instance.pk))
+
+
+def touch_author_articles(user):
+    """ Marks the articles of a user modified, and drops their cached responses and feeds, after their username
+     changed or before they are deleted, as the articles are rendered with the username of their author. """
+    article_ids = list(Article.objects.filter(author=user).values_list('pk', flat=True))
+    if not article_ids:
+        return
+    # an update sends no signal, the caches are invalidated below
+    Article.objects.filter(pk__in=article_ids).update(last_modified_date=timezone.now())
+    for pk in article_ids:
+        invalidate_article(pk)
+        invalidate_feeds(pk, get_section(pk))
+
+
+@receiver(post_init, sender=get_user_model())
+def remember_username(sender, instance, **kwargs):
+    instance._loaded_username = instance.__dict__.get('username')
+
+
+@receiver(post_save, sender=get_user_model())
+def author_saved(sender, instance, created, **kwargs):
+    if not created and instance.username != instance._loaded_username:
+        touch_author_articles(instance)
+    instance._loaded_username = instance.username
+
+
+@receiver(pre_delete, sender=get_user_model())
+def author_deleting(sender, instance, **kwargs):
+    # before the author of the articles is set to NULL, which is done with an update
+    touch_author_articles(instance)
+
+
+@receiver(post_migrate)
+def create_search_triggers(sender, using, **kwargs):
+    if sender.name == 'articles' and connections[using].vendor == 'sqlite':
+        search.create_triggers(using)
@@ -1,14 +1,30 @@
+import json
+from io import StringIO
+from unittest import mock
+from urllib.parse import urlencode
+
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models.functions import Substr
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
 from rest_framework.test import APIRequestFactory, force_authenticate
 
+from articles import feeds
+from articles.cache import invalidate_articles
 from articles.models import Article
+from articles.serializers import EXCERPT_LENGTH, ArticleSummaryValuesSerializer, ArticleValuesSerializer
 from articles.views import ArticleViewSet
+from blog_rest.routers import use_primary
+from blog_rest.testing import QueryBudgetMixin, SerializerParityMixin
 
 
-class ArticleTestCase(TestCase):
+class ArticleTestCase(QueryBudgetMixin, SerializerParityMixin, TestCase):
     def setUp(self):
+        cache.clear()
         self.admin_user = get_user_model().objects.create_superuser(username='admin')
         self.normal_user = get_user_model().objects.create(username='normal')
 
@@ -36,7 +52,7 @@ class ArticleTestCase(TestCase):
         # ensure the response is OK when there is no data
         response = self.setup_list_request(user)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 0, 'Response was not of size 0, despite no articles added.')
+        self.assertEqual(len(response.data['results']), 0, 'Response was not of size 0, despite no articles added.')
 
         # create a test article and ensure its in the database
         article = Article.objects.create(title=self.valid_data['title'], content=self.valid_data['content'])
@@ -47,10 +63,11 @@ class ArticleTestCase(TestCase):
         # check if the article in the database can be retrieved
         response = self.setup_list_request(user)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1, 'Response was not of size 1, despite an article in database.')
-        self.assertEqual(response.data[0]['id'], 1)
-        self.assertEqual(response.data[0]['title'], article.title)
-        self.assertEqual(response.data[0]['content'], article.content)
+        self.assertEqual(len(response.data['results']), 1, 'Response was not of size 1, despite an article in database.')
+        self.assertEqual(response.data['results'][0]['id'], 1)
+        self.assertEqual(response.data['results'][0]['title'], article.title)
+        self.assertEqual(response.data['results'][0]['excerpt'], article.content)
+        self.assertNotIn('content', response.data['results'][0])
 
     def test_list_admin(self):
         self.article_list(self.admin_user)
@@ -58,6 +75,89 @@ class ArticleTestCase(TestCase):
     def test_list_non_admin(self):
         self.article_list(self.normal_user)
 
+    @staticmethod
+    def setup_page_request(url):
+        factory = APIRequestFactory()
+        request = factory.get(url, format='json')
+        view = ArticleViewSet.as_view({'get': 'list'})
+        return view(request=request)
+
+    def test_list_pagination(self):
+        """ Checks that the list can be walked forwards and backwards with cursors, newest first, including articles
+         sharing the same created date. """
+        for i in range(5):
+            Article.objects.create(title='article %d' % i, content=self.valid_data['content'])
+        Article.objects.filter(pk__in=[2, 3, 4]).update(created_date=Article.objects.get(pk=3).created_date)
+
+        pages = []
+        response = self.setup_page_request('/articles/?page_size=2')
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            pages.append([article['id'] for article in response.data['results']])
+            if response.data['next'] is None:
+                break
+            response = self.setup_page_request(response.data['next'])
+        self.assertEqual(pages, [[5, 4], [3, 2], [1]])
+
+        response = self.setup_page_request(response.data['previous'])
+        self.assertEqual([article['id'] for article in response.data['results']], [3, 2])
+        response = self.setup_page_request(response.data['previous'])
+        self.assertEqual([article['id'] for article in response.data['results']], [5, 4])
+        self.assertIsNone(response.data['previous'])
+
+    def test_list_queries_do_not_scale(self):
+        """ Checks that listing articles with authors runs the same number of queries however many are listed. """
+        def add_articles(count):
+            for i in range(count):
+                author = get_user_model().objects.create(username='author %d' % Article.objects.count())
+                Article.objects.create(author=author, title=self.valid_data['title'], content=self.valid_data['content'])
+
+        self.assertQueriesDoNotScale(lambda: self.setup_list_request(self.normal_user), add_articles)
+
+    def test_retrieve_query_budget(self):
+        """ Checks that retrieving an article runs its validator query and fetches its author along with it. """
+        article = Article.objects.create(author=self.admin_user, title=self.valid_data['title'],
+                                         content=self.valid_data['content'])
+        response = self.assertQueryBudget(2, self.setup_retrieve_request, self.normal_user, article)
+        self.assertEqual(response.data['author'], self.admin_user.username)
+
+    def test_list_excerpt(self):
+        """ Checks that lists carry a truncated excerpt of long content without reading the content column. """
+        Article.objects.create(title=self.valid_data['title'], content='word ' * 1000)
+        with CaptureQueriesContext(connection) as context:
+            response = self.setup_list_request(self.normal_user)
+
+        excerpt = response.data['results'][0]['excerpt']
+        self.assertEqual(len(excerpt), EXCERPT_LENGTH)
+        self.assertTrue(excerpt.endswith('…'))
+        self.assertNotRegex(context.captured_queries[-1]['sql'], r'(SELECT |, )"articles_article"\."content"')
+
+    def test_sparse_fieldset(self):
+        """ Checks that the fields parameter restricts both the representation and the columns read. """
+        article = Article.objects.create(author=self.admin_user, title=self.valid_data['title'],
+                                         content=self.valid_data['content'])
+        with CaptureQueriesContext(connection) as context:
+            response = self.setup_page_request('/articles/?fields=id,title')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0], {'id': article.id, 'title': article.title})
+        self.assertNotIn('auth_user', context.captured_queries[-1]['sql'])
+        self.assertNotIn('excerpt', context.captured_queries[-1]['sql'])
+
+        factory = APIRequestFactory()
+        request = factory.get('/articles/%d/?fields=content,author' % article.pk, format='json')
+        response = ArticleViewSet.as_view({'get': 'retrieve'})(request=request, pk=article.pk)
+        self.assertEqual(response.data, {'content': article.content, 'author': self.admin_user.username})
+
+    def test_sparse_fieldset_unknown_field(self):
+        """ Checks that asking for a field the representation does not have is rejected. """
+        response = self.setup_page_request('/articles/?fields=id,content')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_list_invalid_cursor(self):
+        """ Checks that a malformed cursor is rejected rather than silently returning the first page. """
+        response = self.setup_page_request('/articles/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
     @staticmethod
     def setup_create_request(user, data):
         factory = APIRequestFactory()
@@ -119,6 +219,382 @@ class ArticleTestCase(TestCase):
         self.assertEqual(response.data['title'], article.title)
         self.assertEqual(response.data['content'], article.content)
 
+    def test_retrieve_invalid_pk(self):
+        """ Check that an article id which is not a number is not found. """
+        self.assertEqual(self.client.get('/articles/abc/').status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_anonymous_reads_are_cached(self):
+        """ Check that repeated anonymous reads are answered without touching the database. """
+        article = Article.objects.create(title=self.valid_data['title'], content=self.valid_data['content'])
+
+        self.setup_list_request(None)
+        response = self.assertQueryBudget(0, self.setup_list_request, None)
+        self.assertEqual(response.data['results'][0]['title'], article.title)
+
+        self.setup_retrieve_request(None, article)
+        response = self.assertQueryBudget(0, self.setup_retrieve_request, None, article)
+        self.assertEqual(response.data['title'], article.title)
+
+    def test_cache_invalidated_by_writes(self):
+        """ Check that updating or deleting an article is visible to the next anonymous read. """
+        article = Article.objects.create(title=self.valid_data['title'], content=self.valid_data['content'])
+        other_article = Article.objects.create(title='other article', content=self.valid_data['content'])
+        self.setup_list_request(None)
+        self.setup_retrieve_request(None, article)
+        self.setup_retrieve_request(None, other_article)
+
+        self.setup_update_request(self.admin_user, article, {'title': 'changed', 'content': 'also changed'})
+        self.assertEqual(self.setup_list_request(None).data['results'][1]['title'], 'changed')
+        self.assertEqual(self.setup_retrieve_request(None, article).data['title'], 'changed')
+        self.assertQueryBudget(0, self.setup_retrieve_request, None, other_article)
+
+        self.setup_delete_request(self.admin_user, article)
+        self.assertEqual(len(self.setup_list_request(None).data['results']), 1)
+        self.assertEqual(self.setup_retrieve_request(None, article).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cache_invalidated_by_author_changes(self):
+        """ Check that renaming or deleting the author of an article is visible to the next anonymous read, and
+         changes its ETag. """
+        article = Article.objects.create(title=self.valid_data['title'], content=self.valid_data['content'],
+                                         author=self.normal_user)
+        other_article = Article.objects.create(title='other article', content=self.valid_data['content'],
+                                               author=self.admin_user)
+        etag = self.setup_retrieve_request(None, article)['ETag']
+        self.setup_retrieve_request(None, other_article)
+        self.setup_list_request(None)
+
+        self.normal_user.save()
+        self.assertQueryBudget(0, self.setup_retrieve_request, None, article)
+        user = get_user_model().objects.get(pk=self.normal_user.pk)
+        user.username = 'renamed'
+        user.save()
+        response = self.setup_retrieve_request(None, article)
+        self.assertEqual(response.data['author'], 'renamed')
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(self.setup_list_request(None).data['results'][1]['author'], 'renamed')
+        self.assertQueryBudget(0, self.setup_retrieve_request, None, other_article)
+
+        etag = response['ETag']
+        user.delete()
+        response = self.setup_retrieve_request(None, article)
+        self.assertNotIn('author', response.data)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_cache_bypassed_after_writes(self):
+        """ Check that clients reading from the primary database after a write do not get cached responses, which
+         may have been read from a replica that has not caught up with the write yet. """
+        article = Article.objects.create(title=self.valid_data['title'], content=self.valid_data['content'])
+        self.setup_retrieve_request(None, article)
+        self.setup_list_request(None)
+
+        with use_primary():
+            for request in (lambda: self.setup_list_request(None), lambda: self.setup_retrieve_request(None, article)):
+                with CaptureQueriesContext(connection) as context:
+                    request()
+                self.assertGreater(len(context), 0)
+        self.assertQueryBudget(0, self.setup_list_request, None)
+
+    def test_cache_invalidated_for_all_articles(self):
+        """ Check that invalidating every article, as done once the replicas are refreshed, drops the cached list
+         and details. """
+        article = Article.objects.create(title=self.valid_data['title'], content=self.valid_data['content'])
+        self.setup_retrieve_request(None, article)
+        self.setup_list_request(None)
+
+        invalidate_articles()
+        for request in (lambda: self.setup_list_request(None), lambda: self.setup_retrieve_request(None, article)):
+            with CaptureQueriesContext(connection) as context:
+                request()
+            self.assertGreater(len(context), 0)
+
+    @staticmethod
+    def setup_conditional_request(user, action, headers, **kwargs):
+        factory = APIRequestFactory()
+        request = factory.get('/articles/', format='json', **headers)
+        force_authenticate(request, user)
+        view = ArticleViewSet.as_view({'get': action})
+        return view(request=request, **kwargs)
+
+    def test_retrieve_conditional(self):
+        """ Check that a retrieve with a matching If-None-Match is answered with 304 from the validator query alone, and
+         that the ETag changes when the article does. """
+        article = Article.objects.create(title=self.valid_data['title'], content=self.valid_data['content'])
+        response = self.setup_retrieve_request(self.normal_user, article)
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+
+        response = self.assertQueryBudget(1, self.setup_conditional_request, self.normal_user, 'retrieve',
+                                          {'HTTP_IF_NONE_MATCH': etag}, pk=article.pk)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+        self.setup_update_request(self.admin_user, article, {'title': 'changed', 'content': 'also changed'})
+        response = self.setup_conditional_request(self.normal_user, 'retrieve', {'HTTP_IF_NONE_MATCH': etag},
+                                                  pk=article.pk)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_list_conditional(self):
+        """ Check that a list with a current If-Modified-Since is answered with 304, and that adding an article
+         changes the ETag. """
+        Article.objects.create(title=self.valid_data['title'], content=self.valid_data['content'])
+        response = self.setup_list_request(self.normal_user)
+        etag = response['ETag']
+
+        response = self.setup_conditional_request(self.normal_user, 'list',
+                                                  {'HTTP_IF_MODIFIED_SINCE': response['Last-Modified']})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Article.objects.create(title='other article', content=self.valid_data['content'])
+        response = self.setup_conditional_request(self.normal_user, 'list', {'HTTP_IF_NONE_MATCH': etag})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_cached_conditional(self):
+        """ Check that an anonymous conditional request hitting the response cache needs no query at all. """
+        article = Article.objects.create(title=self.valid_data['title'], content=self.valid_data['content'])
+        etag = self.setup_retrieve_request(None, article)['ETag']
+
+        response = self.assertQueryBudget(0, self.setup_conditional_request, None, 'retrieve',
+                                          {'HTTP_IF_NONE_MATCH': etag}, pk=article.pk)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_feeds(self):
+        """ Check that the Atom and RSS feeds list the latest articles, and that polling them takes no query and
+         answers a matching If-None-Match with 304. """
+        Article.objects.create(title='first <article>', content='**bold** content', author=self.admin_user)
+        Article.objects.create(title='second article', content=self.valid_data['content'])
+
+        for url, content_type in (('/articles/feed/atom/', 'application/atom+xml'),
+                                  ('/articles/feed/rss/', 'application/rss+xml')):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertTrue(response['Content-Type'].startswith(content_type))
+            content = response.content.decode('utf-8')
+            self.assertLess(content.index('second article'), content.index('first &lt;article&gt;'))
+            self.assertIn('&lt;strong&gt;bold&lt;/strong&gt;', content)
+            self.assertIn('http://testserver/articles/', content)
+
+            response = self.assertQueryBudget(0, self.client.get, url)
+            self.assertEqual(response.content.decode('utf-8'), content)
+            response = self.assertQueryBudget(0, self.client.get, url, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+            response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(self.client.post('/articles/feed/atom/').status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    def test_feeds_rebuilt_incrementally(self):
+        """ Check that changing an article rebuilds the feed, rendering only the item of that article again. """
+        articles = [Article.objects.create(title='article %d' % i, content='some content') for i in range(3)]
+        etag = self.client.get('/articles/feed/atom/')['ETag']
+
+        articles[1].title = 'changed'
+        articles[1].save()
+        with mock.patch.object(feeds.PrecomputedAtomFeed, 'render_item',
+                               autospec=True, side_effect=feeds.PrecomputedAtomFeed.render_item) as render_item:
+            response = self.client.get('/articles/feed/atom/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('changed', response.content.decode('utf-8'))
+        self.assertEqual(render_item.call_count, 1)
+
+        articles[2].delete()
+        self.assertNotIn('article 2', self.client.get('/articles/feed/atom/').content.decode('utf-8'))
+
+    def test_sitemap(self):
+        """ Check that the sitemap index lists a section per range of primary keys, that sections list their
+         articles, and that changing an article only builds its own section again. """
+        self.assertEqual(self.client.get('/articles/sitemap-0.xml').status_code, status.HTTP_404_NOT_FOUND)
+        with mock.patch.object(feeds, 'SITEMAP_SECTION_SIZE', 2):
+            articles = [Article.objects.create(title='article %d' % i, content='some content') for i in range(4)]
+            sections = sorted({feeds.get_section(article.pk) for article in articles})
+
+            content = self.client.get('/articles/sitemap.xml').content.decode('utf-8')
+            for section in range(sections[-1] + 1):
+                self.assertIn('<loc>http://testserver/articles/sitemap-%d.xml</loc>' % section, content)
+            for section in sections:
+                response = self.client.get('/articles/sitemap-%d.xml' % section)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                content = response.content.decode('utf-8')
+                for article in articles:
+                    self.assertEqual('<loc>http://testserver/articles/%d/</loc>' % article.pk in content,
+                                     feeds.get_section(article.pk) == section)
+            self.assertEqual(self.client.get('/articles/sitemap-%d.xml' % (sections[-1] + 1)).status_code,
+                             status.HTTP_404_NOT_FOUND)
+
+            articles[0].save()
+            self.assertQueryBudget(0, self.client.get, '/articles/sitemap-%d.xml' % sections[-1])
+            with CaptureQueriesContext(connection) as context:
+                self.client.get('/articles/sitemap-%d.xml' % sections[0])
+            self.assertGreater(len(context), 0)
+
+    @staticmethod
+    def setup_export_request(user, url):
+        factory = APIRequestFactory()
+        request = factory.get(url)
+        force_authenticate(request, user)
+        view = ArticleViewSet.as_view({'get': 'export'})
+        return view(request=request)
+
+    def test_export(self):
+        """ Check that admins can stream every article as newline delimited JSON, or only those changed since the
+         cursor of a previous export. """
+        for i in range(3):
+            Article.objects.create(title='article %d' % i, content=self.valid_data['content'])
+
+        response = self.setup_export_request(self.admin_user, '/articles/export/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode('utf-8').splitlines()
+        self.assertEqual([json.loads(line)['title'] for line in lines], ['article 0', 'article 1', 'article 2'])
+
+        cursor = response['X-Next-Updated-Since']
+        article = Article.objects.get(title='article 1')
+        article.title = 'changed'
+        article.save()
+        url = '/articles/export/?' + urlencode({'updated_since': cursor})
+        response = self.setup_export_request(self.admin_user, url)
+        lines = b''.join(response.streaming_content).decode('utf-8').splitlines()
+        self.assertEqual([json.loads(line)['title'] for line in lines], ['changed'])
+
+    def test_export_non_admin(self):
+        """ Check that exporting is rejected for users who are not admins, and with a malformed cursor. """
+        response = self.setup_export_request(self.normal_user, '/articles/export/')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        response = self.setup_export_request(self.admin_user, '/articles/export/?updated_since=yesterday')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @staticmethod
+    def setup_search_request(url):
+        factory = APIRequestFactory()
+        request = factory.get(url, format='json')
+        view = ArticleViewSet.as_view({'get': 'search'})
+        return view(request=request)
+
+    def test_search(self):
+        """ Check that search matches words and word prefixes, ranks title matches first and highlights them. """
+        Article.objects.create(title='Unrelated', content='nothing to see here')
+        in_content = Article.objects.create(title='Other', content='some django <b>tips</b>')
+        in_title = Article.objects.create(title='Django tips', content='this is some content')
+
+        response = self.setup_search_request('/articles/search/?q=djan')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([article['id'] for article in response.data['results']], [in_title.id, in_content.id])
+        self.assertEqual(response.data['results'][0]['highlight']['title'], '<mark>Django</mark> tips')
+        self.assertEqual(response.data['results'][1]['highlight']['snippet'],
+                         'some <mark>django</mark> &lt;b&gt;tips&lt;/b&gt;')
+        self.assertNotIn('content', response.data['results'][0])
+
+    def test_search_follows_changes(self):
+        """ Check that the search index follows articles being updated and deleted. """
+        article = Article.objects.create(title='Django tips', content=self.valid_data['content'])
+        self.setup_update_request(self.admin_user, article, {'title': 'Flask tips', 'content': 'also changed'})
+        self.assertEqual(len(self.setup_search_request('/articles/search/?q=django').data['results']), 0)
+        self.assertEqual(len(self.setup_search_request('/articles/search/?q=flask').data['results']), 1)
+
+        self.setup_delete_request(self.admin_user, article)
+        self.assertEqual(len(self.setup_search_request('/articles/search/?q=flask').data['results']), 0)
+
+    def test_search_pagination(self):
+        """ Check that search results can be walked with cursors. """
+        for i in range(5):
+            Article.objects.create(title='Django tip %d' % i, content=self.valid_data['content'])
+
+        ids = []
+        response = self.setup_search_request('/articles/search/?q=django&page_size=2')
+        while True:
+            ids += [article['id'] for article in response.data['results']]
+            if response.data['next'] is None:
+                break
+            response = self.setup_search_request(response.data['next'])
+        self.assertEqual(sorted(ids), [1, 2, 3, 4, 5])
+
+    def test_search_requires_words(self):
+        """ Check that a search without any words is rejected. """
+        response = self.setup_search_request('/articles/search/?q=%20*')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_rebuild_search_index(self):
+        """ Check that the rebuild command indexes articles the index is missing. """
+        Article.objects.create(title='Django tips', content=self.valid_data['content'])
+        with connection.cursor() as cursor:
+            cursor.execute("INSERT INTO articles_article_fts (articles_article_fts) VALUES ('delete-all')")
+        self.assertEqual(len(self.setup_search_request('/articles/search/?q=django').data['results']), 0)
+
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(len(self.setup_search_request('/articles/search/?q=django').data['results']), 1)
+
+    def test_content_rendered_on_save(self):
+        """ Check that the content is rendered to sanitized HTML when saved, and served without rendering it again. """
+        article = Article.objects.create(title=self.valid_data['title'],
+                                         content='**bold** <script>alert(1)</script> [link](javascript:alert(1))')
+        self.assertEqual(article.content_html, '<p><strong>bold</strong> alert(1) <a>link</a></p>')
+
+        with mock.patch('articles.models.render_content') as render_content:
+            response = self.setup_retrieve_request(None, article)
+            render_content.assert_not_called()
+        self.assertEqual(response.data['content_html'], article.content_html)
+
+        self.setup_update_request(self.admin_user, article, {'title': 'changed', 'content': '# changed'})
+        self.assertEqual(self.setup_retrieve_request(None, article).data['content_html'], '<h1>changed</h1>')
+
+    def test_render_articles(self):
+        """ Check that the backfill command renders the articles whose HTML is missing or stale, and only those. """
+        article = Article.objects.create(title=self.valid_data['title'], content='*content*')
+        Article.objects.create(title=self.valid_data['title'], content='other content')
+        Article.objects.filter(pk=article.pk).update(content_html='', content_hash='')
+        self.setup_retrieve_request(None, article)
+
+        stdout = StringIO()
+        call_command('render_articles', '--batch-size=1', stdout=stdout)
+        self.assertIn('Rendered 1 articles.', stdout.getvalue())
+        self.assertEqual(self.setup_retrieve_request(None, article).data['content_html'], '<p><em>content</em></p>')
+
+        stdout = StringIO()
+        call_command('render_articles', stdout=stdout)
+        self.assertIn('Rendered 0 articles.', stdout.getvalue())
+
+    def test_values_serializer_parity(self):
+        """ Check that articles read from `.values()` rows are represented exactly like model instances. """
+        Article.objects.create(author=self.admin_user, title='Ünïcode “title” \u2028', content='**bold** ' * 100)
+        Article.objects.create(title='no author', content='<b>short</b>')
+        queryset = Article.objects.select_related('author').order_by('id')
+
+        self.assertSameRepresentation(ArticleValuesSerializer, queryset)
+        self.assertSameRepresentation(ArticleValuesSerializer, queryset, fields=['title', 'author', 'created_date'])
+        self.assertSameRepresentation(
+            ArticleSummaryValuesSerializer, queryset.annotate(excerpt_source=Substr('content', 1, EXCERPT_LENGTH + 1))
+        )
+
+    def test_browsable_api(self):
+        """ Check that the browsable API still renders reads, with the forms of the model serializer. """
+        article = Article.objects.create(author=self.admin_user, title='test article', content='some content')
+        factory = APIRequestFactory()
+        for action, path, kwargs in (('list', '/articles/', {}), ('retrieve', '/articles/1/', {'pk': article.pk})):
+            request = factory.get(path, HTTP_ACCEPT='text/html')
+            force_authenticate(request, self.admin_user)
+            response = ArticleViewSet.as_view({'get': action, 'put': 'update', 'post': 'create'})(request, **kwargs)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertIn(b'some content' if action == 'retrieve' else b'test article', response.render().content)
+
+    def test_admin_changelist(self):
+        """ Check that the admin lists articles with a fixed number of queries, and searches the full text index. """
+        self.client.force_login(self.admin_user)
+        Article.objects.create(author=self.admin_user, title='kittens and puppies', content='some content')
+        Article.objects.create(author=self.normal_user, title='another article', content='kittens content')
+
+        def add_articles(count):
+            Article.objects.bulk_create([
+                Article(author=self.normal_user, title='article %d' % i, content='some content') for i in range(count)
+            ])
+
+        self.assertQueriesDoNotScale(lambda: self.client.get('/admin/articles/article/'), add_articles)
+        response = self.client.get('/admin/articles/article/', {'q': 'kitten'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertContains(response, 'kittens and puppies')
+        self.assertContains(response, 'another article')
+        self.assertNotContains(response, 'article 0')
+
     @staticmethod
     def setup_update_request(user, article, data):
         factory = APIRequestFactory()
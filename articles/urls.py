@@ -1,12 +1,19 @@
 from django.urls import path, include
 from rest_framework import routers
 
-from articles import views
+from articles import feeds, views
+from comments.views import CommentViewSet
 
 router = routers.DefaultRouter()
 router.register(r'', views.ArticleViewSet)
 
 urlpatterns = [
+    path('feed/atom/', feeds.feed_view, {'kind': 'atom'}, name='article-feed-atom'),
+    path('feed/rss/', feeds.feed_view, {'kind': 'rss'}, name='article-feed-rss'),
+    path('sitemap.xml', feeds.sitemap_index_view, name='article-sitemap'),
+    path('sitemap-<int:section>.xml', feeds.sitemap_section_view, name='article-sitemap-section'),
+    path('<int:article_pk>/comments/', CommentViewSet.as_view({'get': 'list'}), name='article-comments'),
+    path('<int:article_pk>/thread/', CommentViewSet.as_view({'get': 'article_thread'}), name='article-thread'),
     path('', include(router.urls)),
     path('api-auth/', include('rest_framework.urls', namespace='rest_framework'))
 ]
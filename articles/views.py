@@ -1,15 +1,33 @@
+from django.db.models import Count, Max
+from django.db.models.functions import Substr
 from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.permissions import IsAdminUser, AllowAny
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
+from articles import search
+from articles.cache import cache_anonymous_read, detail_cache_key, list_cache_key
 from articles.models import Article
-from articles.serializers import ArticleSerializer
+from articles.serializers import (
+    EXCERPT_LENGTH, ArticleSerializer, ArticleSummarySerializer, ArticleSummaryValuesSerializer, ArticleValuesSerializer
+)
+from blog_rest.conditional import ConditionalGetMixin
+from blog_rest.export import NDJSONRenderer, export_response
+from blog_rest.pagination import KeysetPagination
+from blog_rest.routers import ReplicaReadMixin
 
-SAFE_METHODS = ('list', 'retrieve')
+SAFE_METHODS = ('list', 'retrieve', 'search')
 
+SEARCH_FIELDS = ('id', 'title', 'author', 'created_date', 'last_modified_date', 'comment_count')
 
-class ArticleViewSet(viewsets.ModelViewSet):
-    queryset = Article.objects.order_by('-created_date')
+
+class ArticleViewSet(ReplicaReadMixin, ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = Article.objects.select_related('author').order_by('-created_date', '-id')
     serializer_class = ArticleSerializer
+    # the validators look the article up before get_object, anything but a number must not reach them
+    lookup_value_regex = r'\d+'
 
     def get_permissions(self):
         if self.action in SAFE_METHODS:
@@ -18,6 +36,114 @@ class ArticleViewSet(viewsets.ModelViewSet):
             permission_classes = [IsAdminUser]
         return [permission() for permission in permission_classes]
 
+    def is_read(self):
+        return self.action in SAFE_METHODS and self.request.method in ('GET', 'HEAD')
+
+    def get_serializer_class(self):
+        if self.action == 'list' and self.is_read():
+            return ArticleSummarySerializer
+        return ArticleSerializer
+
+    def get_read_serializer_class(self):
+        """ Returns the counterpart of the serializer class for the `.values()` rows that reads are served from. """
+        if self.action == 'list':
+            return ArticleSummaryValuesSerializer
+        return ArticleValuesSerializer
+
+    def get_serializer(self, *args, **kwargs):
+        if self.is_read():
+            kwargs['fields'] = self.get_fields()
+            kwargs['context'] = self.get_serializer_context()
+            return self.get_read_serializer_class()(*args, **kwargs)
+        return super().get_serializer(*args, **kwargs)
+
+    def get_fields(self):
+        """ Returns the fields to render, those named in the comma separated `fields` query parameter or else all the
+         fields of the serializer. """
+        available = self.get_serializer_class().Meta.fields
+        if 'fields' not in self.request.query_params:
+            return available
+
+        fields = [name for name in self.request.query_params['fields'].split(',') if name]
+        unknown = [name for name in fields if name not in available]
+        if unknown:
+            message = 'Unknown field "%s", expected some of: %s.' % (unknown[0], ', '.join(available))
+            raise ValidationError({'fields': [message]})
+        return fields
+
+    def get_queryset(self):
+        """ Reads return `.values()` rows of the columns behind the fields that will be rendered, and the id and
+         created_date needed for the cursor. """
+        queryset = super().get_queryset()
+        if not self.is_read():
+            return queryset
+
+        fields = self.get_fields()
+        if 'excerpt' in fields:
+            queryset = queryset.annotate(excerpt_source=Substr('content', 1, EXCERPT_LENGTH + 1))
+        columns = self.get_read_serializer_class().get_columns(fields)
+        return queryset.select_related(None).values('id', 'created_date', *columns)
+
+    # the comment count is part of an article's representation, so comment changes count as modifications too
+    def get_list_validators(self):
+        aggregate = Article.objects.aggregate(last_modified=Max('last_modified_date'),
+                                              comments_modified=Max('comments_modified_date'), count=Count('id'))
+        if aggregate['count'] == 0:
+            return [0], None
+        return [aggregate['count']], max(aggregate['last_modified'], aggregate['comments_modified'])
+
+    def get_detail_validators(self):
+        dates = Article.objects.filter(pk=self.kwargs['pk']).values_list('last_modified_date', 'comments_modified_date')
+        dates = dates.first()
+        return ([], max(dates)) if dates is not None else None
+
+    @cache_anonymous_read(list_cache_key)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cache_anonymous_read(detail_cache_key)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @action(detail=False)
+    def search(self, request, *args, **kwargs):
+        """ Lists the articles matching the words of the `q` query parameter, best match first, with the matched terms
+         highlighted in their title and in a snippet of their content. """
+        after = None
+        if 'cursor' in request.query_params:
+            try:
+                rank, article_id = KeysetPagination.parse_cursor(request.query_params['cursor'])[0]
+                after = (float(rank), int(article_id))
+            except (ValueError, TypeError):
+                raise NotFound(KeysetPagination.invalid_cursor_message)
+
+        page_size = self.paginator.get_page_size(request)
+        matches = search.search(request.query_params.get('q', ''), after, page_size + 1)
+        if matches is None:
+            raise ValidationError({'q': ['Enter some words to search for.']})
+
+        next_link = None
+        if len(matches) > page_size:
+            matches = matches[:page_size]
+            cursor = KeysetPagination.encode_cursor((matches[-1]['rank'], matches[-1]['id']), reverse=False)
+            next_link = replace_query_param(request.build_absolute_uri(), 'cursor', cursor)
+
+        articles = Article.objects.filter(id__in=[match['id'] for match in matches])
+        articles = {row['id']: row for row in articles.values(*ArticleValuesSerializer.get_columns(SEARCH_FIELDS))}
+        serializer = ArticleValuesSerializer(fields=SEARCH_FIELDS)
+        results = []
+        for match in matches:
+            if match['id'] in articles:
+                data = serializer.to_representation(articles[match['id']])
+                data['highlight'] = {'title': match['title'], 'snippet': match['snippet']}
+                results.append(data)
+        return Response({'next': next_link, 'results': results})
+
+    @action(detail=False, renderer_classes=[NDJSONRenderer])
+    def export(self, request, *args, **kwargs):
+        """ Streams every article, or those changed since the `updated_since` query parameter, as newline delimited
+         JSON. """
+        return export_response(request, 'articles')
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
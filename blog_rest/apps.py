@@ -0,0 +1,8 @@
+from django.apps import AppConfig
+
+
+class BlogRestConfig(AppConfig):
+    name = 'blog_rest'
+
+    def ready(self):
+        from blog_rest import checks, signals  # noqa: F401
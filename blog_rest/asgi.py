@@ -2,6 +2,8 @@
 ASGI config for blog_rest project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Anonymous reads of the article and comment endpoints are served by the
+handler in blog_rest.handlers.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/3.0/howto/deployment/asgi/
@@ -9,8 +11,8 @@ https://docs.djangoproject.com/en/3.0/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
-
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blog_rest.settings')
 
+from blog_rest.handlers import get_asgi_application  # noqa: E402
+
 application = get_asgi_application()
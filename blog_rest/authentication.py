@@ -0,0 +1,108 @@
+import copy
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core import signing
+from django.utils.crypto import constant_time_compare
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication, get_authorization_header
+
+# DRF imports the authentication classes with its settings, this module must not import its views
+TOKEN_SALT = 'blog_rest.authentication.token'
+
+
+class PrincipalCache:
+    """ In process cache of users by primary key, so that authenticating a request does not read the user table.
+
+    Users are cached with their permissions. Entries live for AUTH_PRINCIPAL_CACHE_TTL seconds, and those of a user
+    are dropped when the user is saved or deleted, the whole cache when groups or permissions are granted, see
+    blog_rest.signals. That only reaches the cache of the process making the change, the TTL bounds how long other
+    processes see the user as it was. Every lookup gets its own copy of the user, so one request cannot change the
+    user of another. """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # primary key -> (expiry, user), oldest first
+        self.users = {}
+
+    def get(self, user_id):
+        """ @:return the user with the primary key, or None if there is none. """
+        now = time.monotonic()
+        entry = self.users.get(user_id)
+        if entry is None or entry[0] < now:
+            user = get_user_model()._default_manager.filter(pk=user_id).first()
+            if user is None:
+                return None
+            # fills the permission caches of the user, which the copies share
+            user.get_all_permissions()
+            entry = (now + settings.AUTH_PRINCIPAL_CACHE_TTL, user)
+            with self.lock:
+                self.users.pop(user_id, None)
+                if len(self.users) >= settings.AUTH_PRINCIPAL_CACHE_SIZE:
+                    del self.users[next(iter(self.users))]
+                self.users[user_id] = entry
+        return copy.copy(entry[1])
+
+    def invalidate(self, user_id):
+        with self.lock:
+            self.users.pop(user_id, None)
+
+    def clear(self):
+        with self.lock:
+            self.users.clear()
+
+
+principals = PrincipalCache()
+
+
+class CachedModelBackend(ModelBackend):
+    """ ModelBackend loading the user of a session from the principal cache. """
+
+    def get_user(self, user_id):
+        user = principals.get(self.get_user_model_pk(user_id))
+        return user if user is not None and self.user_can_authenticate(user) else None
+
+    @staticmethod
+    def get_user_model_pk(user_id):
+        # sessions hold the primary key serialized as a string
+        return get_user_model()._meta.pk.to_python(user_id)
+
+
+def get_token_hash(user):
+    """ Ties tokens to the user's password, so changing it revokes them, like it ends the user's sessions. """
+    return user.get_session_auth_hash()[:16]
+
+
+def make_token(user):
+    """ @:return a signed token for the user, valid for AUTH_TOKEN_MAX_AGE seconds. """
+    return signing.dumps({'u': user.pk, 'h': get_token_hash(user)}, salt=TOKEN_SALT)
+
+
+class SignedTokenAuthentication(BaseAuthentication):
+    """ Stateless token authentication: `Authorization: Bearer <token>`, where the token is signed with SECRET_KEY and
+    carries the user's primary key and the time it was issued, see make_token. Checking it reads neither a session
+    nor, thanks to the principal cache, the user table. """
+    keyword = 'Bearer'
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed('Invalid token header, expected "%s <token>".' % self.keyword)
+
+        try:
+            payload = signing.loads(auth[1].decode('ascii'), salt=TOKEN_SALT, max_age=settings.AUTH_TOKEN_MAX_AGE)
+            user = principals.get(payload['u'])
+            token_hash = payload['h']
+        except (signing.BadSignature, UnicodeError, KeyError, TypeError):
+            raise exceptions.AuthenticationFailed('Invalid or expired token.')
+        if user is None or not user.is_active or not constant_time_compare(token_hash, get_token_hash(user)):
+            raise exceptions.AuthenticationFailed('Invalid or expired token.')
+        return user, None
+
+    def authenticate_header(self, request):
+        return self.keyword
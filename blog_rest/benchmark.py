@@ -0,0 +1,75 @@
+import json
+import platform
+import statistics
+import subprocess
+from datetime import datetime, timezone
+
+import django
+from django.conf import settings
+from rest_framework.settings import api_settings
+
+# the changes between two runs under which a metric counts as unchanged
+NOISE = 0.05
+
+
+def percentile(values, fraction):
+    """ @:return the nearest-rank percentile of sorted values, e.g. fraction 0.95 for the 95th. """
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def summarize(latencies, elapsed, errors=0, queries=None):
+    """ Summarizes the latencies in seconds of the requests of a run that took `elapsed` seconds.
+     @:param queries the number of database queries of each request, if known.
+     @:return a dict of the metrics, in milliseconds, ready to be saved as JSON. """
+    latencies = sorted(latencies)
+    summary = {
+        'requests': len(latencies),
+        'errors': errors,
+        'requests_per_second': round(len(latencies) / elapsed, 1) if elapsed else None,
+        'mean_ms': round(statistics.mean(latencies) * 1000, 3),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'max_ms': round(latencies[-1] * 1000, 3),
+        'queries_per_request': None,
+    }
+    if queries:
+        summary['queries_per_request'] = round(statistics.mean(queries), 2)
+    return summary
+
+
+def describe_environment():
+    """ @:return what a result depends on besides the code: the commit it was run at and the configuration. """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'date': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': settings.DATABASES['default']['ENGINE'],
+        'replicas': len(settings.REPLICA_DATABASES),
+        'renderers': [renderer.__name__ for renderer in api_settings.DEFAULT_RENDERER_CLASSES],
+        'conn_max_age': settings.DATABASES['default'].get('CONN_MAX_AGE', 0),
+    }
+
+
+def save_results(path, results):
+    with open(path, 'w') as output:
+        json.dump(results, output, indent=2)
+        output.write('\n')
+
+
+def load_results(path):
+    with open(path) as results:
+        return json.load(results)
+
+
+def compare(previous, current, metric):
+    """ @:return the relative change of a metric from the previous run, or None if either run lacks it. """
+    if not previous or not current or previous.get(metric) in (None, 0) or current.get(metric) is None:
+        return None
+    return (current[metric] - previous[metric]) / previous[metric]
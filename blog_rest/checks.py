@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Error, register
+from django.utils.module_loading import import_string
+
+
+@register()
+def check_replica_cache(app_configs, **kwargs):
+    """ Checks that the cache is shared between processes when reads are spread over replicas: sync_replicas drops the
+     cached article responses, which may hold the rows of a lagging replica, by bumping their version in the cache,
+     and a cache in the memory of each process would only drop those of the process running the command. """
+    if not settings.REPLICA_DATABASES:
+        return []
+    if not issubclass(import_string(settings.CACHES['default']['BACKEND']), LocMemCache):
+        return []
+    return [Error(
+        'The replica databases need a cache shared between processes, the default cache is in memory.',
+        hint='Set BLOG_CACHE_DIR, or another cache backend shared between processes.',
+        id='blog_rest.E001',
+    )]
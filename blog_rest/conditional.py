@@ -0,0 +1,76 @@
+import hashlib
+from calendar import timegm
+
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+
+def make_etag(request, version):
+    """ Builds a strong ETag for the representation of `version` served at the request's URI in the negotiated
+     format. """
+    renderer = getattr(request, 'accepted_renderer', None)
+    parts = [request.build_absolute_uri(), renderer.format if renderer else ''] + [str(part) for part in version]
+    return quote_etag(hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest())
+
+
+def set_validators(response, etag, last_modified):
+    """ Adds the ETag and, when known, the Last-Modified header to `response`.
+     @:param last_modified a timestamp in seconds since the epoch, or None. """
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def get_validators(response):
+    """ Reads back the (etag, last_modified) pair set on `response` by set_validators. """
+    return response.get('ETag'), parse_http_date_safe(response.get('Last-Modified', ''))
+
+
+def conditional_response(request, etag, last_modified):
+    """ Returns the 304 Not Modified (or 412 Precondition Failed) response to send if the request's conditional
+     headers match the given validators, otherwise None. """
+    validators = set_validators(HttpResponse(), etag, last_modified)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified, response=validators)
+    return None if response is validators else response
+
+
+class ConditionalGetMixin:
+    """ Viewset mixin emitting ETag and Last-Modified validators on list and retrieve, and answering matching
+     If-None-Match / If-Modified-Since requests with 304 Not Modified before the queryset is evaluated or serialized.
+
+     Subclasses implement get_list_validators and get_detail_validators, each returning a `(version, last_modified)`
+     pair from a cheap query, or None to skip conditional handling. `last_modified` is a datetime or None, and
+     `version` a sequence of any further values which, together with the request URI and `last_modified`, change
+     whenever the representation does. """
+
+    def get_list_validators(self):
+        raise NotImplementedError('`get_list_validators()` must be implemented.')
+
+    def get_detail_validators(self):
+        raise NotImplementedError('`get_detail_validators()` must be implemented.')
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(self.get_list_validators(), super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(self.get_detail_validators(), super().retrieve, request, *args, **kwargs)
+
+    @staticmethod
+    def conditional(validators, action, request, *args, **kwargs):
+        if validators is None:
+            return action(request, *args, **kwargs)
+
+        version, last_modified = validators
+        etag = make_etag(request, list(version) + [last_modified])
+        last_modified = timegm(last_modified.utctimetuple()) if last_modified is not None else None
+
+        response = conditional_response(request, etag, last_modified)
+        if response is not None:
+            return response
+
+        response = action(request, *args, **kwargs)
+        if response.status_code == 200:
+            set_validators(response, etag, last_modified)
+        return response
@@ -0,0 +1,107 @@
+import json
+
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils import encoders
+
+from articles.models import Article
+from articles.serializers import ArticleValuesSerializer
+from comments.models import Comment
+from comments.serializers import CommentValuesSerializer
+
+CHUNK_SIZE = 2000
+
+
+def export_articles(updated_since=None):
+    queryset = Article.objects.order_by('id')
+    if updated_since is not None:
+        # the comment count is part of an article, so new comments make it changed too
+        queryset = queryset.filter(
+            Q(last_modified_date__gte=updated_since) | Q(comments_modified_date__gte=updated_since)
+        )
+    return queryset.values(*ArticleValuesSerializer.get_columns()), ArticleValuesSerializer
+
+
+def export_comments(updated_since=None):
+    queryset = Comment.objects.order_by('id')
+    if updated_since is not None:
+        queryset = queryset.filter(last_modified_date__gte=updated_since)
+    return queryset.values(*CommentValuesSerializer.get_columns()), CommentValuesSerializer
+
+
+EXPORTS = {
+    'articles': export_articles,
+    'comments': export_comments,
+}
+
+
+def parse_updated_since(value):
+    """ Parses an ISO 8601 `updated_since` cursor, taking naive values to be in the current time zone.
+     @:raise ValueError if the value is not a valid date and time. """
+    updated_since = parse_datetime(value)
+    if updated_since is None:
+        raise ValueError('"%s" is not an ISO 8601 date and time.' % value)
+    if timezone.is_naive(updated_since):
+        updated_since = timezone.make_aware(updated_since)
+    return updated_since
+
+
+def stream_ndjson(name, updated_since=None, chunk_size=CHUNK_SIZE):
+    """ Starts an export of every row of `name`, or those changed since `updated_since`.
+
+     @:return a `(cursor, lines)` pair. `cursor` is the `updated_since` value that picks up every change made after
+     this export started, and `lines` a generator of newline delimited JSON chunks, one per `chunk_size` rows, which
+     reads the rows with a server side iterator so memory use does not depend on the size of the table. """
+    cursor = timezone.now()
+    queryset, serializer_class = EXPORTS[name](updated_since)
+
+    def lines():
+        chunk = []
+        for row in queryset.iterator(chunk_size=chunk_size):
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                yield render_chunk(serializer_class, chunk)
+                chunk = []
+        if chunk:
+            yield render_chunk(serializer_class, chunk)
+
+    return cursor, lines()
+
+
+def render_chunk(serializer_class, rows):
+    return b''.join(render_line(item) for item in serializer_class(rows, many=True).data)
+
+
+def render_line(data):
+    line = json.dumps(data, cls=encoders.JSONEncoder, ensure_ascii=False, separators=(',', ':'))
+    return (line + '\n').encode('utf-8')
+
+
+def export_response(request, name):
+    """ Streams an export as the response to a request, which may carry an `updated_since` query parameter. The cursor
+     for the next incremental export is sent in the X-Next-Updated-Since header. """
+    updated_since = None
+    if 'updated_since' in request.query_params:
+        try:
+            updated_since = parse_updated_since(request.query_params['updated_since'])
+        except ValueError as e:
+            raise ValidationError({'updated_since': [str(e)]})
+
+    cursor, lines = stream_ndjson(name, updated_since)
+    response = StreamingHttpResponse(lines, content_type=NDJSONRenderer.media_type)
+    response['X-Next-Updated-Since'] = cursor.isoformat()
+    return response
+
+
+class NDJSONRenderer(BaseRenderer):
+    """ Renders error responses of the export endpoints, whose successful responses are streamed directly. """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return render_line(data) if data is not None else b''
@@ -0,0 +1,73 @@
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.db import connections
+from django.urls import Resolver404, resolve
+
+READ_ACTIONS = ('list', 'retrieve')
+
+
+class AsyncReadHandler(ASGIHandler):
+    """ ASGI handler giving anonymous reads of the article and comment endpoints their own path through the server.
+
+    Django 3.0 has no async views, so the stock handler runs every request on a thread of the event loop's default
+    executor, a few threads per CPU, which it holds while the request waits on the database. Here anonymous reads run
+    on a dedicated pool of `ASYNC_READ_THREADS` threads instead, so more of them wait on the database at once, and a
+    burst of readers queues there rather than starving writes of threads. Reads answered from the cache run there
+    too: the middleware chain and the cache backend block, and must stay off the event loop. Everything else goes
+    through `sync_to_async` as before.
+
+    Reads go through the whole middleware chain, so the responses are the same whichever path served them. """
+
+    def __init__(self):
+        super().__init__()
+        # imported here rather than at module level as the views need the app registry
+        from articles.views import ArticleViewSet
+        from comments.views import CommentViewSet
+
+        self.read_viewsets = (ArticleViewSet, CommentViewSet)
+        self.read_executor = ThreadPoolExecutor(max_workers=settings.ASYNC_READ_THREADS, thread_name_prefix='read')
+
+    async def get_response(self, request):
+        if not self.is_anonymous_read(request):
+            return await sync_to_async(super().get_response)(request)
+
+        loop = asyncio.get_event_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self.read_executor, context.run, self.get_read_response, request)
+
+    def get_read_response(self, request):
+        """ Runs on the read pool. Connections are per thread, and the pool bounds them to ASYNC_READ_THREADS, so
+         each thread keeps its own open from one read to the next, even with CONN_MAX_AGE = 0: opening one costs
+         more than most reads. Those which are broken, or older than a non-zero CONN_MAX_AGE, are closed. """
+        for conn in connections.all():
+            if conn.settings_dict['CONN_MAX_AGE'] == 0:
+                conn.close_at = None
+            conn.close_if_unusable_or_obsolete()
+        return super().get_response(request)
+
+    def is_anonymous_read(self, request):
+        """ Checks whether a request would be dispatched to the list or retrieve action of one of the read
+         viewsets, and is made without credentials. """
+        if request.method not in ('GET', 'HEAD'):
+            return False
+        if 'HTTP_AUTHORIZATION' in request.META or settings.SESSION_COOKIE_NAME in request.COOKIES:
+            return False
+
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return False
+        viewset = getattr(match.func, 'cls', None)
+        return viewset in self.read_viewsets and getattr(match.func, 'actions', {}).get('get') in READ_ACTIONS
+
+
+def get_asgi_application():
+    """ The counterpart of django.core.asgi.get_asgi_application for AsyncReadHandler. """
+    django.setup(set_prefix=False)
+    return AsyncReadHandler()
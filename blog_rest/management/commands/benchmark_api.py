@@ -0,0 +1,249 @@
+import http.client
+import itertools
+import json
+import random
+import threading
+import time
+from contextlib import ExitStack
+from urllib.parse import urlsplit
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from blog_rest.benchmark import NOISE, compare, describe_environment, load_results, save_results, summarize
+
+SCENARIOS = ('article-list', 'article-retrieve', 'comment-list', 'comment-retrieve', 'comment-create')
+METRICS = (('requests_per_second', 'req/s'), ('p50_ms', 'p50'), ('p95_ms', 'p95'), ('p99_ms', 'p99'),
+           ('queries_per_request', 'queries'))
+HEADERS = {'Accept': 'application/json'}
+
+
+class InProcessClient:
+    """ Sends requests through Django's test client, the whole middleware chain without a server, counting the
+    queries each request runs on every database. Every request comes from a new address, as from many readers, so
+    that comment-create measures creating comments rather than the throttle of a single client. """
+    addresses = itertools.count()
+
+    def __init__(self):
+        self.client = Client(SERVER_NAME='localhost')
+
+    def request(self, method, path, body=None):
+        """ @:return the status of the response, the number of queries run and its content. """
+        with ExitStack() as stack:
+            contexts = [stack.enter_context(CaptureQueriesContext(connection)) for connection in connections.all()]
+            address = next(self.addresses)
+            extra = {'HTTP_ACCEPT': HEADERS['Accept'], 'REMOTE_ADDR': '10.%d.%d.%d' % (
+                address >> 16 & 255, address >> 8 & 255, address & 255
+            )}
+            if body is None:
+                response = self.client.generic(method, path, **extra)
+            else:
+                response = self.client.generic(method, path, json.dumps(body), 'application/json', **extra)
+        # each request stands alone, as it would from a new reader, rather than being pinned to the primary
+        self.client.cookies.clear()
+        return response.status_code, sum(len(context) for context in contexts), response.content
+
+    def close(self):
+        pass
+
+
+class HTTPClient:
+    """ Sends requests to a running server over a keep-alive connection. Queries run in the server's process, so
+    they are not counted. """
+
+    def __init__(self, url):
+        url = urlsplit(url)
+        connection_class = http.client.HTTPSConnection if url.scheme == 'https' else http.client.HTTPConnection
+        self.connection = connection_class(url.hostname, url.port)
+        self.prefix = url.path.rstrip('/')
+
+    def request(self, method, path, body=None):
+        """ @:return the status of the response, None for the queries, and its content. """
+        headers = dict(HEADERS)
+        if body is not None:
+            body = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        self.connection.request(method, self.prefix + path, body, headers)
+        response = self.connection.getresponse()
+        return response.status, None, response.read()
+
+    def close(self):
+        self.connection.close()
+
+
+class Command(BaseCommand):
+    help = ('Drives the list, retrieve and create endpoints of the API, in process through the test client or against '
+            'a running server, and reports the latency percentiles, requests per second and queries per request of '
+            'each. Results can be saved as JSON and compared with those of another run, e.g. of an earlier commit. '
+            'Seed the database with seed_blog first. comment-create adds comments to the database, and against a '
+            'server, from a single address, it runs into the comment throttles.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenario', action='append', dest='scenarios', choices=SCENARIOS,
+                            help='scenario to run, may be repeated, all of them by default')
+        parser.add_argument('--requests', type=int, default=200, help='requests per scenario')
+        parser.add_argument('--warmup', type=int, default=10, help='requests sent before measuring each scenario')
+        parser.add_argument('--concurrency', type=int, default=1, help='number of clients sending requests at once')
+        parser.add_argument('--url', help='base URL of a running server, e.g. http://localhost:8000, instead of '
+                                          'sending the requests in process')
+        parser.add_argument('--cached', action='store_true',
+                            help='leave the cache warm rather than clearing it before every request, always the case '
+                                 'with --url')
+        parser.add_argument('--seed', type=int, default=0, help='seed choosing the articles and comments requested')
+        parser.add_argument('--output', help='JSON file to save the results to')
+        parser.add_argument('--compare', help='JSON file of an earlier run to compare the results with')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['concurrency'] < 1 or options['warmup'] < 0:
+            raise CommandError('--requests and --concurrency must be positive and --warmup must not be negative.')
+        baseline = None
+        if options['compare']:
+            try:
+                baseline = load_results(options['compare'])
+                baseline['scenarios']
+            except (OSError, ValueError, KeyError) as e:
+                raise CommandError('Cannot read the results to compare with: %s' % e)
+
+        def new_client():
+            return HTTPClient(options['url']) if options['url'] else InProcessClient()
+
+        clear_cache = not (options['cached'] or options['url'])
+        targets = self.find_targets(new_client())
+        rng = random.Random(options['seed'])
+
+        results = {
+            'environment': describe_environment(),
+            'options': {
+                'target': options['url'] or 'in process', 'requests': options['requests'],
+                'concurrency': options['concurrency'], 'cached': not clear_cache, 'seed': options['seed'],
+            },
+            'scenarios': {},
+        }
+        self.stdout.write('%-18s %8s %9s %9s %9s %9s %8s' % (
+            'scenario', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms', 'queries', 'errors'
+        ))
+        for scenario in options['scenarios'] or SCENARIOS:
+            requests = [self.build_request(scenario, rng, targets) for i in range(options['requests'])]
+            warmup = [self.build_request(scenario, rng, targets) for i in range(options['warmup'])]
+            summary = self.run(new_client, warmup, requests, options['concurrency'], clear_cache)
+            results['scenarios'][scenario] = summary
+            self.stdout.write('%-18s %8.0f %9.2f %9.2f %9.2f %9s %8d' % (
+                scenario, summary['requests_per_second'], summary['p50_ms'], summary['p95_ms'], summary['p99_ms'],
+                '-' if summary['queries_per_request'] is None else '%.1f' % summary['queries_per_request'],
+                summary['errors'],
+            ))
+
+        if baseline is not None:
+            self.write_comparison(baseline, results)
+        if options['output']:
+            save_results(options['output'], results)
+            self.stdout.write('Saved the results to %s' % options['output'])
+
+    @staticmethod
+    def find_targets(client):
+        """ Reads the ids of the articles and comments to request through the API itself, so that they exist on the
+         server benchmarked, whichever database it uses. """
+        targets = {}
+        paths = (('articles', '/articles/?page_size=100&fields=id'), ('comments', '/comments/?page_size=100'))
+        for name, path in paths:
+            status, queries, content = client.request('GET', path)
+            if status != 200:
+                raise CommandError('GET %s answered %d.' % (path, status))
+            targets[name] = [item['id'] for item in json.loads(content.decode('utf-8'))['results']]
+        client.close()
+        if not targets['articles'] or not targets['comments']:
+            raise CommandError('There are no articles or comments to request, run seed_blog first.')
+        return targets
+
+    @staticmethod
+    def build_request(scenario, rng, targets):
+        """ @:return the method, path and body of a request of the scenario, on a random article or comment. """
+        article_id = rng.choice(targets['articles'])
+        if scenario == 'article-list':
+            return 'GET', '/articles/', None
+        if scenario == 'article-retrieve':
+            return 'GET', '/articles/%d/' % article_id, None
+        if scenario == 'comment-list':
+            return 'GET', '/articles/%d/comments/' % article_id, None
+        if scenario == 'comment-retrieve':
+            return 'GET', '/comments/%d/' % rng.choice(targets['comments']), None
+        username = 'reader%d' % rng.randrange(10 ** 6)
+        return 'POST', '/comments/', {'article': article_id, 'username': username, 'content': 'Benchmark comment.'}
+
+    @staticmethod
+    def run(new_client, warmup, requests, concurrency, clear_cache):
+        """ Sends the requests from `concurrency` clients at once, each taking the next request left.
+         @:return the summary of the run, see blog_rest.benchmark.summarize. """
+        pending = iter(requests)
+        latencies = []
+        queries = []
+        errors = 0
+        lock = threading.Lock()
+
+        def send(client):
+            nonlocal errors
+            for method, path, body in pending:
+                if clear_cache:
+                    cache.clear()
+                start = time.perf_counter()
+                status, count, content = client.request(method, path, body)
+                latency = time.perf_counter() - start
+                with lock:
+                    latencies.append(latency)
+                    if count is not None:
+                        queries.append(count)
+                    if status >= 400:
+                        errors += 1
+
+        def worker():
+            client = new_client()
+            try:
+                send(client)
+            finally:
+                client.close()
+
+        def threaded_worker():
+            try:
+                worker()
+            finally:
+                # the connections of the thread, if it sent requests in process
+                connections.close_all()
+
+        client = new_client()
+        for method, path, body in warmup:
+            client.request(method, path, body)
+        client.close()
+
+        start = time.perf_counter()
+        if concurrency == 1:
+            worker()
+        else:
+            threads = [threading.Thread(target=threaded_worker) for i in range(concurrency)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        return summarize(latencies, time.perf_counter() - start, errors, queries)
+
+    def write_comparison(self, baseline, results):
+        """ Writes the change of every metric from the baseline run, flagging changes beyond the noise with a `!`.
+         Fewer requests per second is a regression, for the other metrics an increase is. """
+        self.stdout.write('\nChange from the run at commit %s:' % baseline.get('environment', {}).get('commit'))
+        if baseline.get('options') != results['options']:
+            self.stdout.write(self.style.WARNING('The runs were made with different options: %s and %s' % (
+                baseline.get('options'), results['options']
+            )))
+        self.stdout.write('%-18s' % 'scenario' + ''.join('%12s' % label for metric, label in METRICS))
+        for scenario, summary in results['scenarios'].items():
+            cells = []
+            for metric, label in METRICS:
+                change = compare(baseline['scenarios'].get(scenario), summary, metric)
+                if change is None:
+                    cells.append('%12s' % '-')
+                    continue
+                worse = change < -NOISE if metric == 'requests_per_second' else change > NOISE
+                cells.append('%12s' % ('%+.1f%%%s' % (change * 100, ' !' if worse else '')))
+            self.stdout.write('%-18s' % scenario + ''.join(cells))
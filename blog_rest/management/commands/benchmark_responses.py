@@ -0,0 +1,57 @@
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from rest_framework.settings import api_settings
+
+from articles.models import Article
+
+ENCODINGS = ('identity', 'gzip')
+
+
+class Command(BaseCommand):
+    help = ('Requests API endpoints in process, through the whole middleware chain, and reports the bytes sent on the '
+            'wire and the CPU time spent per response, with and without gzip. Run it once per BLOG_API_PROFILE to '
+            'compare configurations.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='requests per endpoint and encoding')
+        parser.add_argument('--path', action='append', dest='paths',
+                            help='path to request, may be repeated, the article and comment lists and an article by '
+                                 'default')
+        parser.add_argument('--accept', default='application/json', help='Accept header of the requests')
+        parser.add_argument('--cached', action='store_true',
+                            help='leave the article cache warm rather than clearing it before every request')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1:
+            raise CommandError('--requests must be positive.')
+        paths = options['paths'] or self.default_paths()
+        client = Client(SERVER_NAME='localhost')
+
+        renderers = api_settings.DEFAULT_RENDERER_CLASSES
+        self.stdout.write('Renderers: %s' % ', '.join(renderer.__name__ for renderer in renderers))
+        self.stdout.write('%-30s %-9s %8s %10s %12s' % ('path', 'encoding', 'status', 'bytes', 'CPU ms/resp'))
+        for path in paths:
+            for encoding in ENCODINGS:
+                headers = {'HTTP_ACCEPT': options['accept'], 'HTTP_ACCEPT_ENCODING': encoding}
+                response = client.get(path, **headers)
+                cpu = 0
+                for i in range(options['requests']):
+                    if not options['cached']:
+                        cache.clear()
+                    start = time.process_time()
+                    client.get(path, **headers)
+                    cpu += time.process_time() - start
+                self.stdout.write('%-30s %-9s %8d %10d %12.3f' % (
+                    path, encoding, response.status_code, len(response.content), cpu / options['requests'] * 1000
+                ))
+
+    @staticmethod
+    def default_paths():
+        paths = ['/articles/', '/comments/']
+        article = Article.objects.order_by('-comment_count').first()
+        if article is not None:
+            paths.insert(1, '/articles/%d/' % article.pk)
+        return paths
@@ -0,0 +1,139 @@
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from blog_rest.signals import set_pragmas
+
+SCHEMA = '''
+    CREATE TABLE article (
+        id INTEGER PRIMARY KEY, title TEXT NOT NULL, content TEXT NOT NULL, created_date TEXT NOT NULL,
+        comment_count INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE INDEX article_created_idx ON article (created_date DESC, id DESC);
+    CREATE TABLE comment (
+        id INTEGER PRIMARY KEY, article_id INTEGER NOT NULL REFERENCES article (id), username TEXT NOT NULL,
+        content TEXT NOT NULL, created_date TEXT NOT NULL
+    );
+    CREATE INDEX comment_article_created_idx ON comment (article_id, created_date);
+'''
+ARTICLES = 50
+COMMENTS = 2000
+
+
+class Command(BaseCommand):
+    help = ('Measures mixed read/write throughput of SQLite with the default configuration, a new connection per '
+            'request, against SQLITE_PRODUCTION_PRAGMAS with persistent connections. Runs on a scratch database '
+            'shaped like the article and comment tables.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='number of concurrent clients')
+        parser.add_argument('--duration', type=float, default=5.0, help='seconds each configuration runs for')
+        parser.add_argument('--write-ratio', type=float, default=0.2,
+                            help='share of the operations posting a comment, the others read a page of each table')
+
+    def handle(self, *args, **options):
+        if options['threads'] < 1 or not 0 <= options['write_ratio'] <= 1:
+            raise CommandError('--threads must be positive and --write-ratio between 0 and 1.')
+
+        profiles = (
+            ('default', {}, False),
+            ('production', settings.SQLITE_PRODUCTION_PRAGMAS, True),
+        )
+        self.stdout.write('%-12s %10s %10s %10s %10s' % ('profile', 'ops/s', 'reads/s', 'writes/s', 'locked'))
+        for name, pragmas, persistent in profiles:
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'benchmark.sqlite3')
+                self.create_database(path)
+                stats = self.run(path, pragmas, persistent, options)
+            self.stdout.write('%-12s %10.0f %10.0f %10.0f %10d' % ((name,) + stats))
+
+    @staticmethod
+    def create_database(path):
+        db = sqlite3.connect(path)
+        db.executescript(SCHEMA)
+        now = time.time()
+        db.executemany('INSERT INTO article (id, title, content, created_date) VALUES (?, ?, ?, ?)', [
+            (i, 'article %d' % i, 'content ' * 200, now - i) for i in range(1, ARTICLES + 1)
+        ])
+        db.executemany('INSERT INTO comment (article_id, username, content, created_date) VALUES (?, ?, ?, ?)', [
+            (i % ARTICLES + 1, 'reader', 'comment %d' % i, now) for i in range(COMMENTS)
+        ])
+        db.execute('UPDATE article SET comment_count = (SELECT COUNT(*) FROM comment WHERE article_id = article.id)')
+        db.commit()
+        db.close()
+
+    def run(self, path, pragmas, persistent, options):
+        """ @:return operations, reads and writes completed per second, and the number of operations that failed
+         with 'database is locked'. """
+        deadline = time.perf_counter() + options['duration']
+        counts = {'reads': 0, 'writes': 0, 'locked': 0}
+        lock = threading.Lock()
+
+        def connect():
+            # isolation_level None leaves transactions to the explicit BEGIN, as Django does in autocommit mode
+            db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+            set_pragmas(db, pragmas)
+            return db
+
+        def client(seed):
+            rand = random.Random(seed)
+            db = connect() if persistent else None
+            while time.perf_counter() < deadline:
+                operation = 'writes' if rand.random() < options['write_ratio'] else 'reads'
+                request_db = db or connect()
+                try:
+                    if operation == 'writes':
+                        self.post_comment(request_db, rand.randint(1, ARTICLES))
+                    else:
+                        self.read_pages(request_db, rand.randint(1, ARTICLES))
+                except sqlite3.OperationalError as e:
+                    if 'locked' not in str(e):
+                        raise
+                    operation = 'locked'
+                    if request_db.in_transaction:
+                        request_db.execute('ROLLBACK')
+                finally:
+                    if not persistent:
+                        request_db.close()
+                with lock:
+                    counts[operation] += 1
+            if db is not None:
+                db.close()
+
+        threads = [threading.Thread(target=client, args=(i,)) for i in range(options['threads'])]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        operations = counts['reads'] + counts['writes']
+        return operations / elapsed, counts['reads'] / elapsed, counts['writes'] / elapsed, counts['locked']
+
+    @staticmethod
+    def read_pages(db, article_id):
+        db.execute(
+            'SELECT id, title, substr(content, 1, 200), comment_count FROM article '
+            'ORDER BY created_date DESC, id DESC LIMIT 20'
+        ).fetchall()
+        db.execute(
+            'SELECT id, username, content, created_date FROM comment WHERE article_id = ? '
+            'ORDER BY created_date, id LIMIT 20', (article_id,)
+        ).fetchall()
+
+    @staticmethod
+    def post_comment(db, article_id):
+        db.execute('BEGIN')
+        db.execute(
+            'INSERT INTO comment (article_id, username, content, created_date) VALUES (?, ?, ?, ?)',
+            (article_id, 'writer', 'a new comment', time.time())
+        )
+        db.execute('UPDATE article SET comment_count = comment_count + 1 WHERE id = ?', (article_id,))
+        db.execute('COMMIT')
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from blog_rest.export import CHUNK_SIZE, EXPORTS, parse_updated_since, stream_ndjson
+
+
+class Command(BaseCommand):
+    help = 'Writes every article or comment, or those changed since a cursor, as newline delimited JSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=sorted(EXPORTS))
+        parser.add_argument('--updated-since', help='only export rows changed at or after this ISO 8601 time')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='rows read from the database at a time')
+        parser.add_argument('--output', help='file to write to, standard output by default')
+
+    def handle(self, *args, **options):
+        updated_since = None
+        if options['updated_since']:
+            try:
+                updated_since = parse_updated_since(options['updated_since'])
+            except ValueError as e:
+                raise CommandError(e)
+
+        cursor, lines = stream_ndjson(options['model'], updated_since, options['chunk_size'])
+        if options['output']:
+            with open(options['output'], 'wb') as output:
+                for chunk in lines:
+                    output.write(chunk)
+        else:
+            for chunk in lines:
+                self.stdout.write(chunk.decode('utf-8'), ending='')
+
+        self.stderr.write('Next --updated-since: %s' % cursor.isoformat())
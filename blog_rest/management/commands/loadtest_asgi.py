@@ -0,0 +1,111 @@
+import asyncio
+import statistics
+import threading
+import time
+
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db.backends.signals import connection_created
+
+from blog_rest.benchmark import percentile
+from blog_rest.handlers import AsyncReadHandler
+
+HANDLERS = (('django', ASGIHandler), ('async reads', AsyncReadHandler))
+
+
+class Command(BaseCommand):
+    help = ('Sends concurrent anonymous reads through Django\'s ASGI handler and through the handler of '
+            'blog_rest.handlers, in process and against the configured database, and compares how they cope.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=100, help='number of readers sending requests at once')
+        parser.add_argument('--requests', type=int, default=2000, help='number of requests sent through each handler')
+        parser.add_argument('--path', action='append', dest='paths',
+                            help='path to read, may be repeated, the article and comment lists by default')
+        parser.add_argument('--db-latency', type=float, default=2.0,
+                            help='milliseconds added to every query, to model a database across the network')
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or ['/articles/', '/comments/']
+        if options['concurrency'] < 1 or options['requests'] < 1:
+            raise CommandError('--concurrency and --requests must be positive.')
+
+        latency = options['db_latency'] / 1000
+
+        def delay(execute, sql, params, many, context):
+            time.sleep(latency)
+            return execute(sql, params, many, context)
+
+        def add_latency(sender, connection, **kwargs):
+            # the wrappers outlive the connection, which is created again after being closed. It goes first, as the
+            # connection may be created within the execute_wrapper() block of a middleware, which pops the last one.
+            if delay not in connection.execute_wrappers:
+                connection.execute_wrappers.insert(0, delay)
+
+        if latency > 0:
+            connection_created.connect(add_latency)
+        try:
+            self.stdout.write('%-12s %10s %10s %10s %10s %8s' % (
+                'handler', 'req/s', 'p50 ms', 'p95 ms', 'errors', 'threads'
+            ))
+            for name, handler_class in HANDLERS:
+                # every handler starts from a cold cache, on a new event loop with its own default executor
+                cache.clear()
+                stats = asyncio.run(self.run(handler_class(), paths, options['concurrency'], options['requests']))
+                self.stdout.write('%-12s %10.0f %10.1f %10.1f %10d %8d' % ((name,) + stats))
+        finally:
+            connection_created.disconnect(add_latency)
+
+    async def run(self, handler, paths, concurrency, total):
+        """ @:return the requests served per second, the median and 95th percentile latencies in milliseconds, the
+         number of responses that were not 200 OK and the peak number of threads in the process. """
+        requests = iter(range(total))
+        latencies = []
+        errors = 0
+        peak_threads = threading.active_count()
+
+        async def reader():
+            nonlocal errors
+            for i in requests:
+                start = time.perf_counter()
+                if await self.request(handler, paths[i % len(paths)]) != 200:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        async def watch_threads():
+            nonlocal peak_threads
+            while True:
+                peak_threads = max(peak_threads, threading.active_count())
+                await asyncio.sleep(0.01)
+
+        watcher = asyncio.ensure_future(watch_threads())
+        start = time.perf_counter()
+        await asyncio.gather(*(reader() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        watcher.cancel()
+
+        latencies.sort()
+        p95 = percentile(latencies, 0.95)
+        return total / elapsed, statistics.median(latencies) * 1000, p95 * 1000, errors, peak_threads
+
+    @staticmethod
+    async def request(handler, path):
+        """ Sends an anonymous GET request for `path` through `handler` and returns the status of the response. """
+        path, _, query_string = path.partition('?')
+        scope = {
+            'type': 'http', 'method': 'GET', 'path': path, 'query_string': query_string.encode('latin-1'),
+            'headers': [(b'accept', b'application/json')], 'server': ('localhost', 8000),
+        }
+        status = None
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+
+        await handler(scope, receive, send)
+        return status
@@ -0,0 +1,126 @@
+import random
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from articles.cache import invalidate_articles
+from articles.models import Article
+from comments.bulk import bulk_insert_comments
+from comments.models import Comment
+
+USERNAME_PREFIX = 'seed-user-'
+WORDS = ('lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor incididunt ut labore et dolore '
+         'magna aliqua enim ad minim veniam quis nostrud exercitation ullamco laboris nisi aliquip ex ea commodo '
+         'consequat duis aute irure in reprehenderit voluptate velit esse cillum fugiat nulla pariatur').split()
+
+
+class Command(BaseCommand):
+    help = ('Fills the database with generated users, articles and comments, for benchmarks to run against realistic '
+            'volumes. Comments are spread unevenly, a few articles getting most of them. The same --seed generates '
+            'the same data.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50, help='number of authors to create')
+        parser.add_argument('--articles', type=int, default=500, help='number of articles to create')
+        parser.add_argument('--comments', type=int, default=5000, help='number of comments to create in total')
+        parser.add_argument('--seed', type=int, default=0, help='seed of the random generator')
+        parser.add_argument('--batch-size', type=int, default=1000, help='rows inserted at a time')
+        parser.add_argument('--clear', action='store_true',
+                            help='delete every article and comment, and the users of earlier runs, first')
+
+    def handle(self, *args, **options):
+        if min(options['users'], options['articles'], options['comments']) < 0 or options['batch_size'] < 1:
+            raise CommandError('The volumes must not be negative and --batch-size must be positive.')
+        if options['articles'] and not options['users']:
+            raise CommandError('Articles need --users to write them.')
+        if options['comments'] and not options['articles']:
+            raise CommandError('Comments need --articles to be posted on.')
+
+        rng = random.Random(options['seed'])
+        batch_size = options['batch_size']
+        if options['clear']:
+            self.clear()
+
+        authors = self.create_users(options['users'])
+        article_ids = self.create_articles(rng, authors, options['articles'], batch_size)
+        self.create_comments(rng, article_ids, options['comments'], batch_size)
+        invalidate_articles()
+
+        self.stdout.write('Created %d user(s), %d article(s) and %d comment(s).' % (
+            len(authors), len(article_ids), options['comments']
+        ))
+
+    @staticmethod
+    def clear():
+        with transaction.atomic():
+            Comment.objects.all().delete()
+            Article.objects.all().delete()
+            get_user_model().objects.filter(username__startswith=USERNAME_PREFIX).delete()
+
+    @staticmethod
+    def create_users(count):
+        """ Creates the authors, which cannot log in, reusing those of earlier runs.
+         @:return their ids. """
+        User = get_user_model()
+        usernames = ['%s%d' % (USERNAME_PREFIX, i) for i in range(count)]
+        # hashing is slow by design, and an unusable password is all the users need
+        password = make_password(None)
+        User.objects.bulk_create([User(username=username, password=password) for username in usernames],
+                                 ignore_conflicts=True)
+        return list(User.objects.filter(username__in=usernames).order_by('pk').values_list('pk', flat=True))
+
+    def create_articles(self, rng, authors, count, batch_size):
+        """ @:return the ids of the articles created. """
+        article_ids = []
+        for start in range(0, count, batch_size):
+            articles = []
+            for i in range(min(batch_size, count - start)):
+                article = Article(author_id=rng.choice(authors), title=self.sentence(rng, 3, 10)[:200],
+                                  content=self.markdown(rng))
+                # bulk_create skips save(), which renders the content
+                article.render_content()
+                articles.append(article)
+            with transaction.atomic():
+                Article.objects.bulk_create(articles)
+                # ids are only set by bulk_create on some databases, so the batch is read back
+                created = Article.objects.order_by('-pk').values_list('pk', flat=True)[:len(articles)]
+                article_ids += sorted(created)
+        return article_ids
+
+    def create_comments(self, rng, article_ids, count, batch_size):
+        # the nth article is weighted 1/n, so comments pile up on a few articles as they do on real blogs
+        weights = [1 / (rank + 1) for rank in range(len(article_ids))]
+        popular = rng.sample(article_ids, len(article_ids))
+        for start in range(0, count, batch_size):
+            size = min(batch_size, count - start)
+            comments = [
+                Comment(article_id=article_id, username='reader%d' % rng.randrange(1000),
+                        content=self.sentence(rng, 5, 40))
+                for article_id in rng.choices(popular, weights, k=size)
+            ]
+            bulk_insert_comments(comments)
+
+    @staticmethod
+    def sentence(rng, min_words, max_words):
+        words = rng.choices(WORDS, k=rng.randint(min_words, max_words))
+        return ' '.join(words).capitalize()
+
+    def markdown(self, rng):
+        """ Generates Markdown content of a few paragraphs, with some emphasis, lists and links to render. """
+        blocks = []
+        for i in range(rng.randint(2, 8)):
+            kind = rng.random()
+            if kind < 0.15:
+                blocks.append('## ' + self.sentence(rng, 2, 6))
+            elif kind < 0.3:
+                blocks.append('\n'.join('- ' + self.sentence(rng, 3, 8) for _ in range(rng.randint(2, 5))))
+            else:
+                sentences = [self.sentence(rng, 6, 20) + '.' for _ in range(rng.randint(2, 6))]
+                if rng.random() < 0.3:
+                    sentences.append('See [%s](https://example.com/%d).' % (rng.choice(WORDS), rng.randrange(1000)))
+                if rng.random() < 0.3:
+                    sentences[0] = '**%s**' % sentences[0]
+                blocks.append(' '.join(sentences))
+        return '\n\n'.join(blocks)
@@ -0,0 +1,32 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from articles.cache import invalidate_articles
+
+
+class Command(BaseCommand):
+    help = ('Copies the primary SQLite database over each replica of REPLICA_DATABASES, then drops the cached article '
+            'responses, which may have been read from a replica that lagged behind.')
+
+    def handle(self, *args, **options):
+        if not settings.REPLICA_DATABASES:
+            raise CommandError('No replica databases are configured, see BLOG_REPLICA_DBS.')
+        primary = connections['default']
+        if primary.vendor != 'sqlite':
+            raise CommandError('Replicas can only be copied from a SQLite database.')
+
+        primary.ensure_connection()
+        for alias in settings.REPLICA_DATABASES:
+            path = connections[alias].settings_dict['NAME']
+            replica = sqlite3.connect(path)
+            try:
+                # the backup API copies a consistent snapshot while the primary keeps serving writes
+                primary.connection.backup(replica)
+            finally:
+                replica.close()
+            self.stdout.write('Copied the primary database to %s (%s).' % (alias, path))
+
+        invalidate_articles()
@@ -0,0 +1,106 @@
+import threading
+from bisect import bisect_left
+
+from django.conf import settings
+from rest_framework.permissions import IsAdminUser
+from rest_framework.renderers import BaseRenderer
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+# Prometheus' default buckets, in seconds
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    """ Histogram of observations per view, aggregated in process and safe to observe from several threads. Each
+    worker process has its own, so a scrape sees the requests of the process that answered it. """
+
+    def __init__(self, name, documentation, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        # the count of each bucket, not cumulated, then that of +Inf, the sum and the count of the observations
+        self.series = {}
+
+    def observe(self, view, value):
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(view)
+            if series is None:
+                series = self.series[view] = [0] * (len(self.buckets) + 3)
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def clear(self):
+        with self.lock:
+            self.series.clear()
+
+    def render(self):
+        """ @:return the lines of the histogram in the Prometheus text exposition format. """
+        with self.lock:
+            series = {view: list(values) for view, values in self.series.items()}
+        lines = ['# HELP %s %s' % (self.name, self.documentation), '# TYPE %s histogram' % self.name]
+        for view in sorted(series):
+            values = series[view]
+            label = 'view="%s"' % escape_label(view)
+            cumulated = 0
+            for bound, count in zip(self.buckets + ('+Inf',), values):
+                cumulated += count
+                lines.append('%s_bucket{%s,le="%s"} %d' % (self.name, label, bound, cumulated))
+            lines.append('%s_sum{%s} %r' % (self.name, label, values[-2]))
+            lines.append('%s_count{%s} %d' % (self.name, label, values[-1]))
+        return lines
+
+
+REQUEST_DURATION = Histogram('blog_request_duration_seconds', 'Wall time spent producing the responses.',
+                             DURATION_BUCKETS)
+DB_DURATION = Histogram('blog_request_db_duration_seconds', 'Time spent in database queries per request.',
+                        DURATION_BUCKETS)
+DB_QUERIES = Histogram('blog_request_db_queries', 'Number of database queries per request.', QUERY_BUCKETS)
+HISTOGRAMS = (REQUEST_DURATION, DB_DURATION, DB_QUERIES)
+
+
+def escape_label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def record_request(view, duration, db_duration, queries):
+    REQUEST_DURATION.observe(view, duration)
+    DB_DURATION.observe(view, db_duration)
+    DB_QUERIES.observe(view, queries)
+
+
+def render_metrics():
+    """ @:return every histogram, and the sample rate they were recorded at, in the Prometheus text format. """
+    lines = [
+        '# HELP blog_metrics_sample_rate Share of the requests recorded, divide the counts by it to estimate totals.',
+        '# TYPE blog_metrics_sample_rate gauge',
+        'blog_metrics_sample_rate %r' % float(settings.METRICS_SAMPLE_RATE),
+    ]
+    for histogram in HISTOGRAMS:
+        lines += histogram.render()
+    return '\n'.join(lines) + '\n'
+
+
+class PrometheusRenderer(BaseRenderer):
+    media_type = 'text/plain'
+    format = 'prometheus'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict):
+            # errors, such as a denied permission
+            data = '%s\n' % data.get('detail', data)
+        return data.encode(self.charset)
+
+
+class MetricsView(APIView):
+    """ Exposes the request metrics of this process to Prometheus, for admins only. """
+    permission_classes = [IsAdminUser]
+    renderer_classes = [PrometheusRenderer]
+
+    def get(self, request, *args, **kwargs):
+        return Response(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
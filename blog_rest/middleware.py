@@ -0,0 +1,118 @@
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.middleware.gzip import GZipMiddleware
+
+from blog_rest.metrics import record_request
+from blog_rest.routers import use_primary
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def is_sticky(request):
+    """ Checks whether the client wrote less than REPLICA_STICKY_SECONDS ago, going by its cookie. """
+    try:
+        return float(request.COOKIES.get(settings.REPLICA_STICKY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+class ReplicaStickinessMiddleware:
+    """ Gives clients read-your-writes consistency when reads go to replicas.
+
+    Requests that may write read from the primary throughout, and a successful one sets a cookie sending the reads
+    of the same client to the primary for the next REPLICA_STICKY_SECONDS, long enough for the replicas to catch up
+    with the write. """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.REPLICA_DATABASES or request.method in SAFE_METHODS and not is_sticky(request):
+            return self.get_response(request)
+
+        with use_primary():
+            response = self.get_response(request)
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            response.set_cookie(
+                settings.REPLICA_STICKY_COOKIE, '%.3f' % (time.time() + settings.REPLICA_STICKY_SECONDS),
+                max_age=settings.REPLICA_STICKY_SECONDS, httponly=True, samesite='Lax'
+            )
+        return response
+
+
+class ThresholdGZipMiddleware(GZipMiddleware):
+    """ GZipMiddleware only compressing the API's responses, those whose content type is in GZIP_CONTENT_TYPES: the
+     HTML pages of the admin and of the browsable API carry a CSRF token, which compressing along with what the
+     request reflects would expose to BREACH. It also leaves alone the responses shorter than GZIP_MIN_LENGTH bytes,
+     which fit in a packet or two anyway, so compressing them costs CPU for nothing, and streaming responses, which
+     would be compressed and flushed chunk by chunk. """
+
+    def process_response(self, request, response):
+        content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+        if content_type not in settings.GZIP_CONTENT_TYPES:
+            return response
+        if response.streaming or len(response.content) < settings.GZIP_MIN_LENGTH:
+            return response
+        return super().process_response(request, response)
+
+
+class InstrumentationMiddleware:
+    """ Records the wall time, number of queries and time spent in queries of a sample of the requests, per view and
+    action, e.g. `ArticleViewSet.list`, in the histograms of blog_rest.metrics, and reports them to the client in a
+    Server-Timing header when SERVER_TIMING is on.
+
+    METRICS_SAMPLE_RATE is the share of the requests recorded, the others only cost a random number. Queries are
+    timed by an execute wrapper on every database connection, so neither DEBUG nor the query log is needed. The body
+    of a streaming response is produced after this middleware returns, it is not measured. """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        sample_rate = settings.METRICS_SAMPLE_RATE
+        if sample_rate <= 0 or sample_rate < 1 and random.random() >= sample_rate:
+            return self.get_response(request)
+
+        queries = []
+
+        def time_query(execute, sql, params, many, context):
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                queries.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(time_query))
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        db_duration = sum(queries)
+        record_request(getattr(request, 'metrics_view', 'unresolved'), duration, db_duration, len(queries))
+        if settings.SERVER_TIMING:
+            response['Server-Timing'] = 'app;dur=%.2f, db;dur=%.2f;desc="%d queries"' % (
+                duration * 1000, db_duration * 1000, len(queries)
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.metrics_view = self.get_view_name(request, view_func)
+
+    @staticmethod
+    def get_view_name(request, view_func):
+        """ @:return `<class>.<action>` for viewsets, `<class>.<method>` for other class based views, and the URL
+         name for the rest. """
+        view_class = getattr(view_func, 'cls', None)
+        if view_class is None:
+            return request.resolver_match.view_name
+        method = request.method.lower()
+        actions = getattr(view_func, 'actions', None) or {}
+        # viewsets answer HEAD with the action of GET
+        action = actions.get(method) or (actions.get('get') if method == 'head' else None) or method
+        return '%s.%s' % (view_class.__name__, action)
@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY
+from django.contrib.sessions.backends.cached_db import KEY_PREFIX
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.cache import caches
+from django.db import migrations
+from django.utils import timezone
+
+OLD_BACKEND = 'django.contrib.auth.backends.ModelBackend'
+NEW_BACKEND = 'blog_rest.authentication.CachedModelBackend'
+
+
+def move_sessions(apps, schema_editor):
+    # sessions keep the backend which logged their user in, and are logged out once it is no longer configured
+    Session = apps.get_model('sessions', 'Session')
+    # the data is signed with the name of the store's class, the same for the db and cached_db engines
+    store = SessionStore()
+    moved = []
+    for session in Session.objects.filter(expire_date__gt=timezone.now()).iterator():
+        data = store.decode(session.session_data)
+        if data.get(BACKEND_SESSION_KEY) == OLD_BACKEND:
+            data[BACKEND_SESSION_KEY] = NEW_BACKEND
+            session.session_data = store.encode(data)
+            moved.append(session)
+    Session.objects.bulk_update(moved, ['session_data'], batch_size=500)
+    # the cached_db engine would go on reading the copies in the cache
+    caches[settings.SESSION_CACHE_ALIAS].delete_many([KEY_PREFIX + session.pk for session in moved])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sessions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(move_sessions, migrations.RunPython.noop),
+    ]
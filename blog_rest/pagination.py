@@ -0,0 +1,207 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import EmptyPage, Paginator
+from django.db.models import Max, Min, Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """ Opaque cursor pagination keyed on the ordering columns of the paginated queryset.
+
+    Pages are selected with a range condition on the last row seen rather than an OFFSET, so a deep page costs the
+    same as the first one, and the total number of rows is never counted. The queryset must be ordered on a tuple of
+    non-null columns ending in the primary key, e.g. `order_by('-created_date', '-id')`, and an index should exist on
+    that tuple. Rows may be model instances or `.values()` dicts holding the ordering columns. """
+    page_size = api_settings.PAGE_SIZE
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.ordering = self.get_ordering(queryset)
+        self.fields = [queryset.model._meta.get_field(name.lstrip('-')) for name in self.ordering]
+        position, reverse = self.decode_cursor(request)
+
+        ordering = [self.flip(name) for name in self.ordering] if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.position_filter(ordering, position))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+
+        first = self.get_position(results[0]) if results else position
+        last = self.get_position(results[-1]) if results else position
+        if reverse:
+            self.next_position = last if position is not None else None
+            self.previous_position = first if has_more else None
+        else:
+            self.next_position = last if has_more else None
+            self.previous_position = first if position is not None else None
+
+        return results
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_link(self.next_position, reverse=False),
+            'previous': self.get_link(self.previous_position, reverse=True),
+            'results': data,
+        })
+
+    def get_page_size(self, request):
+        if self.page_size_query_param in request.query_params:
+            try:
+                page_size = int(request.query_params[self.page_size_query_param])
+            except ValueError:
+                return self.page_size
+            if page_size > 0:
+                return min(page_size, self.max_page_size)
+        return self.page_size
+
+    @staticmethod
+    def get_ordering(queryset):
+        ordering = tuple(queryset.query.order_by)
+        assert ordering and ordering[-1].lstrip('-') in ('id', 'pk'), (
+            'KeysetPagination requires a queryset ordered on a tuple of columns ending in the primary key.'
+        )
+        return tuple('id' if name == 'pk' else '-id' if name == '-pk' else name for name in ordering)
+
+    @staticmethod
+    def flip(name):
+        return name[1:] if name.startswith('-') else '-' + name
+
+    @staticmethod
+    def position_filter(ordering, position):
+        """ Builds the condition selecting every row that sorts after `position` in `ordering`.
+
+        The leading column gets a plain inclusive bound so the database can turn it into an index range scan, the
+        remaining columns break ties between rows sharing the leading value. """
+        def after(name, value, inclusive=False):
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            return Q(**{'%s__%s%s' % (name.lstrip('-'), lookup, 'e' if inclusive else ''): value})
+
+        ties = Q()
+        condition = Q()
+        for name, value in zip(ordering, position):
+            condition |= ties & after(name, value)
+            ties &= Q(**{name.lstrip('-'): value})
+        return after(ordering[0], position[0], inclusive=True) & condition
+
+    def get_position(self, instance):
+        if isinstance(instance, dict):
+            return [instance[field.attname] for field in self.fields]
+        return [getattr(instance, field.attname) for field in self.fields]
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+
+        try:
+            values, reverse = self.parse_cursor(encoded)
+            if len(values) != len(self.fields):
+                raise ValueError
+            position = [field.to_python(value) for field, value in zip(self.fields, values)]
+        except (ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    @staticmethod
+    def parse_cursor(encoded):
+        """ Decodes a cursor made by encode_cursor into its `(values, reverse)` pair.
+         @:raise ValueError if the cursor is malformed. """
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            return list(cursor['p']), bool(cursor.get('r'))
+        except (TypeError, KeyError, AttributeError, UnicodeError, binascii.Error) as e:
+            raise ValueError('Malformed cursor') from e
+
+    @staticmethod
+    def encode_cursor(position, reverse):
+        cursor = {'p': [value.isoformat() if hasattr(value, 'isoformat') else value for value in position]}
+        if reverse:
+            cursor['r'] = 1
+        return base64.urlsafe_b64encode(json.dumps(cursor, separators=(',', ':')).encode('utf-8')).decode('ascii')
+
+    def get_link(self, position, reverse):
+        if position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(position, reverse))
+
+
+class AtLeast(int):
+    """ A count of rows which stopped at a limit, rendered as e.g. "10000+". """
+
+    def __str__(self):
+        return '%d+' % self
+
+
+class EstimatedCountPaginator(Paginator):
+    """ Paginator that never counts more than `count_limit` rows, for admin changelists of large tables.
+
+    An unfiltered table larger than that is estimated from the range of its primary key, two lookups of the primary
+    key index, which overestimates by the rows deleted. A filtered one is counted up to the limit, and past it each
+    page is read one row further, which tells whether to link the next one, so every row stays reachable. """
+    count_limit = 10000
+    capped = False
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list.order_by()
+        if not queryset.query.where:
+            estimate = self.estimate_count(queryset)
+            if estimate is not None and estimate > self.count_limit:
+                return estimate
+        count = queryset[:self.count_limit].count()
+        self.capped = count == self.count_limit
+        return AtLeast(count) if self.capped else count
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            # the rows past the limit were not counted, whether their pages exist is found by reading them
+            if self.capped and int(number) > 1:
+                return int(number)
+            raise
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if not self.capped or number < self.num_pages:
+            return super().page(number)
+
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows:
+            raise EmptyPage('That page contains no results')
+        if len(rows) > self.per_page:
+            self.num_pages = number + 1
+        else:
+            self.num_pages, self.count = number, bottom + len(rows)
+        return self._get_page(rows[:self.per_page], number, self)
+
+    @staticmethod
+    def estimate_count(queryset):
+        """ @:return the estimated number of rows of an unfiltered queryset with an integer primary key, else None. """
+        if queryset.model._meta.pk.get_internal_type() not in ('AutoField', 'BigAutoField'):
+            return None
+        bounds = queryset.aggregate(low=Min('pk'), high=Max('pk'))
+        return 0 if bounds['low'] is None else bounds['high'] - bounds['low'] + 1
@@ -0,0 +1,68 @@
+import contextvars
+import random
+from contextlib import contextmanager
+
+from django.conf import settings
+
+_use_primary = contextvars.ContextVar('use_primary', default=False)
+_use_replicas = contextvars.ContextVar('use_replicas', default=False)
+
+
+@contextmanager
+def use_primary():
+    """ Sends the reads made within the block to the primary database. """
+    token = _use_primary.set(True)
+    try:
+        yield
+    finally:
+        _use_primary.reset(token)
+
+
+def pinned_to_primary():
+    return _use_primary.get()
+
+
+@contextmanager
+def use_replicas():
+    """ Lets the reads made within the block go to the replicas, unless they are pinned to the primary. """
+    token = _use_replicas.set(True)
+    try:
+        yield
+    finally:
+        _use_replicas.reset(token)
+
+
+class ReplicaReadMixin:
+    """ Viewset mixin reading from the replicas in the actions of `replica_actions`, list and retrieve by default.
+     Every other read, of the other actions, of management commands and so on, is made from the primary, as it may
+     be followed by a write depending on it. """
+    replica_actions = ('list', 'retrieve')
+
+    def dispatch(self, request, *args, **kwargs):
+        # the action is only set once dispatch initialized the request
+        if self.action_map.get(request.method.lower()) in self.replica_actions:
+            with use_replicas():
+                return super().dispatch(request, *args, **kwargs)
+        return super().dispatch(request, *args, **kwargs)
+
+
+class ReplicaRouter:
+    """ Sends the reads made within use_replicas() to a random database of REPLICA_DATABASES, unless they are also
+     made within use_primary(), and every other read and write to the primary `default` database.
+
+    The replicas are copies of the primary: migrations only run on the primary, and relations between objects read
+    from any of them are allowed. ReplicaStickinessMiddleware decides which requests read from the primary. """
+
+    def db_for_read(self, model, **hints):
+        if pinned_to_primary() or not _use_replicas.get() or not settings.REPLICA_DATABASES:
+            return 'default'
+        return random.choice(settings.REPLICA_DATABASES)
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return False if db in settings.REPLICA_DATABASES else None
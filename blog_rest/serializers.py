@@ -0,0 +1,112 @@
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.fields import empty
+from rest_framework.settings import api_settings
+
+# fields whose representation of a non-null column value is the value itself
+PLAIN_FIELDS = (serializers.BooleanField, serializers.CharField, serializers.IntegerField, serializers.ReadOnlyField,
+                serializers.PrimaryKeyRelatedField)
+
+
+class ValuesSerializer:
+    """ Read only stand-in for a model serializer, building the same representations from `.values()` rows instead
+    of model instances, without going through DRF's field machinery for every value.
+
+    Subclasses set `serializer_class`, the serializer whose output is reproduced. The column read for each of its
+    fields follows the field's source, `author.username` becomes `author__username` and a primary key related
+    field reads the foreign key column. Plain values are copied as they are, other values are converted by the
+    `to_representation` of the serializer's own field, so they come out formatted the same. A
+    SerializerMethodField is computed by the `get_<name>(row)` method of the subclass, from the columns named for it
+    in `method_columns`. Like the model serializer, a field reading through a null relation is left out.
+
+    Takes the `fields` keyword argument of SparseFieldsetMixin, and exposes the representation as `data`. """
+    serializer_class = None
+    method_columns = {}
+
+    def __init__(self, instance=None, many=False, fields=None, context=None):
+        self.instance = instance
+        self.many = many
+        self.context = context or {}
+        # DateTimeField looks the current time zone up for every value, here it is looked up once
+        self.time_zone = timezone.get_current_timezone() if settings.USE_TZ else None
+        self.representers = self.get_representers(fields)
+
+    @property
+    def data(self):
+        if self.many:
+            return [self.to_representation(row) for row in self.instance]
+        return self.to_representation(self.instance)
+
+    def to_representation(self, row):
+        data = {}
+        for name, column, convert, optional in self.representers:
+            if column is None:
+                data[name] = convert(row)
+                continue
+            value = row[column]
+            if value is None:
+                if not optional:
+                    data[name] = None
+            else:
+                data[name] = value if convert is None else convert(value)
+        return data
+
+    def get_representers(self, fields=None):
+        """ @:return a `(name, column, convert, optional)` tuple for each field to render, in the order of the
+         serializer. `column` is None for method fields, which `convert` computes from the whole row. """
+        representers = []
+        for name, field in self.get_serializer_fields().items():
+            if fields is not None and name not in fields:
+                continue
+            if isinstance(field, serializers.SerializerMethodField):
+                representers.append((name, None, getattr(self, 'get_%s' % name), False))
+                continue
+            optional = '.' in field.source and field.default is empty and not field.allow_null and not field.required
+            representers.append((name, self.get_column(field), self.get_converter(field), optional))
+        return representers
+
+    def get_converter(self, field):
+        """ @:return the function representing the non-null values of `field`, or None to copy them as they are. """
+        if isinstance(field, PLAIN_FIELDS):
+            return None
+        output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+        if isinstance(field, serializers.DateTimeField) and self.time_zone is not None and output_format == ISO_8601:
+            return self.get_datetime_converter(field, getattr(field, 'timezone', self.time_zone))
+        return field.to_representation
+
+    @staticmethod
+    def get_datetime_converter(field, time_zone):
+        """ DateTimeField.to_representation for aware values and the ISO 8601 format, in a fixed time zone. """
+        def convert(value):
+            if value.tzinfo is None:
+                return field.to_representation(value)
+            value = value.astimezone(time_zone).isoformat()
+            return value[:-6] + 'Z' if value.endswith('+00:00') else value
+        return convert
+
+    @classmethod
+    def get_columns(cls, fields=None):
+        """ @:return the `.values()` columns needed to render the given fields, or every field. """
+        columns = []
+        for name, field in cls.get_serializer_fields().items():
+            if fields is not None and name not in fields:
+                continue
+            if isinstance(field, serializers.SerializerMethodField):
+                columns += cls.method_columns.get(name, ())
+            else:
+                columns.append(cls.get_column(field))
+        return columns
+
+    @classmethod
+    def get_column(cls, field):
+        if isinstance(field, serializers.PrimaryKeyRelatedField):
+            return cls.serializer_class.Meta.model._meta.get_field(field.source).attname
+        return field.source.replace('.', '__')
+
+    @classmethod
+    def get_serializer_fields(cls):
+        # building the fields of a serializer is costly, so it is done once per class
+        if '_serializer_fields' not in cls.__dict__:
+            cls._serializer_fields = cls.serializer_class().fields
+        return cls._serializer_fields
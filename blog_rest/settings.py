@@ -33,6 +33,7 @@ ALLOWED_HOSTS = []
 INSTALLED_APPS = [
     'articles.apps.ArticlesConfig',
     'comments.apps.CommentsConfig',
+    'sync.apps.SyncConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -40,10 +41,14 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'rest_framework',
+    'blog_rest.apps.BlogRestConfig',
 ]
 
 MIDDLEWARE = [
+    'blog_rest.middleware.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'blog_rest.middleware.ThresholdGZipMiddleware',
+    'blog_rest.middleware.ReplicaStickinessMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -84,6 +89,92 @@ DATABASES = {
     }
 }
 
+# Applied to every new SQLite connection, see blog_rest.signals.
+SQLITE_PRODUCTION_PRAGMAS = {
+    # readers and the writer no longer block each other
+    'journal_mode': 'wal',
+    # with WAL, commits stay durable across a crash of the process and only sync on checkpoints
+    'synchronous': 'normal',
+    # milliseconds a writer waits for the lock before failing with 'database is locked'
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    # in KiB when negative
+    'cache_size': -64 * 1024,
+}
+
+# Set BLOG_DB_PROFILE=production to tune SQLite for concurrent writers and keep connections open between requests.
+if os.environ.get('BLOG_DB_PROFILE') == 'production':
+    DATABASES['default']['CONN_MAX_AGE'] = 600
+    SQLITE_PRAGMAS = SQLITE_PRODUCTION_PRAGMAS
+else:
+    SQLITE_PRAGMAS = {}
+
+# Set BLOG_REPLICA_DBS to a comma separated list of SQLite files to spread reads over copies of the database, kept up
+# to date with `manage.py sync_replicas`, see blog_rest.routers. They need a cache shared between processes, see
+# BLOG_CACHE_DIR below.
+REPLICA_DATABASES = []
+for number, path in enumerate(filter(None, os.environ.get('BLOG_REPLICA_DBS', '').split(',')), start=1):
+    DATABASES['replica_%d' % number] = dict(DATABASES['default'], NAME=path, TEST={'MIRROR': 'default'})
+    REPLICA_DATABASES.append('replica_%d' % number)
+
+DATABASE_ROUTERS = ['blog_rest.routers.ReplicaRouter']
+
+# Seconds a client keeps reading from the primary database after a write, so that it sees its own changes.
+REPLICA_STICKY_SECONDS = 10
+REPLICA_STICKY_COOKIE = 'primary_until'
+
+
+# Caches
+# https://docs.djangoproject.com/en/3.0/topics/cache/
+# In memory per process by default, set BLOG_CACHE_DIR to share a file based cache between processes.
+
+if os.environ.get('BLOG_CACHE_DIR'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ['BLOG_CACHE_DIR'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Seconds an anonymous article response stays cached, writes invalidate it earlier, see articles.cache.
+ARTICLE_CACHE_TIMEOUT = 300
+
+# Most changes listed by one page of /sync/, see sync.views.
+SYNC_PAGE_SIZE = 500
+
+# The feeds list the latest this many articles, see articles.feeds.
+FEED_SIZE = 50
+FEED_TITLE = 'GlowBlog'
+FEED_DESCRIPTION = 'The latest articles.'
+# Seconds the feeds, the sitemap and their items stay stored, article changes rebuild them earlier.
+FEED_CACHE_TIMEOUT = 24 * 60 * 60
+
+# Threads serving anonymous reads under ASGI, see blog_rest.handlers.
+ASYNC_READ_THREADS = 16
+
+# Most comments accepted by one request to the bulk comments endpoint.
+COMMENTS_BULK_MAX_ITEMS = 1000
+
+# Replies nest at most this many comments deep below the comment starting their thread.
+COMMENTS_MAX_DEPTH = 20
+
+# Set BLOG_COMMENTS_WRITE_BEHIND=on to answer comment creation with 202 Accepted once the comment is valid, and insert
+# it in a batch with others from a background thread, see comments.writebehind.
+COMMENTS_WRITE_BEHIND = os.environ.get('BLOG_COMMENTS_WRITE_BEHIND') == 'on'
+# A batch is inserted once it holds this many comments, or its first comment waited this many seconds.
+COMMENTS_WRITE_BEHIND_BATCH_SIZE = 100
+COMMENTS_WRITE_BEHIND_INTERVAL = 0.05
+# Comments waiting beyond this many are inserted by the request itself.
+COMMENTS_WRITE_BEHIND_MAX_SIZE = 10000
+# Insert queued comments at once, in the request's thread, for tests.
+COMMENTS_WRITE_BEHIND_SYNCHRONOUS = False
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.0/ref/settings/#auth-password-validators
@@ -103,6 +194,22 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Users of sessions and tokens are loaded from an in process cache, see blog_rest.authentication. The sessions opened
+# with ModelBackend before are moved to it by a migration of blog_rest.
+AUTHENTICATION_BACKENDS = [
+    'blog_rest.authentication.CachedModelBackend',
+]
+# Seconds a cached user is trusted, saving the user drops it earlier, but only in the process that saved it.
+AUTH_PRINCIPAL_CACHE_TTL = 30
+# Most users cached per process.
+AUTH_PRINCIPAL_CACHE_SIZE = 1024
+# Seconds a token from /auth/token/ stays valid.
+AUTH_TOKEN_MAX_AGE = 24 * 60 * 60
+
+# Set BLOG_SESSIONS=cached_db to read sessions from the cache, and the database only when it misses them.
+if os.environ.get('BLOG_SESSIONS') == 'cached_db':
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
 # Internationalization
 # https://docs.djangoproject.com/en/3.0/topics/i18n/
 
@@ -128,5 +235,41 @@ REST_FRAMEWORK = {
     # or allow read-only access for unauthenticated users.
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.DjangoModelPermissionsOrAnonReadOnly'
-    ]
+    ],
+    # Page through lists with cursors on the ordering columns, see blog_rest.pagination.
+    'DEFAULT_PAGINATION_CLASS': 'blog_rest.pagination.KeysetPagination',
+    'PAGE_SIZE': 20,
+    # Signed tokens first, they need neither a session nor a query, see blog_rest.authentication.
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'blog_rest.authentication.SignedTokenAuthentication',
+        'rest_framework.authentication.SessionAuthentication',
+        'rest_framework.authentication.BasicAuthentication',
+    ],
+    # Token buckets of comment creation per client address and per username, see comments.throttling, and of token
+    # requests per client address.
+    'DEFAULT_THROTTLE_RATES': {
+        'comment_ip': '30/min',
+        'comment_username': '10/min',
+        'token': '10/min',
+    },
 }
+
+# Set BLOG_API_PROFILE=production to only speak compact JSON, without the browsable API and the form parsers.
+if os.environ.get('BLOG_API_PROFILE') == 'production':
+    REST_FRAMEWORK.update({
+        'DEFAULT_RENDERER_CLASSES': ['rest_framework.renderers.JSONRenderer'],
+        'DEFAULT_PARSER_CLASSES': ['rest_framework.parsers.JSONParser'],
+        'COMPACT_JSON': True,
+    })
+
+# Responses shorter than this many bytes are sent uncompressed, see blog_rest.middleware.
+GZIP_MIN_LENGTH = 1024
+# Content types of the responses compressed, those of the API. HTML pages, e.g. of the admin, carry CSRF tokens.
+GZIP_CONTENT_TYPES = ['application/json', 'application/x-ndjson']
+
+# Share of the requests whose timings and query counts are recorded, see blog_rest.middleware and /metrics/. Set
+# BLOG_METRICS_SAMPLE_RATE to a number between 0 and 1 to record fewer.
+METRICS_SAMPLE_RATE = float(os.environ.get('BLOG_METRICS_SAMPLE_RATE', '1.0'))
+# Set BLOG_SERVER_TIMING=on for recorded requests to report their timings to the client in a Server-Timing header. It
+# is off by default, as it tells every client how long the database takes.
+SERVER_TIMING = os.environ.get('BLOG_SERVER_TIMING') == 'on'
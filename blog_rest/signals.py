@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from blog_rest.authentication import principals
+
+
+def set_pragmas(db, pragmas):
+    """ Runs `PRAGMA name = value` for every item of `pragmas` on a sqlite3 module connection. """
+    for name, value in pragmas.items():
+        db.execute('PRAGMA %s = %s' % (name, value))
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    if connection.vendor == 'sqlite':
+        # straight on the driver's connection, so the pragmas are not logged as queries of the request
+        set_pragmas(connection.connection, settings.SQLITE_PRAGMAS)
+
+
+@receiver([post_save, post_delete], sender=get_user_model())
+def invalidate_principal(sender, instance, **kwargs):
+    principals.invalidate(instance.pk)
+
+
+@receiver(m2m_changed, sender=get_user_model().groups.through)
+@receiver(m2m_changed, sender=get_user_model().user_permissions.through)
+@receiver(m2m_changed, sender=Group.permissions.through)
+def invalidate_principals(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        principals.clear()
@@ -0,0 +1,111 @@
+import os
+import sqlite3
+import tempfile
+
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from blog_rest.authentication import principals
+
+PARITY_TIME_ZONES = ('UTC', 'Europe/London', 'America/New_York')
+
+
+class QueryBudgetMixin:
+    """ TestCase mixin with assertions on the number of database queries an endpoint runs. """
+
+    def assertQueryBudget(self, budget, func, *args, **kwargs):
+        """ Calls `func` and asserts that it ran at most `budget` queries.
+         @:return whatever `func` returned. """
+        with CaptureQueriesContext(connection) as context:
+            result = func(*args, **kwargs)
+        self.assertLessEqual(
+            len(context), budget,
+            '%d queries run, over the budget of %d:\n%s' % (len(context), budget, self._format_queries(context))
+        )
+        return result
+
+    def assertQueriesDoNotScale(self, func, add_rows, sizes=(1, 10)):
+        """ Grows the data set with `add_rows(n)` for each n in `sizes`, calling `func` after each step, and asserts
+         that the number of queries `func` runs stays the same as the result grows. """
+        expected = None
+        for size in sizes:
+            add_rows(size)
+            # the first call would otherwise be the only one loading the user
+            principals.clear()
+            with CaptureQueriesContext(connection) as context:
+                func()
+            if expected is None:
+                expected = len(context)
+            self.assertEqual(
+                len(context), expected,
+                'Query count grew with the result size from %d to %d:\n%s'
+                % (expected, len(context), self._format_queries(context))
+            )
+
+    @staticmethod
+    def _format_queries(context):
+        return '\n'.join('%d. %s' % (i, query['sql']) for i, query in enumerate(context.captured_queries, start=1))
+
+
+class SerializerParityMixin:
+    """ TestCase mixin checking a blog_rest.serializers.ValuesSerializer against the serializer it stands in for. """
+
+    def assertSameRepresentation(self, values_serializer_class, queryset, fields=None):
+        """ Asserts that `values_serializer_class` renders the `.values()` rows of `queryset` to the same JSON bytes
+         as its model serializer renders the instances, as a list and one by one, in several time zones. """
+        serializer_class = values_serializer_class.serializer_class
+        extra = {} if fields is None else {'fields': fields}
+        rows = list(queryset.values(*values_serializer_class.get_columns(fields)))
+        instances = list(queryset)
+        self.assertTrue(instances, 'Nothing to compare in an empty queryset.')
+
+        renderer = JSONRenderer()
+        for time_zone in PARITY_TIME_ZONES:
+            with timezone.override(time_zone):
+                self.assertEqual(
+                    renderer.render(values_serializer_class(rows, many=True, fields=fields).data),
+                    renderer.render(serializer_class(instances, many=True, **extra).data)
+                )
+                for row, instance in zip(rows, instances):
+                    self.assertEqual(
+                        renderer.render(values_serializer_class(row, fields=fields).data),
+                        renderer.render(serializer_class(instance, **extra).data)
+                    )
+
+
+class ReplicaTestMixin:
+    """ TransactionTestCase mixin adding the SQLite replica databases named in `replicas`, which hold what the primary
+    held when copy_to_replicas was last called, so tests can read from replicas lagging behind it. Subclasses list
+    the replicas in `databases` too, and override REPLICA_DATABASES to route reads to them. """
+    replicas = ()
+
+    @classmethod
+    def setUpClass(cls):
+        cls.replica_directory = tempfile.TemporaryDirectory()
+        for alias in cls.replicas:
+            path = os.path.join(cls.replica_directory.name, '%s.sqlite3' % alias)
+            connections.databases[alias] = dict(connections.databases['default'], NAME=path)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        for alias in cls.replicas:
+            connections[alias].close()
+            del connections[alias]
+            del connections.databases[alias]
+        cls.replica_directory.cleanup()
+
+    def copy_to_replicas(self, *aliases):
+        """ Copies the primary over the given replicas, or every one, like `manage.py sync_replicas`. """
+        primary = connections['default']
+        primary.ensure_connection()
+        for alias in aliases or self.replicas:
+            connections[alias].close()
+            replica = sqlite3.connect(connections[alias].settings_dict['NAME'])
+            try:
+                primary.connection.backup(replica)
+            finally:
+                replica.close()
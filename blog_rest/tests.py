@@ -0,0 +1,512 @@
+import json
+import os
+import tempfile
+from importlib import import_module
+from io import StringIO
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.apps import apps
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user, get_user_model
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core import signing
+from django.core.paginator import EmptyPage
+from django.db import connection
+from django.db.models import Max, Min
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework import viewsets
+from rest_framework.response import Response
+
+from articles.models import Article
+from blog_rest.admin import DateProbingQuerySet
+from blog_rest.authentication import TOKEN_SALT, make_token, principals
+from blog_rest.checks import check_replica_cache
+from blog_rest.handlers import AsyncReadHandler
+from blog_rest.metrics import HISTOGRAMS
+from blog_rest.middleware import ReplicaStickinessMiddleware, ThresholdGZipMiddleware
+from blog_rest.pagination import EstimatedCountPaginator
+from blog_rest.routers import ReplicaReadMixin, ReplicaRouter, use_primary, use_replicas
+from comments.models import Comment
+
+
+class ExportTestCase(TestCase):
+    def setUp(self):
+        self.article = Article.objects.create(title='test article', content='this is some content')
+        for i in range(5):
+            Comment.objects.create(content='comment %d' % i, article=self.article, username='test')
+
+    def test_export_command(self):
+        """ Checks that the command writes one JSON line per row, reading them in chunks, and reports the cursor. """
+        stdout, stderr = StringIO(), StringIO()
+        call_command('export_ndjson', 'comments', '--chunk-size=2', stdout=stdout, stderr=stderr)
+
+        lines = stdout.getvalue().splitlines()
+        self.assertEqual([json.loads(line)['content'] for line in lines], ['comment %d' % i for i in range(5)])
+        self.assertIn('Next --updated-since', stderr.getvalue())
+
+    def test_export_command_to_file(self):
+        """ Checks that the command can write to a file, and that the cursor skips rows that did not change. """
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'articles.ndjson')
+            call_command('export_ndjson', 'articles', '--output', output, '--updated-since', '2000-01-01T00:00:00',
+                         stderr=StringIO())
+            with open(output, encoding='utf-8') as f:
+                self.assertEqual(json.loads(f.read())['comment_count'], 5)
+
+            call_command('export_ndjson', 'articles', '--output', output, '--updated-since', '2100-01-01T00:00:00',
+                         stderr=StringIO())
+            with open(output, encoding='utf-8') as f:
+                self.assertEqual(f.read(), '')
+
+
+@override_settings(ALLOWED_HOSTS=['localhost'])
+class BenchmarkTestCase(TestCase):
+    def test_seed_blog(self):
+        """ Checks that the seeded articles are rendered and indexed, and that the comment counts add up. """
+        call_command('seed_blog', '--users=3', '--articles=20', '--comments=150', '--batch-size=7', stdout=StringIO())
+
+        self.assertEqual(Article.objects.count(), 20)
+        self.assertEqual(Comment.objects.count(), 150)
+        self.assertFalse(Article.objects.filter(content_html='').exists())
+        self.assertEqual(sum(Article.objects.values_list('comment_count', flat=True)), 150)
+        self.assertEqual(set(Article.objects.values_list('author__username', flat=True)),
+                         {'seed-user-0', 'seed-user-1', 'seed-user-2'})
+
+        call_command('seed_blog', '--users=3', '--articles=5', '--comments=0', '--clear', stdout=StringIO())
+        self.assertEqual(Article.objects.count(), 5)
+        self.assertEqual(Comment.objects.count(), 0)
+
+    def test_benchmark_api(self):
+        """ Checks that every scenario is measured, that the results are saved, and compared with a previous run. """
+        call_command('seed_blog', '--users=2', '--articles=5', '--comments=20', stdout=StringIO())
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'results.json')
+            call_command('benchmark_api', '--requests=5', '--warmup=1', '--output', output, stdout=StringIO())
+            with open(output) as f:
+                results = json.load(f)
+
+            self.assertEqual(len(results['scenarios']), 5)
+            for summary in results['scenarios'].values():
+                self.assertEqual(summary['requests'], 5)
+                self.assertEqual(summary['errors'], 0)
+                self.assertLessEqual(summary['p50_ms'], summary['p99_ms'])
+                self.assertGreater(summary['queries_per_request'], 0)
+            self.assertIn('commit', results['environment'])
+
+            stdout = StringIO()
+            call_command('benchmark_api', '--requests=5', '--scenario=article-list', '--compare', output,
+                         stdout=stdout)
+            self.assertIn('Change from the run at commit', stdout.getvalue())
+
+
+class AsyncReadHandlerTestCase(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.article = Article.objects.create(title='test article', content='this is some content')
+        Comment.objects.create(content='a comment', article=self.article, username='test')
+        self.handler = AsyncReadHandler()
+
+    @staticmethod
+    def setup_asgi_request(handler, path, method='GET', headers=()):
+        """ Sends a request through an ASGI application.
+         @:return the status code, the headers and the body of the response. """
+        scope = {
+            'type': 'http', 'method': method, 'path': path, 'query_string': b'', 'server': ('testserver', 80),
+            'headers': [(name.encode('latin-1'), value.encode('latin-1')) for name, value in headers],
+        }
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            messages.append(message)
+
+        async_to_sync(handler)(scope, receive, send)
+        start = messages[0]
+        headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in start['headers']}
+        return start['status'], headers, b''.join(message.get('body', b'') for message in messages[1:])
+
+    def test_cached_article_reads(self):
+        """ Checks that anonymous article reads answered from the cache, conditional requests included, run on the
+         read pool too, keeping the middleware and the cache backend off the event loop. """
+        with mock.patch.object(self.handler, 'get_read_response', wraps=self.handler.get_read_response) as pool:
+            for path in ('/articles/', '/articles/%d/' % self.article.pk):
+                status, headers, body = self.setup_asgi_request(self.handler, path)
+                self.assertEqual(status, 200)
+                self.assertEqual(self.setup_asgi_request(self.handler, path)[2], body)
+                self.assertEqual(self.setup_asgi_request(self.handler, path, headers=[
+                    ('if-none-match', headers['etag'])
+                ])[0], 304)
+            self.assertEqual(pool.call_count, 6)
+
+    def test_uncached_reads(self):
+        """ Checks that comment reads and reads negotiating another format run on the read pool every time, while
+         requests with credentials and writes do not use it. """
+        with mock.patch.object(self.handler, 'get_read_response', wraps=self.handler.get_read_response) as pool:
+            for i in range(2):
+                self.assertEqual(self.setup_asgi_request(self.handler, '/comments/')[0], 200)
+                self.assertEqual(self.setup_asgi_request(self.handler, '/articles/', headers=[
+                    ('accept', 'text/html')
+                ])[0], 200)
+            self.assertEqual(pool.call_count, 4)
+
+            self.setup_asgi_request(self.handler, '/articles/', headers=[('authorization', 'Basic Zm9vOmJhcg==')])
+            self.setup_asgi_request(self.handler, '/articles/', headers=[('cookie', 'sessionid=abc')])
+            self.setup_asgi_request(self.handler, '/articles/', method='POST')
+            self.assertEqual(pool.call_count, 4)
+
+    # the timings of the Server-Timing header differ from one response to the next
+    @override_settings(SERVER_TIMING=False)
+    def test_same_responses(self):
+        """ Checks that the handler responds to reads exactly like Django's own ASGI handler. """
+        stock = get_asgi_application()
+        for path in ('/articles/', '/articles/%d/' % self.article.pk, '/comments/', '/articles/0/'):
+            expected = self.setup_asgi_request(stock, path)
+            # the second request is answered from the cache when there is something cached
+            self.assertEqual(self.setup_asgi_request(self.handler, path), expected)
+            self.assertEqual(self.setup_asgi_request(self.handler, path), expected)
+
+
+class SQLitePragmasTestCase(TestCase):
+    @override_settings(SQLITE_PRAGMAS={'synchronous': 'normal', 'busy_timeout': 1234, 'cache_size': -2048})
+    def test_pragmas_applied(self):
+        """ Checks that the pragmas of the settings are set on new connections. """
+        new_connection = connection.copy()
+        try:
+            new_connection.ensure_connection()
+            pragmas = {
+                name: new_connection.connection.execute('PRAGMA %s' % name).fetchone()[0]
+                for name in ('synchronous', 'busy_timeout', 'cache_size')
+            }
+        finally:
+            new_connection.close()
+        self.assertEqual(pragmas, {'synchronous': 1, 'busy_timeout': 1234, 'cache_size': -2048})
+
+
+@override_settings(REPLICA_DATABASES=['replica_1', 'replica_2'], REPLICA_STICKY_COOKIE='primary_until')
+class ReplicaRouterTestCase(SimpleTestCase):
+    @staticmethod
+    def setup_request(method, cookies=None):
+        """ Sends a request through the stickiness middleware.
+         @:return the response, and the database articles were read from while handling the request. """
+        request = getattr(RequestFactory(), method)('/articles/')
+        request.COOKIES.update(cookies or {})
+        read_from = []
+
+        def get_response(request):
+            with use_replicas():
+                read_from.append(ReplicaRouter().db_for_read(Article))
+            return HttpResponse()
+
+        return ReplicaStickinessMiddleware(get_response)(request), read_from[0]
+
+    def test_routing(self):
+        """ Checks that only the reads allowed to go to the replicas do, unless pinned to the primary, and that
+         writes and migrations go to the primary only. """
+        router = ReplicaRouter()
+        self.assertEqual(router.db_for_read(Article), 'default')
+        with use_replicas():
+            self.assertIn(router.db_for_read(Article), ('replica_1', 'replica_2'))
+            with use_primary():
+                self.assertEqual(router.db_for_read(Article), 'default')
+            with override_settings(REPLICA_DATABASES=[]):
+                self.assertEqual(router.db_for_read(Article), 'default')
+        self.assertEqual(router.db_for_write(Article), 'default')
+        self.assertIsNone(router.allow_migrate('default', 'articles'))
+        self.assertFalse(router.allow_migrate('replica_1', 'articles'))
+
+    def test_replica_actions(self):
+        """ Checks that viewsets read from the replicas in their list and retrieve actions only. """
+        class ReadViewSet(ReplicaReadMixin, viewsets.ViewSet):
+            permission_classes = []
+
+            def read_from(self, request, *args, **kwargs):
+                return Response(ReplicaRouter().db_for_read(Article))
+            list = retrieve = create = read_from
+
+        request = RequestFactory().get('/articles/')
+        self.assertIn(ReadViewSet.as_view({'get': 'list'})(request).data, ('replica_1', 'replica_2'))
+        self.assertIn(ReadViewSet.as_view({'get': 'retrieve'})(request, pk=1).data, ('replica_1', 'replica_2'))
+        request = RequestFactory().post('/articles/')
+        self.assertEqual(ReadViewSet.as_view({'post': 'create'})(request).data, 'default')
+
+    def test_read_your_writes(self):
+        """ Checks that a write reads from the primary and makes the reads of the same client stick to the primary
+         for a while. """
+        response, read_from = self.setup_request('get')
+        self.assertNotEqual(read_from, 'default')
+        self.assertNotIn('primary_until', response.cookies)
+
+        response, read_from = self.setup_request('post')
+        self.assertEqual(read_from, 'default')
+        cookie = response.cookies['primary_until']
+
+        self.assertEqual(self.setup_request('get', {'primary_until': cookie.value})[1], 'default')
+        self.assertNotEqual(self.setup_request('get', {'primary_until': '1000.0'})[1], 'default')
+        self.assertNotEqual(self.setup_request('get', {'primary_until': 'invalid'})[1], 'default')
+
+        with override_settings(REPLICA_DATABASES=[]):
+            self.assertNotIn('primary_until', self.setup_request('post')[0].cookies)
+
+    def test_shared_cache_check(self):
+        """ Checks that replicas are refused with a cache in the memory of each process, which sync_replicas could not
+         drop the cached responses of. """
+        locmem = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        filebased = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': '/tmp'}}
+        with override_settings(CACHES=locmem):
+            self.assertEqual([error.id for error in check_replica_cache(None)], ['blog_rest.E001'])
+            with override_settings(REPLICA_DATABASES=[]):
+                self.assertEqual(check_replica_cache(None), [])
+        with override_settings(CACHES=filebased):
+            self.assertEqual(check_replica_cache(None), [])
+
+
+@override_settings(GZIP_MIN_LENGTH=1024)
+class ThresholdGZipTestCase(TestCase):
+    @staticmethod
+    def setup_request(response):
+        request = RequestFactory().get('/articles/', HTTP_ACCEPT_ENCODING='gzip, deflate')
+        return ThresholdGZipMiddleware(lambda request: response)(request)
+
+    def test_compression_threshold(self):
+        """ Checks that responses are compressed from the threshold on, weakening their ETag. """
+        response = HttpResponse('a' * 1024, content_type='application/json')
+        response['ETag'] = '"abc"'
+        response = self.setup_request(response)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['ETag'], 'W/"abc"')
+
+        response = self.setup_request(HttpResponse('a' * 1023, content_type='application/json'))
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(len(response.content), 1023)
+
+    def test_streaming_not_compressed(self):
+        """ Checks that streaming responses are sent as they are produced. """
+        response = self.setup_request(StreamingHttpResponse(['a' * 1024] * 4, content_type='application/x-ndjson'))
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(b''.join(response.streaming_content), b'a' * 4096)
+
+    def test_html_not_compressed(self):
+        """ Checks that HTML pages, which carry CSRF tokens, are not compressed, those of the admin included. """
+        response = self.setup_request(HttpResponse('a' * 4096))
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+        admin = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'password')
+        for user, path in ((None, '/admin/login/'), (admin, '/admin/'), (admin, '/admin/articles/article/add/')):
+            if user is not None:
+                self.client.force_login(user)
+            response = self.client.get(path, HTTP_ACCEPT_ENCODING='gzip, deflate')
+            self.assertEqual(response.status_code, 200)
+            self.assertGreaterEqual(len(response.content), 1024)
+            self.assertFalse(response.has_header('Content-Encoding'))
+
+
+class InstrumentationTestCase(TestCase):
+    def setUp(self):
+        for histogram in HISTOGRAMS:
+            histogram.clear()
+        self.article = Article.objects.create(title='test article', content='this is some content')
+
+    @override_settings(SERVER_TIMING=True)
+    def test_metrics(self):
+        """ Checks that requests report their timings and are recorded per view and action, and that the metrics are
+         exposed to admins in the Prometheus format. """
+        response = self.client.get('/articles/%d/' % self.article.pk, HTTP_ACCEPT='application/json')
+        self.assertRegex(response['Server-Timing'], r'^app;dur=[0-9.]+, db;dur=[0-9.]+;desc="[1-9][0-9]* queries"$')
+        self.client.head('/articles/%d/' % self.article.pk)
+
+        self.assertIn(self.client.get('/metrics/').status_code, (401, 403))
+        admin = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(admin)
+        response = self.client.get('/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+
+        metrics = response.content.decode('utf-8')
+        self.assertIn('blog_request_duration_seconds_count{view="ArticleViewSet.retrieve"} 2', metrics)
+        self.assertIn('blog_request_db_queries_bucket{view="ArticleViewSet.retrieve",le="+Inf"} 2', metrics)
+        self.assertIn('blog_request_duration_seconds_count{view="MetricsView.get"} 1', metrics)
+        self.assertIn('blog_metrics_sample_rate 1.0', metrics)
+
+    @override_settings(METRICS_SAMPLE_RATE=0, SERVER_TIMING=True)
+    def test_metrics_not_sampled(self):
+        """ Checks that requests left out of the sample are neither timed nor recorded. """
+        response = self.client.get('/articles/%d/' % self.article.pk, HTTP_ACCEPT='application/json')
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(HISTOGRAMS[0].series, {})
+
+    @override_settings(SERVER_TIMING=False)
+    def test_server_timing_off(self):
+        """ Checks that recorded requests keep their timings from the client unless SERVER_TIMING is on. """
+        response = self.client.get('/articles/%d/' % self.article.pk, HTTP_ACCEPT='application/json')
+        self.assertNotIn('Server-Timing', response)
+        self.assertNotEqual(HISTOGRAMS[0].series, {})
+
+
+class EstimatedCountPaginatorTestCase(TestCase):
+    def setUp(self):
+        Article.objects.bulk_create([Article(title='article %d' % i, content='some content') for i in range(6)])
+        Article.objects.filter(title='article 2').delete()
+
+    def test_count(self):
+        """ Checks that a large table is estimated from its primary keys, and that other counts stop at the limit. """
+        with mock.patch.object(EstimatedCountPaginator, 'count_limit', 3):
+            self.assertEqual(EstimatedCountPaginator(Article.objects.order_by('id'), 2).count, 6)
+            queryset = Article.objects.filter(title__startswith='article').order_by('id')
+            self.assertEqual(EstimatedCountPaginator(queryset, 2).count, 3)
+
+        self.assertEqual(EstimatedCountPaginator(Article.objects.order_by('id'), 2).count, 5)
+        self.assertEqual(EstimatedCountPaginator(Article.objects.none(), 2).count, 0)
+
+    def test_pages_past_limit(self):
+        """ Checks that the pages past the rows counted are read, linking the next one while there are rows after. """
+        queryset = Article.objects.filter(title__startswith='article').order_by('id')
+        titles = list(queryset.values_list('title', flat=True))
+        with mock.patch.object(EstimatedCountPaginator, 'count_limit', 1):
+            paginator = EstimatedCountPaginator(queryset, 2)
+            page = paginator.page(1)
+            self.assertEqual(str(paginator.count), '1+')
+            self.assertEqual([article.title for article in page], titles[:2])
+            self.assertTrue(page.has_next())
+
+            paginator = EstimatedCountPaginator(queryset, 2)
+            page = paginator.page(3)
+            self.assertEqual([article.title for article in page], titles[4:])
+            self.assertFalse(page.has_next())
+            self.assertEqual((page.start_index(), page.end_index(), paginator.count), (5, 5, 5))
+            with self.assertRaises(EmptyPage):
+                EstimatedCountPaginator(queryset, 2).page(4)
+
+
+class DateProbingQuerySetTestCase(TestCase):
+    def test_dates(self):
+        """ Checks that the dates found by probing are those of QuerySet.dates(), and that aggregates split into a
+         query each give the same results. """
+        article = Article.objects.create(title='test article', content='this is some content')
+        # around midnight in London in the summer, on either side of a new year and on the last day of February
+        for created_date in ('2019-06-30T23:30:00Z', '2019-07-01T00:30:00Z', '2019-12-31T23:59:00Z',
+                             '2020-02-29T12:00:00Z', '2022-01-01T00:00:00Z'):
+            comment = Comment.objects.create(article=article, username='test', content='comment')
+            Comment.objects.filter(pk=comment.pk).update(created_date=created_date)
+
+        queryset = DateProbingQuerySet(Comment)
+        for kind in ('year', 'month', 'day'):
+            for order in ('ASC', 'DESC'):
+                self.assertEqual(queryset.dates('created_date', kind, order),
+                                 list(Comment.objects.dates('created_date', kind, order)))
+        self.assertEqual(queryset.filter(created_date__year=2019).dates('created_date', 'month'),
+                         list(Comment.objects.filter(created_date__year=2019).dates('created_date', 'month')))
+        self.assertEqual(DateProbingQuerySet(Article).none().dates('created_date', 'year'), [])
+
+        aggregates = {'first': Min('created_date'), 'last': Max('created_date'), 'top': Max('id')}
+        self.assertEqual(queryset.aggregate(**aggregates), Comment.objects.aggregate(**aggregates))
+
+
+class SignedTokenAuthenticationTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        principals.clear()
+        self.article = Article.objects.create(title='test article', content='this is some content')
+        self.user = get_user_model().objects.create_user('reader', 'reader@example.com', 'password')
+
+    def obtain_token(self, password='password'):
+        return self.client.post('/auth/token/', {'username': 'reader', 'password': password})
+
+    def create_comment(self, token):
+        return self.client.post('/comments/', {'article': self.article.pk, 'content': 'a comment'},
+                                content_type='application/json', HTTP_AUTHORIZATION='Bearer %s' % token)
+
+    def test_token(self):
+        """ Checks that a token is given for a valid username and password, and that requests authenticated with it
+         read neither a session nor the user and their permissions once the user is cached. """
+        self.assertEqual(self.obtain_token('wrong').status_code, 400)
+        response = self.obtain_token()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['expires_in'], 24 * 60 * 60)
+        token = response.json()['token']
+
+        self.assertEqual(self.create_comment(token).status_code, 201)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.create_comment(token).status_code, 201)
+        self.assertFalse([query for query in queries.captured_queries
+                          if 'auth_' in query['sql'] or 'django_session' in query['sql']])
+        self.assertEqual(list(Comment.objects.values_list('username', flat=True).distinct()), ['reader'])
+
+    def test_invalid_token(self):
+        """ Checks that tampered and expired tokens, and those issued before the user changed their password or was
+         deactivated, are rejected with a 401. """
+        token = make_token(self.user)
+        response = self.create_comment(token[:-1] + ('A' if token[-1] != 'A' else 'B'))
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response['WWW-Authenticate'], 'Bearer')
+        self.assertEqual(self.create_comment('not a token').status_code, 401)
+        wrong_salt = signing.dumps({'u': self.user.pk, 'h': ''}, salt=TOKEN_SALT + '.other')
+        self.assertEqual(self.create_comment(wrong_salt).status_code, 401)
+        with override_settings(AUTH_TOKEN_MAX_AGE=-1):
+            self.assertEqual(self.create_comment(token).status_code, 401)
+
+        self.assertEqual(self.create_comment(token).status_code, 201)
+        self.user.set_password('another password')
+        self.user.save()
+        self.assertEqual(self.create_comment(token).status_code, 401)
+
+        token = make_token(self.user)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.create_comment(token).status_code, 401)
+
+    def test_principal_cache(self):
+        """ Checks that cached users are copies, dropped when the user is saved or given permissions, and when they
+         expire. """
+        user = principals.get(self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(principals.get(self.user.pk).get_username(), 'reader')
+        user.first_name = 'changed'
+        self.assertEqual(principals.get(self.user.pk).first_name, '')
+
+        self.user.first_name = 'saved'
+        self.user.save()
+        self.assertEqual(principals.get(self.user.pk).first_name, 'saved')
+        self.assertFalse(principals.get(self.user.pk).has_perm('articles.add_article'))
+        self.user.user_permissions.add(Permission.objects.get(codename='add_article'))
+        self.assertTrue(principals.get(self.user.pk).has_perm('articles.add_article'))
+
+        principals.clear()
+        with override_settings(AUTH_PRINCIPAL_CACHE_TTL=-1):
+            principals.get(self.user.pk)
+            with CaptureQueriesContext(connection) as queries:
+                principals.get(self.user.pk)
+            self.assertTrue(queries.captured_queries)
+        self.assertIsNone(principals.get(0))
+
+    def test_session(self):
+        """ Checks that sessions load their user from the principal cache. """
+        self.client.force_login(self.user, backend='blog_rest.authentication.CachedModelBackend')
+        self.client.get('/articles/', HTTP_ACCEPT='application/json')
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get('/articles/', HTTP_ACCEPT='application/json').status_code, 200)
+        self.assertFalse([query for query in queries.captured_queries if 'FROM "auth_user"' in query['sql']])
+
+    def test_old_sessions(self):
+        """ Checks that the sessions opened with ModelBackend keep their user once moved to the cached backend. """
+        session_store = import_module(settings.SESSION_ENGINE).SessionStore
+        session = session_store()
+        session.update({
+            SESSION_KEY: str(self.user.pk), BACKEND_SESSION_KEY: 'django.contrib.auth.backends.ModelBackend',
+            HASH_SESSION_KEY: self.user.get_session_auth_hash(),
+        })
+        session.create()
+        request = RequestFactory().get('/')
+        request.session = session_store(session.session_key)
+        self.assertTrue(get_user(request).is_anonymous)
+
+        import_module('blog_rest.migrations.0001_session_backend').move_sessions(apps, None)
+        request.session = session_store(session.session_key)
+        self.assertEqual(get_user(request), self.user)
@@ -16,8 +16,15 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from blog_rest.metrics import MetricsView
+from blog_rest.views import ObtainTokenView
+from sync.views import SyncView
+
 urlpatterns = [
     path('articles/', include('articles.urls')),
     path('comments/', include('comments.urls')),
     path('admin/', admin.site.urls),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
+    path('auth/token/', ObtainTokenView.as_view(), name='auth-token'),
+    path('sync/', SyncView.as_view(), name='sync'),
 ]
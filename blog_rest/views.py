@@ -0,0 +1,29 @@
+from django.conf import settings
+from rest_framework.authtoken.serializers import AuthTokenSerializer
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from blog_rest.authentication import make_token
+from comments.throttling import TokenBucketThrottle
+
+
+class TokenRequestThrottle(TokenBucketThrottle):
+    """ Throttles password guesses per client address. """
+    scope = 'token'
+
+    def get_cache_key(self, request, view):
+        return self.get_ident_key(self.get_ident(request))
+
+
+class ObtainTokenView(APIView):
+    """ Exchanges a username and password for a signed token. """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    throttle_classes = [TokenRequestThrottle]
+
+    def post(self, request, *args, **kwargs):
+        serializer = AuthTokenSerializer(data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        user = serializer.validated_data['user']
+        return Response({'token': make_token(user), 'expires_in': settings.AUTH_TOKEN_MAX_AGE})
@@ -1,5 +1,29 @@
 from django.contrib import admin
 
+from blog_rest.admin import ScalableModelAdmin
 from comments.models import Comment
 
-admin.site.register(Comment)
+
+@admin.register(Comment)
+class CommentAdmin(ScalableModelAdmin):
+    list_display = ('__str__', 'article', 'username', 'created_date')
+    list_select_related = ('article',)
+    # the article is only displayed by its title
+    list_defer = ('article__content', 'article__content_html', 'article__content_hash')
+    list_filter = ('last_modified_date',)
+    date_hierarchy = 'created_date'
+    # read backwards from the created_date index, whose entries end in the id, with or without a date range
+    ordering = ('-created_date', '-id')
+    # rather than a dropdown of every article, and of every comment
+    autocomplete_fields = ('article',)
+    raw_id_fields = ('parent',)
+
+    def get_readonly_fields(self, request, obj=None):
+        """ A comment keeps its place in its thread, which its path records: the comment it replies to is only set
+         when it is added, and the article of a comment in a thread cannot change, as in CommentSerializer. """
+        readonly_fields = tuple(super().get_readonly_fields(request, obj))
+        if obj is None:
+            return readonly_fields
+        if obj.parent_id is not None or obj.replies.exists():
+            return readonly_fields + ('parent', 'article')
+        return readonly_fields + ('parent',)
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from articles.models import Article
+from comments.models import Comment
+from comments.signals import update_articles
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the comment_count of every article from the comments table, fixing any drift.'
+
+    def handle(self, *args, **options):
+        counts = Comment.objects.filter(article=OuterRef('pk')).order_by().values('article')
+        counts = counts.annotate(count=Count('id')).values('count')
+
+        with transaction.atomic():
+            drifted = Article.objects.annotate(actual=Coalesce(Subquery(counts), 0))
+            drifted = drifted.exclude(comment_count=F('actual')).values_list('pk', 'comment_count', 'actual')
+            deltas = {pk: actual - comment_count for pk, comment_count, actual in drifted}
+            update_articles(deltas)
+
+        self.stdout.write('Fixed the comment count of %d article(s).' % len(deltas))
@@ -0,0 +1,24 @@
+from django.db import migrations
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_comment_count(apps, schema_editor):
+    Article = apps.get_model('articles', 'Article')
+    Comment = apps.get_model('comments', 'Comment')
+
+    counts = Comment.objects.filter(article=OuterRef('pk')).order_by().values('article')
+    counts = counts.annotate(count=Count('id')).values('count')
+    Article.objects.update(comment_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0004_article_comment_count'),
+        ('comments', '0005_comment_article_created_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_comment_count, migrations.RunPython.noop),
+    ]
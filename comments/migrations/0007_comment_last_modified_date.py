@@ -0,0 +1,18 @@
+# Generated by Django 3.0.7 on 2026-10-18 07:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comments', '0006_backfill_comment_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='last_modified_date',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
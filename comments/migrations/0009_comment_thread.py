@@ -0,0 +1,38 @@
+# Generated by Django 3.0.7 on 2026-10-18 08:20
+
+from django.db import migrations, models
+from django.db.models import CharField, Value
+from django.db.models.functions import Cast, Concat, LPad
+import django.db.models.deletion
+
+
+def backfill_path(apps, schema_editor):
+    # every existing comment starts a thread, see comments.models.PATH_DIGITS
+    Comment = apps.get_model('comments', 'Comment')
+    Comment.objects.update(path=Concat(LPad(Cast('id', CharField()), 10, Value('0')), Value('/'),
+                                       output_field=CharField()))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comments', '0008_comment_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='replies', to='comments.Comment'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.CharField(default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(backfill_path, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['article', 'path'], name='comment_thread_idx'),
+        ),
+    ]
@@ -1,13 +1,99 @@
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.db import models, router, transaction
+from django.db.models import CharField, OuterRef, Subquery, Value
+from django.db.models.functions import Cast, Coalesce, Concat, LPad
 
 from articles.models import Article
 
+# a comment's path is the ids of the comments it replies to, and its own, each padded to PATH_DIGITS and followed by
+# PATH_SEPARATOR, so that sorting paths lists a thread depth first, and the replies of a comment are the paths
+# starting with its own, a range of the thread index
+PATH_DIGITS = 10
+PATH_SEPARATOR = '/'
+PATH_STEP = PATH_DIGITS + 1
+
+
+def get_subtree_range(path):
+    """ @:return the `(low, high)` bounds of the paths of a comment, given its path, and of all its replies. """
+    # the character after the separator sorts after every path going on below it
+    return path, path[:-1] + chr(ord(PATH_SEPARATOR) + 1)
+
+
+class CommentQuerySet(models.QuerySet):
+    def delete(self):
+        # imported here, the signals need the models
+        from comments.signals import counting_deleted_comments
+
+        with counting_deleted_comments():
+            return super().delete()
+
 
 class Comment(models.Model):
     username = models.CharField(max_length=50, null=True)
     content = models.TextField(blank=False)
     created_date = models.DateTimeField(auto_now_add=True)
+    last_modified_date = models.DateTimeField(auto_now=True, db_index=True)
     article = models.ForeignKey(Article, on_delete=models.CASCADE)
+    parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='replies')
+    # set once the comment has an id, see PATH_DIGITS
+    path = models.CharField(max_length=255, default='', editable=False)
+
+    objects = CommentQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # for threads, and the replies of a comment, in the order of their paths
+            models.Index(fields=['article', 'path'], name='comment_thread_idx'),
+            models.Index(fields=['article', 'id'], name='comment_article_idx'),
+            models.Index(fields=['article', 'created_date'], name='comment_article_created_idx'),
+            # for date ranges across articles, e.g. the date hierarchy of the admin
+            models.Index(fields=['created_date'], name='comment_created_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # remember the article the comment was loaded with, so moving it to another article can update both
+        instance._loaded_article_id = instance.__dict__.get('article_id')
+        return instance
 
     def __str__(self):
         return self.content[:20]
+
+    def clean(self):
+        # the admin adds comments without the serializer, which checks the same
+        if self.parent_id is not None and self.article_id is not None and self.parent.article_id != self.article_id:
+            raise ValidationError({'parent': 'The comment replied to is on another article.'})
+
+    @property
+    def depth(self):
+        """ @:return how many comments this one is a reply to, in its thread. """
+        return len(self.path) // PATH_STEP - 1
+
+    def save(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(Comment, instance=self)
+        # a new comment is never left without its path, which needs its id
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+            if not self.path:
+                parent_path = self.parent.path if self.parent_id is not None else ''
+                self.path = '%s%0*d%s' % (parent_path, PATH_DIGITS, self.pk, PATH_SEPARATOR)
+                Comment.objects.using(using).filter(pk=self.pk).update(path=self.path)
+
+    def delete(self, *args, **kwargs):
+        from comments.signals import counting_deleted_comments
+
+        with counting_deleted_comments():
+            return super().delete(*args, **kwargs)
+
+    @classmethod
+    def get_path_expression(cls):
+        """ @:return the expression of a comment's path, from its parent's, to set those of comments inserted
+         without one in a single update, e.g. after bulk_create, which does not give them their ids. """
+        parent_path = Subquery(cls.objects.filter(pk=OuterRef('parent_id')).values('path')[:1])
+        return Concat(
+            Coalesce(parent_path, Value('')),
+            LPad(Cast('id', CharField()), PATH_DIGITS, Value('0')),
+            Value(PATH_SEPARATOR),
+            output_field=CharField(),
+        )
@@ -1,12 +1,90 @@
+from django.conf import settings
 from rest_framework import serializers
 
-from comments.models import Comment
+from comments.models import PATH_STEP, Comment
 from articles.models import Article
+from blog_rest.serializers import ValuesSerializer
+
+
+class ContextRelatedField(serializers.PrimaryKeyRelatedField):
+    """ Looks objects up in the dict of the serializer context under `context_key` when there is one, so that a batch
+     of comments can be validated against objects fetched together in one query. """
+    context_key = None
+
+    def to_internal_value(self, data):
+        objects = self.context.get(self.context_key)
+        if objects is None:
+            return super().to_internal_value(data)
+
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return objects[int(data)]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+
+class ArticleField(ContextRelatedField):
+    context_key = 'articles'
+
+
+class ParentField(ContextRelatedField):
+    context_key = 'parents'
 
 
 class CommentSerializer(serializers.HyperlinkedModelSerializer):
-    article = serializers.PrimaryKeyRelatedField(many=False, queryset=Article.objects.all())
+    article = ArticleField(many=False, queryset=Article.objects.all())
+
+    parent = ParentField(queryset=Comment.objects.all(), required=False, allow_null=True)
 
     class Meta:
         model = Comment
-        fields = ('id', 'article', 'username', 'content', 'created_date')
+        fields = ('id', 'article', 'parent', 'username', 'content', 'created_date', 'last_modified_date')
+
+    def validate(self, attrs):
+        """ Checks that a reply is on the article of the comment it replies to, no deeper than COMMENTS_MAX_DEPTH,
+         and that comments keep their place in their thread, which their path records. """
+        if self.instance is not None:
+            if 'parent' in attrs and attrs['parent'] != self.instance.parent:
+                raise serializers.ValidationError({'parent': ['The comment replied to cannot be changed.']})
+            if 'article' in attrs and attrs['article'] != self.instance.article and (
+                    self.instance.parent_id is not None or self.instance.replies.exists()):
+                raise serializers.ValidationError({'article': ['Comments in a thread cannot move to another article.']})
+            return attrs
+
+        parent = attrs.get('parent')
+        if parent is None:
+            return attrs
+        if parent.article_id != attrs['article'].pk:
+            raise serializers.ValidationError({'parent': ['The comment replied to is on another article.']})
+        if len(parent.path) // PATH_STEP > settings.COMMENTS_MAX_DEPTH:
+            message = 'Replies nest at most %d comments deep.' % settings.COMMENTS_MAX_DEPTH
+            raise serializers.ValidationError({'parent': [message]})
+        return attrs
+
+
+class CommentValuesSerializer(ValuesSerializer):
+    """ CommentSerializer for `.values()` rows, used to read comments. """
+    serializer_class = CommentSerializer
+
+
+class CommentThreadSerializer(CommentValuesSerializer):
+    """ CommentValuesSerializer for the `.values()` rows of a thread, or part of one, in the order of their paths,
+    nesting each comment in the `replies` of the comment it replies to. The comments whose parent is not among the
+    rows, e.g. at the top of a page, are listed first, for the client to attach by their `parent`. The rows hold the
+    `path` column besides those of get_columns. """
+
+    @property
+    def data(self):
+        rows = self.instance if self.many else [self.instance]
+        top = []
+        by_path = {}
+        for row in rows:
+            data = self.to_representation(row)
+            data['replies'] = []
+            parent = by_path.get(row['path'][:-PATH_STEP])
+            (parent['replies'] if parent is not None else top).append(data)
+            by_path[row['path']] = data
+        return top if self.many else top[0]
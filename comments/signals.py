@@ -0,0 +1,83 @@
+import contextvars
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from articles.cache import invalidate_article
+from articles.models import Article
+from comments.models import Comment
+
+# the (deltas, deleted article ids) of the deletion in progress, see counting_deleted_comments
+_deletion = contextvars.ContextVar('comment_deletion', default=None)
+
+
+def update_articles(deltas):
+    """ Records comment changes on their articles: adds the change in the number of comments to each article's
+     comment_count with an F() expression, so concurrent writers cannot lose updates, and moves its
+     comments_modified_date marker forward.
+     @:param deltas a dict mapping article ids to the change in their number of comments, which may be 0. """
+    now = timezone.now()
+    by_delta = defaultdict(list)
+    for article_id, delta in deltas.items():
+        by_delta[delta].append(article_id)
+
+    for delta, article_ids in by_delta.items():
+        Article.objects.filter(pk__in=article_ids).update(
+            comment_count=F('comment_count') + delta, comments_modified_date=now
+        )
+    for article_id in deltas:
+        invalidate_article(article_id)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    loaded_article_id = getattr(instance, '_loaded_article_id', None)
+    if created:
+        update_articles({instance.article_id: 1})
+    elif loaded_article_id is not None and loaded_article_id != instance.article_id:
+        update_articles({loaded_article_id: -1, instance.article_id: 1})
+    else:
+        update_articles({instance.article_id: 0})
+    instance._loaded_article_id = instance.article_id
+
+
+@contextmanager
+def counting_deleted_comments():
+    """ Counts the comments deleted within the block, replies and the comments of deleted articles included, on their
+     articles once it ends, in one update per distinct change rather than one per comment. The articles deleted
+     within the block are left alone. The deletes of comments and articles, and of their querysets, run within it. """
+    if _deletion.get() is not None:
+        yield
+        return
+
+    deltas, deleted_articles = Counter(), set()
+    token = _deletion.set((deltas, deleted_articles))
+    try:
+        with transaction.atomic():
+            yield
+            deltas = {article_id: delta for article_id, delta in deltas.items() if article_id not in deleted_articles}
+            if deltas:
+                update_articles(deltas)
+    finally:
+        _deletion.reset(token)
+
+
+@receiver(pre_delete, sender=Article)
+def article_deleting(sender, instance, **kwargs):
+    deletion = _deletion.get()
+    if deletion is not None:
+        deletion[1].add(instance.pk)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    deletion = _deletion.get()
+    if deletion is None:
+        update_articles({instance.article_id: -1})
+    else:
+        deletion[0][instance.article_id] -= 1
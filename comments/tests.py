@@ -1,15 +1,36 @@
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.db.models import QuerySet
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
 from rest_framework.test import APIRequestFactory, force_authenticate
 
 from articles.models import Article
+from articles.views import ArticleViewSet
+from blog_rest.testing import QueryBudgetMixin, ReplicaTestMixin, SerializerParityMixin
+from comments.bulk import bulk_insert_comments
 from comments.models import Comment
+from comments.serializers import CommentValuesSerializer
+from comments.throttling import TokenBucketThrottle
+from comments.writebehind import CommentWriteQueue
 from comments.views import CommentViewSet
 
 
-class CommentTestCase(TestCase):
+def throttle_rates(**rates):
+    return override_settings(REST_FRAMEWORK=dict(settings.REST_FRAMEWORK, DEFAULT_THROTTLE_RATES=rates))
+
+
+class CommentTestCase(QueryBudgetMixin, SerializerParityMixin, TestCase):
     def setUp(self):
+        # the throttles keep their buckets in the cache
+        cache.clear()
         self.admin_user = get_user_model().objects.create_superuser(username='admin')
         self.normal_user = get_user_model().objects.create(username='normal')
         self.article = Article.objects.create(title='test article', content='this is some content')
@@ -43,7 +64,7 @@ class CommentTestCase(TestCase):
         # ensure the response is OK when there is no data
         response = self.setup_list_request(user)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 0, 'Response was not of size 0, despite no comments added.')
+        self.assertEqual(len(response.data['results']), 0, 'Response was not of size 0, despite no comments added.')
     
         # create a test comment and ensure its in the database
         comment = Comment.objects.create(content=self.valid_data['content'], article_id=self.valid_data['article'])
@@ -54,10 +75,10 @@ class CommentTestCase(TestCase):
         # check if the comment in the database can be retrieved
         response = self.setup_list_request(user)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1, 'Response was not of size 1, despite an article in database.')
-        self.assertEqual(response.data[0]['id'], 1)
-        self.assertEqual(response.data[0]['content'], comment.content)
-        self.assertEqual(response.data[0]['article'], comment.article_id)
+        self.assertEqual(len(response.data['results']), 1, 'Response was not of size 1, despite an article in database.')
+        self.assertEqual(response.data['results'][0]['id'], 1)
+        self.assertEqual(response.data['results'][0]['content'], comment.content)
+        self.assertEqual(response.data['results'][0]['article'], comment.article_id)
 
     def test_list_admin(self):
         self.comment_list(self.admin_user)
@@ -66,10 +87,81 @@ class CommentTestCase(TestCase):
         self.comment_list(self.normal_user)
 
     @staticmethod
-    def setup_create_request(user, data):
+    def setup_page_request(url):
+        factory = APIRequestFactory()
+        request = factory.get(url, format='json')
+        view = CommentViewSet.as_view({'get': 'list'})
+        return view(request=request)
+
+    def test_list_pagination(self):
+        """ Checks that the list can be walked with cursors, ordered by article and then by comment. """
+        other_article = Article.objects.create(title='other article', content='this is some content')
+        for article_id in (other_article.id, self.article.id, other_article.id, self.article.id):
+            Comment.objects.create(content=self.valid_data['content'], article_id=article_id)
+
+        pages = []
+        response = self.setup_page_request('/comments/?page_size=3')
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            pages.append([comment['id'] for comment in response.data['results']])
+            if response.data['next'] is None:
+                break
+            response = self.setup_page_request(response.data['next'])
+        self.assertEqual(pages, [[2, 4, 1], [3]])
+
+    def test_list_article_comments(self):
+        """ Checks that one article's comments can be listed in the order they were posted, both from the nested
+         route and with the article filter. """
+        other_article = Article.objects.create(title='other article', content='this is some content')
+        for article_id in (other_article.id, self.article.id, other_article.id, self.article.id):
+            Comment.objects.create(content=self.valid_data['content'], article_id=article_id)
+        Comment.objects.filter(pk=4).update(created_date=Comment.objects.get(pk=2).created_date)
+
+        factory = APIRequestFactory()
+        request = factory.get('/articles/%d/comments/' % self.article.id, format='json')
+        response = CommentViewSet.as_view({'get': 'list'})(request=request, article_pk=self.article.id)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([comment['id'] for comment in response.data['results']], [2, 4])
+
+        pages = []
+        response = self.setup_page_request('/comments/?article=%d&page_size=1' % other_article.id)
+        while True:
+            pages.append([comment['id'] for comment in response.data['results']])
+            if response.data['next'] is None:
+                break
+            response = self.setup_page_request(response.data['next'])
+        self.assertEqual(pages, [[1], [3]])
+
+    def test_list_article_comments_not_found(self):
+        """ Checks that the nested route is a 404 for a missing article and that the filter must be an id. """
+        factory = APIRequestFactory()
+        request = factory.get('/articles/2/comments/', format='json')
+        response = CommentViewSet.as_view({'get': 'list'})(request=request, article_pk=2)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        response = self.setup_page_request('/comments/?article=first')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_article_comments_use_index(self):
+        """ Checks that one article's comments are read from the (article, created_date) index, in index order. """
+        plan = Comment.objects.filter(article=self.article).order_by('created_date', 'id').explain()
+        self.assertIn('comment_article_created_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_list_queries_do_not_scale(self):
+        """ Checks that listing comments across articles runs the same number of queries however many are listed. """
+        def add_comments(count):
+            for i in range(count):
+                article = Article.objects.create(title='test article', content='this is some content')
+                Comment.objects.create(content=self.valid_data['content'], article=article, username='test')
+
+        self.assertQueriesDoNotScale(lambda: self.setup_list_request(self.normal_user), add_comments)
+
+    @staticmethod
+    def setup_create_request(user, data, remote_addr='127.0.0.1'):
         factory = APIRequestFactory()
         request = factory.post('/comments/', data,
-                               format='json')
+                               format='json', REMOTE_ADDR=remote_addr)
 
         if user is not None:
             force_authenticate(request, user)
@@ -110,6 +202,271 @@ class CommentTestCase(TestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertEqual(Comment.objects.count(), 0)
 
+    @throttle_rates(comment_ip='3/min', comment_username='100/min')
+    def test_create_throttled_per_address(self):
+        """ Checks that a client address may post a burst of comments, whatever the usernames, and is then told to
+         retry after a token is refilled, while other addresses and admins are not throttled. """
+        for i in range(3):
+            data = dict(self.valid_optional_data, username='user %d' % i)
+            self.assertEqual(self.setup_create_request(None, data).status_code, status.HTTP_201_CREATED)
+
+        response = self.setup_create_request(None, self.valid_optional_data)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn(int(response['Retry-After']), range(1, 21))
+        response = self.setup_bulk_request(None, [self.valid_optional_data])
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        response = self.setup_create_request(None, self.valid_optional_data, remote_addr='10.0.0.1')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.setup_create_request(self.admin_user, self.valid_data).status_code,
+                         status.HTTP_201_CREATED)
+        self.assertEqual(Comment.objects.count(), 5)
+
+    @throttle_rates(comment_ip='5/min', comment_username='2/min')
+    def test_bulk_create_throttled_per_item(self):
+        """ Checks that a bulk request takes a token per comment, and is refused whole if it holds more comments than
+         the tokens left, or than the bucket ever holds. """
+        response = self.setup_bulk_request(None, [self.valid_optional_data] * 4)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.setup_bulk_request(None, [self.valid_optional_data] * 2)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn(int(response['Retry-After']), range(1, 13))
+        response = self.setup_bulk_request(None, [self.valid_optional_data] * 6)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertNotIn('Retry-After', response)
+        self.assertEqual(self.setup_create_request(None, self.valid_optional_data).status_code,
+                         status.HTTP_201_CREATED)
+        self.assertEqual(Comment.objects.count(), 5)
+
+    @throttle_rates(comment_ip='100/min', comment_username='2/min')
+    def test_create_throttled_per_username(self):
+        """ Checks that changing address does not help posting more comments under one username, supplied or that
+         of the user. """
+        for i in range(2):
+            response = self.setup_create_request(None, self.valid_optional_data, remote_addr='10.0.0.%d' % i)
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.setup_create_request(None, self.valid_optional_data, remote_addr='10.0.0.9')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        data = dict(self.valid_optional_data, username=self.normal_user.username)
+        self.assertEqual(self.setup_create_request(None, data).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.setup_create_request(self.normal_user, self.valid_data).status_code,
+                         status.HTTP_201_CREATED)
+        self.assertEqual(self.setup_create_request(self.normal_user, self.valid_data).status_code,
+                         status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @throttle_rates(comment_ip='3/min', comment_username='100/min')
+    def test_create_throttle_refills(self):
+        """ Checks that a throttled client gets a token back every period / rate, and never more than the burst. """
+        now = 1000.0
+        with mock.patch.object(TokenBucketThrottle, 'timer', side_effect=lambda: now):
+            for i in range(3):
+                self.setup_create_request(None, self.valid_optional_data)
+            self.assertEqual(self.setup_create_request(None, self.valid_optional_data).status_code,
+                             status.HTTP_429_TOO_MANY_REQUESTS)
+
+            now += 20
+            self.assertEqual(self.setup_create_request(None, self.valid_optional_data).status_code,
+                             status.HTTP_201_CREATED)
+            self.assertEqual(self.setup_create_request(None, self.valid_optional_data).status_code,
+                             status.HTTP_429_TOO_MANY_REQUESTS)
+
+            now += 3600
+            statuses = [self.setup_create_request(None, self.valid_optional_data).status_code for i in range(4)]
+            self.assertEqual(statuses, [status.HTTP_201_CREATED] * 3 + [status.HTTP_429_TOO_MANY_REQUESTS])
+
+    @override_settings(COMMENTS_WRITE_BEHIND=True, COMMENTS_WRITE_BEHIND_SYNCHRONOUS=True)
+    def test_create_write_behind(self):
+        """ Checks that a valid comment is accepted with 202 when written behind, and counted on its article, while
+         an invalid one is still rejected at once. """
+        response = self.setup_create_request(None, self.valid_optional_data)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data, {'article': self.article.pk, 'parent': None, 'username': 'test',
+                                         'content': self.valid_optional_data['content']})
+        self.assertEqual(Comment.objects.get().username, 'test')
+        self.assertEqual(Article.objects.get(pk=self.article.pk).comment_count, 1)
+
+        response = self.setup_create_request(None, self.valid_data)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Comment.objects.count(), 1)
+
+    @staticmethod
+    def setup_bulk_request(user, data):
+        factory = APIRequestFactory()
+        request = factory.post('/comments/bulk/', data, format='json')
+        if user is not None:
+            force_authenticate(request, user)
+        view = CommentViewSet.as_view({'post': 'bulk'})
+        return view(request=request)
+
+    @throttle_rates(comment_ip='100/min', comment_username='10/min')
+    def test_bulk_create(self):
+        """ Checks that a batch of comments, and of replies, is created with a fixed number of queries, keeping
+         supplied usernames for anonymous users and counting the comments on their articles. """
+        other_article = Article.objects.create(title='other article', content='this is some content')
+        data = [dict(self.valid_optional_data, article=article_id)
+                for article_id in [self.article.id] * 30 + [other_article.id] * 20]
+
+        response = self.assertQueryBudget(8, self.setup_bulk_request, None, data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 50)
+        self.assertEqual(Comment.objects.filter(username=self.valid_optional_data['username']).count(), 50)
+        self.assertEqual(Article.objects.get(pk=self.article.pk).comment_count, 30)
+        self.assertEqual(Article.objects.get(pk=other_article.pk).comment_count, 20)
+
+        # the comments replied to are fetched together too
+        parents = Comment.objects.filter(article=self.article).order_by('pk')[:10]
+        data = [dict(self.valid_optional_data, parent=parent.pk) for parent in parents for i in range(5)]
+        response = self.assertQueryBudget(9, self.setup_bulk_request, None, data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Comment.objects.filter(parent__in=parents).count(), 50)
+        self.assertEqual(Article.objects.get(pk=self.article.pk).comment_count, 80)
+
+    def test_bulk_create_authenticated(self):
+        """ Checks that comments posted in bulk by an authenticated user are attributed to them. """
+        response = self.setup_bulk_request(self.normal_user, [self.valid_data, self.valid_optional_data])
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Comment.objects.filter(username=self.normal_user.username).count(), 2)
+
+    def test_bulk_create_with_invalid_items(self):
+        """ Checks that one invalid item rejects the whole batch, with errors reported against each item. """
+        response = self.setup_bulk_request(None, [self.valid_optional_data, self.valid_data, self.invalid_data])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(response.data), 3)
+        self.assertEqual(response.data[0], {})
+        self.assertIn('username', response.data[1])
+        self.assertIn('article', response.data[2])
+        self.assertEqual(Comment.objects.count(), 0)
+
+    def test_bulk_create_limits(self):
+        """ Checks that the body must be a list no longer than the configured maximum. """
+        response = self.setup_bulk_request(self.normal_user, self.valid_data)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        with self.settings(COMMENTS_BULK_MAX_ITEMS=2):
+            response = self.setup_bulk_request(self.normal_user, [self.valid_data] * 3)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Comment.objects.count(), 0)
+
+    @staticmethod
+    def setup_thread_request(url, **kwargs):
+        factory = APIRequestFactory()
+        request = factory.get(url, format='json')
+        view = CommentViewSet.as_view({'get': 'thread' if 'pk' in kwargs else 'article_thread'})
+        return view(request=request, **kwargs)
+
+    def create_thread(self):
+        """ Creates a thread of replies, and a comment on its own, returning them by content. """
+        comments = {}
+        for content, parent in (('first', None), ('reply', 'first'), ('reply to reply', 'reply'),
+                                ('other reply', 'first'), ('second', None)):
+            comments[content] = Comment.objects.create(article=self.article, username='test', content=content,
+                                                       parent=comments.get(parent))
+        return comments
+
+    def test_create_reply(self):
+        """ Checks that replies are created under the comment they reply to, which must be on the same article and
+         not nested too deep, and cannot be changed later. """
+        root = Comment.objects.create(article=self.article, username='test', content='a comment')
+        response = self.setup_create_request(None, dict(self.valid_optional_data, parent=root.pk))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['parent'], root.pk)
+        reply = Comment.objects.get(pk=response.data['id'])
+        self.assertEqual(reply.path, '%010d/%010d/' % (root.pk, reply.pk))
+        self.assertEqual((root.depth, reply.depth), (0, 1))
+
+        other_article = Article.objects.create(title='other article', content='this is some content')
+        response = self.setup_create_request(None, dict(self.valid_optional_data, article=other_article.pk,
+                                                        parent=root.pk))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('parent', response.data)
+        with self.settings(COMMENTS_MAX_DEPTH=1):
+            response = self.setup_create_request(None, dict(self.valid_optional_data, parent=reply.pk))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('parent', response.data)
+
+        response = self.setup_update_request(self.admin_user, reply, dict(self.valid_data, parent=None))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.setup_update_request(self.admin_user, root, dict(self.valid_data, article=other_article.pk))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Comment.objects.count(), 2)
+
+    def test_create_without_path_rolled_back(self):
+        """ Checks that a comment whose path could not be written is not created either, nor counted. """
+        update = QuerySet.update
+
+        def failing_update(queryset, **kwargs):
+            if 'path' in kwargs:
+                raise DatabaseError
+            return update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, 'update', failing_update):
+            with self.assertRaises(DatabaseError):
+                Comment.objects.create(article=self.article, username='test', content='a comment')
+        self.assertEqual(Comment.objects.count(), 0)
+        self.assertEqual(Article.objects.get(pk=self.article.pk).comment_count, 0)
+
+    def test_bulk_create_replies(self):
+        """ Checks that comments created in bulk, and written behind, get their paths too. """
+        root = Comment.objects.create(article=self.article, username='test', content='a comment')
+        response = self.setup_bulk_request(None, [self.valid_optional_data, dict(self.valid_optional_data,
+                                                                                 parent=root.pk)])
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        for comment in Comment.objects.exclude(pk=root.pk):
+            parent_path = root.path if comment.parent_id == root.pk else ''
+            self.assertEqual(comment.path, '%s%010d/' % (parent_path, comment.pk))
+
+    def test_thread(self):
+        """ Checks that a comment comes back with every reply below it nested, in two queries whatever its size. """
+        comments = self.create_thread()
+        response = self.assertQueryBudget(2, self.setup_thread_request, '/comments/', pk=comments['first'].pk)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['content'], 'first')
+        self.assertEqual([reply['content'] for reply in response.data['replies']], ['reply', 'other reply'])
+        self.assertEqual(response.data['replies'][0]['replies'][0]['content'], 'reply to reply')
+        self.assertEqual(response.data['replies'][0]['replies'][0]['replies'], [])
+
+        response = self.setup_thread_request('/comments/', pk=comments['reply'].pk)
+        self.assertEqual([reply['content'] for reply in response.data['replies']], ['reply to reply'])
+        self.assertEqual(self.setup_thread_request('/comments/', pk=0).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get('/comments/abc/thread/').status_code, status.HTTP_404_NOT_FOUND)
+
+        comments['first'].delete()
+        self.assertEqual(list(Comment.objects.values_list('content', flat=True)), ['second'])
+
+    def test_article_thread(self):
+        """ Checks that an article's comments are paged through depth first, replies nested in the page of the
+         comment they reply to, or at the top of the next one. """
+        self.create_thread()
+        response = self.setup_thread_request('/articles/1/thread/?page_size=2', article_pk=self.article.pk)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([comment['content'] for comment in response.data['results']], ['first'])
+        self.assertEqual(response.data['results'][0]['replies'][0]['content'], 'reply')
+
+        response = self.setup_thread_request(response.data['next'], article_pk=self.article.pk)
+        self.assertEqual([comment['content'] for comment in response.data['results']],
+                         ['reply to reply', 'other reply'])
+        response = self.setup_thread_request(response.data['next'], article_pk=self.article.pk)
+        self.assertEqual([comment['content'] for comment in response.data['results']], ['second'])
+        self.assertIsNone(response.data['next'])
+
+        response = self.setup_thread_request('/articles/2/thread/', article_pk=2)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_thread_uses_index(self):
+        """ Checks that threads are read from the (article, path) index, in index order. """
+        plan = Comment.objects.filter(article=self.article, path__gte='0', path__lt='1').order_by('path').explain()
+        self.assertIn('comment_thread_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+        plan = Comment.objects.filter(article=self.article).order_by('path', 'id').explain()
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_values_serializer_parity(self):
+        """ Check that comments read from `.values()` rows are represented exactly like model instances. """
+        Comment.objects.create(content='Ünïcode “comment”', article=self.article, username='test')
+        Comment.objects.create(content='another comment', article=self.article, username='')
+        self.assertSameRepresentation(CommentValuesSerializer, Comment.objects.order_by('id'))
+
     @staticmethod
     def setup_retrieve_request(user, comment):
         factory = APIRequestFactory()
@@ -141,6 +498,59 @@ class CommentTestCase(TestCase):
         self.assertEqual(response.data['content'], comment.content)
         self.assertEqual(response.data['article'], self.article.id)
 
+    def test_retrieve_invalid_pk(self):
+        """ Check that a comment id which is not a number is not found. """
+        self.assertEqual(self.client.get('/comments/abc/').status_code, status.HTTP_404_NOT_FOUND)
+
+    @staticmethod
+    def setup_conditional_request(action, headers, **kwargs):
+        factory = APIRequestFactory()
+        request = factory.get('/comments/', format='json', **headers)
+        view = CommentViewSet.as_view({'get': action})
+        return view(request=request, **kwargs)
+
+    def test_list_conditional(self):
+        """ Check that a list with a matching If-None-Match is answered with 304, and that adding or deleting a comment
+         changes the ETag. """
+        comment = Comment.objects.create(content=self.valid_data['content'], article=self.article)
+        etag = self.setup_list_request(self.normal_user)['ETag']
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.assertQueryBudget(2, self.setup_conditional_request, 'list', {'HTTP_IF_NONE_MATCH': etag})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        # the comments are not counted
+        self.assertFalse([query for query in queries if 'COUNT(' in query['sql']])
+
+        Comment.objects.create(content=self.valid_data['content'], article=self.article)
+        response = self.setup_conditional_request('list', {'HTTP_IF_NONE_MATCH': etag})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+
+        comment.delete()
+        response = self.setup_conditional_request('list', {'HTTP_IF_NONE_MATCH': etag})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # the comments of a deleted article go too, though another article's were modified last
+        other_article = Article.objects.create(title='other article', content='this is some content')
+        Comment.objects.create(content=self.valid_data['content'], article=other_article)
+        Comment.objects.create(content=self.valid_data['content'], article=self.article)
+        etag = self.setup_list_request(self.normal_user)['ETag']
+        other_article.delete()
+        response = self.setup_conditional_request('list', {'HTTP_IF_NONE_MATCH': etag})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_retrieve_conditional(self):
+        """ Check that a retrieve with a matching If-None-Match is answered with 304 until the comment is edited. """
+        comment = Comment.objects.create(content=self.valid_data['content'], article=self.article)
+        etag = self.setup_retrieve_request(self.normal_user, comment)['ETag']
+
+        response = self.setup_conditional_request('retrieve', {'HTTP_IF_NONE_MATCH': etag}, pk=comment.pk)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.setup_update_request(self.admin_user, comment, {'content': 'changed', 'article': self.article.id})
+        response = self.setup_conditional_request('retrieve', {'HTTP_IF_NONE_MATCH': etag}, pk=comment.pk)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
     @staticmethod
     def setup_update_request(user, comment, data):
         factory = APIRequestFactory()
@@ -211,3 +621,191 @@ class CommentTestCase(TestCase):
         response = self.setup_delete_request(self.normal_user, comment)
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
         self.assertEqual(Comment.objects.count(), 1)
+
+    def test_comment_count(self):
+        """ Check that the comment count of articles follows comments being created, moved and deleted. """
+        other_article = Article.objects.create(title='other article', content='this is some content')
+        self.setup_create_request(self.normal_user, self.valid_data)
+        self.setup_create_request(self.normal_user, self.valid_data)
+        self.assertEqual(Article.objects.get(pk=self.article.pk).comment_count, 2)
+
+        comment = Comment.objects.first()
+        self.setup_update_request(self.admin_user, comment, {'content': 'moved', 'article': other_article.id})
+        self.assertEqual(Article.objects.get(pk=self.article.pk).comment_count, 1)
+        self.assertEqual(Article.objects.get(pk=other_article.pk).comment_count, 1)
+
+        self.setup_delete_request(self.admin_user, Comment.objects.get(article=self.article))
+        self.assertEqual(Article.objects.get(pk=self.article.pk).comment_count, 0)
+
+    def test_comment_count_on_deletes(self):
+        """ Check that deleting comments in bulk, or with their article, updates the counts once per change rather
+         than once per comment, and not at all on the articles deleted. """
+        other_article = Article.objects.create(title='other article', content='this is some content')
+        bulk_insert_comments([Comment(article=article, username='test', content='a comment')
+                              for article in [self.article] * 6 + [other_article] * 3])
+        root = Comment.objects.filter(article=self.article).first()
+        Comment.objects.create(article=self.article, username='test', content='reply', parent=root)
+
+        def article_updates(queries):
+            return [query for query in queries.captured_queries if query['sql'].startswith('UPDATE "articles_article"')]
+
+        with CaptureQueriesContext(connection) as queries:
+            root.delete()
+        self.assertEqual(len(article_updates(queries)), 1)
+        self.assertEqual(Article.objects.get(pk=self.article.pk).comment_count, 5)
+
+        with CaptureQueriesContext(connection) as queries:
+            Comment.objects.filter(pk__in=list(Comment.objects.values_list('pk', flat=True)[:3])).delete()
+        self.assertEqual(len(article_updates(queries)), 1)
+        self.assertEqual(Article.objects.get(pk=self.article.pk).comment_count, 2)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.article.delete()
+        self.assertEqual(article_updates(queries), [])
+        self.assertEqual(Article.objects.get(pk=other_article.pk).comment_count, 3)
+
+    def test_comment_count_in_cached_article(self):
+        """ Check that a new comment is reflected in the article's cached representation and validators. """
+        cache.clear()
+        factory = APIRequestFactory()
+        view = ArticleViewSet.as_view({'get': 'retrieve'})
+        response = view(request=factory.get('/articles/1/', format='json'), pk=self.article.pk)
+        self.assertEqual(response.data['comment_count'], 0)
+
+        self.setup_create_request(self.normal_user, self.valid_data)
+        request = factory.get('/articles/1/', format='json', HTTP_IF_NONE_MATCH=response['ETag'])
+        response = view(request=request, pk=self.article.pk)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['comment_count'], 1)
+
+    def test_admin(self):
+        """ Check that the admin lists comments with a fixed number of queries, and picks their article with an
+         autocomplete rather than a list of every article. """
+        self.client.force_login(self.admin_user)
+
+        def add_comments(count):
+            Comment.objects.bulk_create([Comment(article=self.article, content='comment %d' % i) for i in range(count)])
+
+        self.assertQueriesDoNotScale(lambda: self.client.get('/admin/comments/comment/'), add_comments)
+        response = self.client.get('/admin/comments/comment/')
+        self.assertContains(response, self.article.title)
+
+        response = self.client.get('/admin/comments/comment/add/')
+        self.assertContains(response, 'admin-autocomplete')
+        self.assertContains(response, 'vForeignKeyRawIdAdminField')
+        self.assertNotContains(response, '<select name="parent"')
+        response = self.client.get('/admin/articles/article/autocomplete/', {'term': 'test'})
+        self.assertEqual([result['text'] for result in response.json()['results']], [self.article.title])
+
+    def test_admin_thread(self):
+        """ Check that the admin cannot move a comment in its thread, nor add a reply on another article. """
+        self.client.force_login(self.admin_user)
+        other_article = Article.objects.create(title='other article', content='this is some content')
+        root = Comment.objects.create(article=self.article, username='test', content='a comment')
+        reply = Comment.objects.create(article=self.article, username='test', content='a reply', parent=root)
+        alone = Comment.objects.create(article=self.article, username='test', content='alone')
+
+        for comment in (root, reply, alone):
+            url = '/admin/comments/comment/%d/change/' % comment.pk
+            self.client.post(url, {'article': other_article.pk, 'parent': alone.pk if comment != alone else root.pk,
+                                   'username': 'test', 'content': 'changed'})
+        self.assertEqual({row[0]: row[1:] for row in Comment.objects.values_list('id', 'article', 'parent', 'content')}, {
+            root.pk: (self.article.pk, None, 'changed'), reply.pk: (self.article.pk, root.pk, 'changed'),
+            alone.pk: (other_article.pk, None, 'changed')
+        })
+        self.assertEqual(Comment.objects.get(pk=reply.pk).path, reply.path)
+
+        response = self.client.post('/admin/comments/comment/add/', {
+            'article': other_article.pk, 'parent': root.pk, 'username': 'test', 'content': 'a reply'
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'The comment replied to is on another article.')
+
+    def test_recount_comments(self):
+        """ Check that the recount command fixes drifted comment counts. """
+        Comment.objects.create(content=self.valid_data['content'], article=self.article)
+        Article.objects.update(comment_count=5)
+
+        call_command('recount_comments', stdout=StringIO())
+        self.assertEqual(Article.objects.get(pk=self.article.pk).comment_count, 1)
+
+
+# the worker inserts from its own thread and connection, which must see the rows committed by the test
+class CommentWriteQueueTestCase(TransactionTestCase):
+    def setUp(self):
+        self.article = Article.objects.create(title='test article', content='this is some content')
+
+    def make_comments(self, count, article_id=None):
+        return [Comment(article_id=article_id or self.article.pk, username='test', content='comment %d' % i)
+                for i in range(count)]
+
+    def test_batches(self):
+        """ Checks that the worker inserts full batches at once, and partial ones after the interval. """
+        comment_queue = CommentWriteQueue(batch_size=3, interval=0.05, synchronous=False)
+        with mock.patch('comments.writebehind.bulk_insert_comments', wraps=bulk_insert_comments) as insert:
+            for comment in self.make_comments(4):
+                self.assertTrue(comment_queue.put(comment))
+            self.assertTrue(comment_queue.flush(timeout=5))
+            comment_queue.close()
+
+        self.assertEqual([len(call[0][0]) for call in insert.call_args_list], [3, 1])
+        self.assertEqual(Article.objects.get(pk=self.article.pk).comment_count, 4)
+        self.assertFalse(comment_queue.put(self.make_comments(1)[0]))
+
+    def test_close_flushes(self):
+        """ Checks that closing the queue inserts the comments still waiting, and that a comment which cannot be
+         inserted does not lose the rest of its batch. """
+        comment_queue = CommentWriteQueue(batch_size=100, interval=60, synchronous=False)
+        comments = self.make_comments(2) + self.make_comments(1, article_id=self.article.pk + 1) + self.make_comments(2)
+        for comment in comments:
+            comment_queue.put(comment)
+        with self.assertLogs('comments.writebehind', 'ERROR'):
+            comment_queue.close()
+
+        self.assertEqual(Comment.objects.count(), 4)
+        self.assertEqual(Article.objects.get(pk=self.article.pk).comment_count, 4)
+
+    def test_worker_survives_errors(self):
+        """ Checks that an error other than a database one, while inserting a batch, neither stops the worker nor
+         loses the batch. """
+        comment_queue = CommentWriteQueue(batch_size=2, interval=0.05, synchronous=False)
+        calls = []
+
+        def insert(comments):
+            calls.append(len(comments))
+            if len(calls) == 1:
+                raise RuntimeError('insert failed')
+            return bulk_insert_comments(comments)
+
+        with mock.patch('comments.writebehind.bulk_insert_comments', side_effect=insert):
+            with self.assertLogs('comments.writebehind', 'ERROR'):
+                for comment in self.make_comments(2):
+                    comment_queue.put(comment)
+                self.assertTrue(comment_queue.flush(timeout=5))
+            self.assertTrue(comment_queue.worker.is_alive())
+
+            comment_queue.put(self.make_comments(1)[0])
+            self.assertTrue(comment_queue.flush(timeout=5))
+            comment_queue.close()
+
+        self.assertEqual(calls, [2, 1, 1, 1])
+        self.assertEqual(Article.objects.get(pk=self.article.pk).comment_count, 3)
+
+
+@override_settings(REPLICA_DATABASES=['replica_1'])
+class RecountCommentsReplicaTestCase(ReplicaTestMixin, TransactionTestCase):
+    replicas = ('replica_1',)
+    databases = {'default', 'replica_1'}
+
+    def test_recount_with_lagging_replica(self):
+        """ Check that the recount command reads the comments and counts from the primary, and not from a replica
+         which has not seen the latest comments and drift yet. """
+        article = Article.objects.create(title='test article', content='this is some content')
+        Comment.objects.create(content='a comment', article=article)
+        self.copy_to_replicas()
+        Comment.objects.create(content='another comment', article=article)
+        Article.objects.update(comment_count=5)
+
+        call_command('recount_comments', stdout=StringIO())
+        self.assertEqual(Article.objects.get(pk=article.pk).comment_count, 2)
+        self.assertEqual(Article.objects.using('replica_1').get(pk=article.pk).comment_count, 1)
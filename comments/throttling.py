@@ -0,0 +1,98 @@
+import hashlib
+
+from django.core.cache import caches
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """ Token bucket throttle, taking its rate from the DEFAULT_THROTTLE_RATES of REST_FRAMEWORK under its scope.
+
+    A rate of 'N/period' is a bucket of N tokens, refilled at N per period, and each request takes a token, or those
+    of get_cost, so a client may send a burst of N requests and then one every period / N. Unlike the sliding window of DRF's
+    throttles, which keeps the time of every request in the window, the cache only holds the tokens left and when
+    they were counted, so a check costs a cache read and write whatever the rate. The read and write are not atomic,
+    concurrent requests of a client may each take the same token, which is close enough to throttle a flood. """
+    cache_format = 'throttle:%(scope)s:%(ident)s'
+
+    def __init__(self):
+        super().__init__()
+        # the default_cache proxy looks the cache of the thread up again at every call, here it is looked up once
+        self.cache = caches['default']
+
+    def get_rate(self):
+        # read at every request rather than when the module is imported, like DRF does, so the rates can change
+        self.THROTTLE_RATES = api_settings.DEFAULT_THROTTLE_RATES
+        return super().get_rate()
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        now = self.timer()
+        refill_rate = self.num_requests / self.duration
+        tokens, counted = self.cache.get(self.key, (self.num_requests, now))
+        tokens = min(self.num_requests, tokens + (now - counted) * refill_rate)
+        cost = self.get_cost(request)
+        if tokens < cost:
+            # a request costing more than the bucket holds is never allowed, there is no time to wait for
+            self.wait_seconds = (cost - tokens) / refill_rate if cost <= self.num_requests else None
+            return False
+        # the bucket is full again after `duration`, it can be forgotten by then
+        self.cache.set(self.key, (tokens - cost, now), self.duration)
+        return True
+
+    def get_cost(self, request):
+        """ @:return the number of tokens the request takes. """
+        return 1
+
+    def wait(self):
+        return self.wait_seconds
+
+    def get_ident_key(self, ident):
+        """ Hashes an identifier into a key fit for any cache backend, whatever characters it is made of, and short,
+         as the cache checks every character of a key. """
+        ident = hashlib.blake2b(ident.encode('utf-8'), digest_size=8).hexdigest()
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+
+class CommentRateThrottle(TokenBucketThrottle):
+    """ Throttles creating comments, a token per comment, so a bulk request takes a token for each of its items and
+     is refused whole if they are more than the tokens left. Staff are never throttled. """
+
+    def get_cache_key(self, request, view):
+        if request.user.is_staff:
+            return None
+        ident = self.get_comment_ident(request)
+        return None if ident is None else self.get_ident_key(ident)
+
+    def get_cost(self, request):
+        return max(len(request.data), 1) if isinstance(request.data, list) else 1
+
+    def get_comment_ident(self, request):
+        raise NotImplementedError('.get_comment_ident() must be overridden')
+
+
+class CommentIPThrottle(CommentRateThrottle):
+    """ Throttles creating comments per client address, honouring NUM_PROXIES for X-Forwarded-For. """
+    scope = 'comment_ip'
+
+    def get_comment_ident(self, request):
+        return self.get_ident(request)
+
+
+class CommentUsernameThrottle(CommentRateThrottle):
+    """ Throttles creating comments per username, that of the user or the one supplied, so rotating addresses does
+    not help flooding under one name. Requests without a username are left to the validation of the view, and bulk
+    requests, which may mix usernames, to CommentIPThrottle. """
+    scope = 'comment_username'
+
+    def get_comment_ident(self, request):
+        if request.user.is_authenticated:
+            return request.user.get_username()
+        if isinstance(request.data, dict) and 'username' in request.data:
+            return str(request.data['username'])
+        return None
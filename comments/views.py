@@ -1,16 +1,32 @@
+from django.conf import settings
+from django.db.models import Max
 from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.permissions import IsAdminUser, AllowAny
 from rest_framework.response import Response
 
-from comments.models import Comment
-from comments.serializers import CommentSerializer
+from articles.models import Article
+from blog_rest.conditional import ConditionalGetMixin
+from blog_rest.export import NDJSONRenderer, export_response
+from blog_rest.routers import ReplicaReadMixin
+from comments.bulk import bulk_insert_comments
+from comments.models import Comment, get_subtree_range
+from comments.serializers import CommentSerializer, CommentThreadSerializer, CommentValuesSerializer
+from comments.throttling import CommentIPThrottle, CommentUsernameThrottle
+from comments.writebehind import comment_queue
+from sync.models import Change
 
-SAFE_METHODS = ('list', 'retrieve', 'create')
+SAFE_METHODS = ('list', 'retrieve', 'create', 'bulk', 'thread', 'article_thread')
+READ_ACTIONS = ('list', 'retrieve')
+CREATE_ACTIONS = ('create', 'bulk')
 
 
-class CommentViewSet(viewsets.ModelViewSet):
-    queryset = Comment.objects.order_by('article_id')
+class CommentViewSet(ReplicaReadMixin, ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = Comment.objects.order_by('article_id', 'id')
     serializer_class = CommentSerializer
+    # the validators look the comment up before get_object, anything but a number must not reach them
+    lookup_value_regex = r'\d+'
 
     def get_permissions(self):
         if self.action in SAFE_METHODS:
@@ -19,6 +35,66 @@ class CommentViewSet(viewsets.ModelViewSet):
             permission_classes = [IsAdminUser]
         return [permission() for permission in permission_classes]
 
+    def get_throttles(self):
+        # anyone may create comments, so creating them is throttled, everything else is cheap or for admins only
+        if self.action in CREATE_ACTIONS:
+            return [CommentIPThrottle(), CommentUsernameThrottle()]
+        return []
+
+    def is_read(self):
+        return self.action in READ_ACTIONS and self.request.method in ('GET', 'HEAD')
+
+    def get_serializer(self, *args, **kwargs):
+        if self.is_read():
+            kwargs['context'] = self.get_serializer_context()
+            return CommentValuesSerializer(*args, **kwargs)
+        return super().get_serializer(*args, **kwargs)
+
+    def get_article_id(self):
+        """ Returns the id of the article the list is scoped to, from the /articles/<id>/comments/ route or the
+         `article` query parameter, or None for the list of all comments. """
+        if 'article_pk' in self.kwargs:
+            return self.kwargs['article_pk']
+        if self.action == 'list' and 'article' in self.request.query_params:
+            try:
+                return int(self.request.query_params['article'])
+            except ValueError:
+                raise ValidationError({'article': ['A valid integer is required.']})
+        return None
+
+    def get_queryset(self):
+        """ Reads return `.values()` rows, which hold every column the cursor may be on. """
+        queryset = super().get_queryset()
+        article_id = self.get_article_id()
+        if article_id is not None:
+            # one article's comments are read in order from the (article_id, created_date) index
+            queryset = queryset.filter(article_id=article_id).order_by('created_date', 'id')
+        if self.is_read():
+            queryset = queryset.values(*CommentValuesSerializer.get_columns())
+        return queryset
+
+    def get_list_validators(self):
+        article_id = self.get_article_id()
+        if article_id is not None:
+            last_modified = Article.objects.filter(pk=article_id).values_list('comments_modified_date', flat=True)
+            last_modified = last_modified.first()
+            if last_modified is None:
+                if 'article_pk' in self.kwargs:
+                    raise NotFound()
+                return None
+            return [], last_modified
+
+        last_modified = Article.objects.aggregate(last_modified=Max('comments_modified_date'))['last_modified']
+        # deleting an article deletes its comments but may leave the MAX as it was, while every change, deletes and
+        # cascades included, moves the change token of the sync log forward, see sync.changes
+        token = Change.objects.aggregate(token=Max('id'))['token']
+        return [token or 0], last_modified
+
+    def get_detail_validators(self):
+        last_modified = Comment.objects.filter(pk=self.kwargs['pk'])
+        last_modified = last_modified.values_list('article__comments_modified_date', flat=True).first()
+        return ([], last_modified) if last_modified is not None else None
+
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
 
@@ -32,6 +108,83 @@ class CommentViewSet(viewsets.ModelViewSet):
             else:
                 return Response(serializer.data, status=status.HTTP_400_BAD_REQUEST)
 
+        if settings.COMMENTS_WRITE_BEHIND and comment_queue.put(Comment(**serializer.validated_data)):
+            # the comment has no id yet, the response holds what was accepted
+            return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
         self.perform_create(serializer)
         headers = self.get_success_headers(serializer.data)
         return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+
+    @action(detail=True)
+    def thread(self, request, *args, **kwargs):
+        """ Returns the comment with its replies, and theirs, nested in `replies`, read in one range scan of the
+         thread index. """
+        comment = Comment.objects.filter(pk=kwargs['pk']).values_list('article_id', 'path').first()
+        if comment is None:
+            raise NotFound()
+        article_id, path = comment
+        low, high = get_subtree_range(path)
+        rows = Comment.objects.filter(article_id=article_id, path__gte=low, path__lt=high).order_by('path')
+        rows = rows.values('path', *CommentValuesSerializer.get_columns())
+        return Response(CommentThreadSerializer(rows, many=True).data[0])
+
+    def article_thread(self, request, *args, **kwargs):
+        """ Pages through the comments of an article depth first, nesting replies in the comments they reply to.
+         Each page is one range scan of the thread index. Replies to a comment on an earlier page are listed at the
+         top of theirs. """
+        article_id = self.kwargs['article_pk']
+        queryset = Comment.objects.filter(article_id=article_id).order_by('path', 'id')
+        page = self.paginate_queryset(queryset.values('path', *CommentValuesSerializer.get_columns()))
+        if not page and not Article.objects.filter(pk=article_id).exists():
+            raise NotFound()
+        return self.get_paginated_response(CommentThreadSerializer(page, many=True).data)
+
+    @action(detail=False, renderer_classes=[NDJSONRenderer])
+    def export(self, request, *args, **kwargs):
+        """ Streams every comment, or those changed since the `updated_since` query parameter, as newline delimited
+         JSON. """
+        return export_response(request, 'comments')
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request, *args, **kwargs):
+        """ Creates a JSON array of comments at once, all of them or, if any is invalid, none. Usernames follow the
+         same rules as create, and errors are reported per item, in the order of the array. """
+        if isinstance(request.data, list) and len(request.data) > settings.COMMENTS_BULK_MAX_ITEMS:
+            message = 'Ensure there are no more than %d comments.' % settings.COMMENTS_BULK_MAX_ITEMS
+            raise ValidationError({'non_field_errors': [message]})
+
+        context = self.get_serializer_context()
+        context['articles'] = Article.objects.in_bulk(self.get_bulk_ids(request.data, 'article'))
+        context['parents'] = Comment.objects.in_bulk(self.get_bulk_ids(request.data, 'parent'))
+        serializer = CommentSerializer(data=request.data, many=True, context=context)
+        serializer.is_valid()
+        if not isinstance(serializer.errors, list):
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        errors = serializer.errors or [{} for item in request.data]
+        for item, item_errors in zip(request.data, errors):
+            if isinstance(item, dict) and not request.user.is_authenticated and 'username' not in item:
+                item_errors.setdefault('username', []).append('This field is required.')
+        if any(errors):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        comments = []
+        for item in serializer.validated_data:
+            if request.user.is_authenticated:
+                item['username'] = request.user.username
+            comments.append(Comment(**item))
+        created = bulk_insert_comments(comments)
+        return Response({'created': created}, status=status.HTTP_201_CREATED)
+
+    @staticmethod
+    def get_bulk_ids(data, field):
+        """ @:return the primary keys of the objects a batch of comments references in a field, to fetch them all in
+         one query. """
+        ids = set()
+        for item in data if isinstance(data, list) else []:
+            try:
+                ids.add(int(item.get(field)))
+            except (AttributeError, TypeError, ValueError):
+                pass
+        return ids
@@ -0,0 +1,159 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+
+from comments.bulk import bulk_insert_comments
+
+logger = logging.getLogger(__name__)
+
+
+class CommentWriteQueue:
+    """ Write-behind queue of validated comments, inserted by a background thread in batches, so that a burst of
+    comments costs a few write transactions rather than one each, and writers hold the database for less time.
+
+    The worker inserts the comments queued with bulk_insert_comments once `batch_size` of them are waiting or the
+    oldest has waited `interval` seconds. It is started on the first comment queued and stopped by `close`, called at
+    exit, which inserts whatever is left. Comments are kept in memory until then, those of a process that is killed
+    are lost.
+
+    In synchronous mode, meant for tests, comments are inserted as they are queued, in the caller's thread. """
+
+    def __init__(self, batch_size=None, interval=None, max_size=None, synchronous=None):
+        # the settings are read when used, unless given here
+        self._batch_size = batch_size
+        self._interval = interval
+        self._synchronous = synchronous
+        self.queue = queue.Queue(max_size or settings.COMMENTS_WRITE_BEHIND_MAX_SIZE)
+        self.lock = threading.Lock()
+        # the number of comments queued and not yet inserted, notified when it goes down
+        self.pending = 0
+        self.inserted = threading.Condition(self.lock)
+        self.worker = None
+        self.closed = False
+
+    @property
+    def batch_size(self):
+        return self._batch_size or settings.COMMENTS_WRITE_BEHIND_BATCH_SIZE
+
+    @property
+    def interval(self):
+        return self._interval if self._interval is not None else settings.COMMENTS_WRITE_BEHIND_INTERVAL
+
+    @property
+    def synchronous(self):
+        return self._synchronous if self._synchronous is not None else settings.COMMENTS_WRITE_BEHIND_SYNCHRONOUS
+
+    def put(self, comment):
+        """ Queues an unsaved comment to be inserted.
+         @:return whether it was queued, False if the queue is full or closed, for the caller to insert it itself. """
+        if self.synchronous:
+            self.insert([comment])
+            return True
+        self.start()
+        with self.lock:
+            if self.closed:
+                return False
+            try:
+                self.queue.put_nowait(comment)
+            except queue.Full:
+                return False
+            self.pending += 1
+        return True
+
+    def start(self):
+        if self.worker is not None:
+            return
+        with self.lock:
+            if self.worker is None and not self.closed:
+                self.worker = threading.Thread(target=self.run, name='comment-write-behind', daemon=True)
+                self.worker.start()
+
+    def run(self):
+        try:
+            while True:
+                batch = self.next_batch()
+                if batch is None:
+                    break
+                close_old_connections()
+                try:
+                    self.insert(batch)
+                finally:
+                    with self.lock:
+                        self.pending -= len(batch)
+                        self.inserted.notify_all()
+        finally:
+            connections.close_all()
+
+    def next_batch(self):
+        """ Waits for the next batch of comments to insert.
+         @:return the batch, or None once the queue is closed. """
+        comment = self.queue.get()
+        if comment is None:
+            return None
+        batch = [comment]
+        deadline = time.monotonic() + self.interval
+        while len(batch) < self.batch_size:
+            try:
+                comment = self.queue.get(timeout=max(0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if comment is None:
+                # insert what was gathered, then stop
+                self.queue.put(None)
+                break
+            batch.append(comment)
+        return batch
+
+    def insert(self, comments):
+        """ Inserts a batch of comments, one at a time if the batch fails, so one bad comment, e.g. on an article
+         deleted since it was validated, does not lose the others. Any error is logged rather than raised, as it would
+         stop the worker, and every comment queued after it would be lost. """
+        try:
+            bulk_insert_comments(comments)
+            return
+        except Exception:
+            if len(comments) == 1:
+                logger.exception('Dropped a queued comment on article %s.', comments[0].article_id)
+                return
+            logger.exception('Inserting a batch of %d queued comments failed, inserting them one at a time.',
+                             len(comments))
+        for comment in comments:
+            self.insert([comment])
+
+    def flush(self, timeout=None):
+        """ Waits until every comment queued so far is inserted.
+         @:return whether they were before the timeout. """
+        with self.lock:
+            return self.inserted.wait_for(lambda: self.pending == 0, timeout)
+
+    def close(self, timeout=10):
+        """ Stops the worker once it inserted the comments queued, inserting them here if it did not in time. """
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+        if self.worker is not None:
+            self.queue.put(None)
+            self.worker.join(timeout)
+        left = []
+        while True:
+            try:
+                comment = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if comment is not None:
+                left.append(comment)
+        if left:
+            self.insert(left)
+            with self.lock:
+                self.pending -= len(left)
+                self.inserted.notify_all()
+
+
+comment_queue = CommentWriteQueue()
+atexit.register(comment_queue.close)
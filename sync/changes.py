@@ -0,0 +1,54 @@
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from sync.models import Change
+
+CHANGE_TABLE = Change._meta.db_table
+
+# the kind of change recorded for the rows of each table
+TABLES = (
+    ('article', 'articles_article'),
+    ('comment', 'comments_comment'),
+)
+
+# Every insert, update and delete of a row logs a change, whether it is made by a model, by bulk_create, by update()
+# or by a cascade. REPLACE drops the previous change of the row, so the log holds one change per row, and gives the
+# new one the next id, which AUTOINCREMENT never hands out twice. Like the search index triggers, they are
+# (re)created after every migrate, as SQLite rebuilds a table to apply most schema changes, dropping its triggers.
+TRIGGER = """
+    CREATE TRIGGER IF NOT EXISTS %(table)s_change_%(event)s AFTER %(event)s ON %(table)s BEGIN
+        INSERT OR REPLACE INTO %(change_table)s (kind, object_id, deleted) VALUES ('%(kind)s', %(row)s.id, %(deleted)d);
+    END
+"""
+
+
+def get_triggers():
+    for kind, table in TABLES:
+        for event, row, deleted in (('insert', 'new', 0), ('update', 'new', 0), ('delete', 'old', 1)):
+            yield TRIGGER % {'table': table, 'event': event, 'change_table': CHANGE_TABLE, 'kind': kind,
+                             'row': row, 'deleted': deleted}
+
+
+def create_triggers(using=DEFAULT_DB_ALIAS):
+    """ Creates the triggers logging the changes of the articles and comments tables. """
+    with connections[using].cursor() as cursor:
+        for trigger in get_triggers():
+            cursor.execute(trigger)
+
+
+def changes_since(token, limit, using=DEFAULT_DB_ALIAS):
+    """ Reads the log for the changes made after a change token, oldest first.
+     @:param token the id of the last change already seen, 0 for every change
+     @:param using the alias of the database to read the log from
+     @:return a `(changed, deleted, token, more)` tuple: dicts mapping each kind to the ids of the objects changed
+     and deleted, the token of the last change read, and whether there are more than `limit` changes to read. """
+    rows = list(Change.objects.using(using).filter(id__gt=token).order_by('id').values_list(
+        'id', 'kind', 'object_id', 'deleted'
+    )[:limit + 1])
+    more = len(rows) > limit
+    rows = rows[:limit]
+
+    changed = {kind: [] for kind, table in TABLES}
+    deleted = {kind: [] for kind, table in TABLES}
+    for change_id, kind, object_id, is_deleted in rows:
+        (deleted if is_deleted else changed)[kind].append(object_id)
+    return changed, deleted, rows[-1][0] if rows else token, more
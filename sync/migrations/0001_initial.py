@@ -0,0 +1,46 @@
+from django.db import migrations, models
+
+
+def log_existing(apps, schema_editor):
+    # every row is a change to a client that never synced, the triggers log the later ones, see sync.changes
+    change_table = apps.get_model('sync', 'Change')._meta.db_table
+    for kind, model in (('article', 'articles.Article'), ('comment', 'comments.Comment')):
+        schema_editor.execute(
+            "INSERT INTO %s (kind, object_id, deleted) SELECT '%s', id, %%s FROM %s ORDER BY id"
+            % (change_table, kind, apps.get_model(model)._meta.db_table), [False]
+        )
+
+
+def drop_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for table in ('articles_article', 'comments_comment'):
+        for event in ('insert', 'update', 'delete'):
+            schema_editor.execute('DROP TRIGGER IF EXISTS %s_change_%s' % (table, event))
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('articles', '0006_article_content_html'),
+        ('comments', '0008_comment_created_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Change',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=20)),
+                ('object_id', models.IntegerField()),
+                ('deleted', models.BooleanField(default=False)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='change',
+            constraint=models.UniqueConstraint(fields=('kind', 'object_id'), name='change_object_unique'),
+        ),
+        migrations.RunPython(log_existing, drop_triggers),
+    ]
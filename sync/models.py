@@ -0,0 +1,18 @@
+from django.db import models
+
+
+class Change(models.Model):
+    """ The last change of an article or a comment, see sync.changes. The id is the change token: it only grows, so
+    the rows with an id above a token are the changes made after it. """
+    kind = models.CharField(max_length=20)
+    object_id = models.IntegerField()
+    # a tombstone, the object was deleted
+    deleted = models.BooleanField(default=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='change_object_unique'),
+        ]
+
+    def __str__(self):
+        return '%s %s %s' % ('deleted' if self.deleted else 'changed', self.kind, self.object_id)
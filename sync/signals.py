@@ -0,0 +1,11 @@
+from django.db import connections
+from django.db.models.signals import post_migrate
+from django.dispatch import receiver
+
+from sync import changes
+
+
+@receiver(post_migrate)
+def create_change_triggers(sender, using, **kwargs):
+    if sender.name == 'sync' and connections[using].vendor == 'sqlite':
+        changes.create_triggers(using)
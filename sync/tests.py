@@ -0,0 +1,98 @@
+import itertools
+from unittest import mock
+
+from django.test import TestCase, TransactionTestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APIRequestFactory
+
+from articles.models import Article
+from blog_rest.testing import ReplicaTestMixin
+from comments.bulk import bulk_insert_comments
+from comments.models import Comment
+from sync.views import SyncView
+
+
+class SyncTestCase(TestCase):
+    def setUp(self):
+        self.article = Article.objects.create(title='test article', content='this is some content')
+        self.comment = Comment.objects.create(article=self.article, username='reader', content='a comment')
+
+    @staticmethod
+    def setup_sync_request(since=None):
+        factory = APIRequestFactory()
+        request = factory.get('/sync/', {} if since is None else {'since': since}, format='json')
+        view = SyncView.as_view()
+        return view(request=request)
+
+    def test_sync(self):
+        """ Check that a first sync lists everything, and later ones only the objects created, modified or deleted
+         since, whatever wrote them. """
+        response = self.setup_sync_request()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([article['title'] for article in response.data['articles']], ['test article'])
+        self.assertEqual(response.data['articles'][0]['comment_count'], 1)
+        self.assertEqual([comment['content'] for comment in response.data['comments']], ['a comment'])
+        self.assertEqual(response.data['deleted'], {'articles': [], 'comments': []})
+        self.assertFalse(response.data['more'])
+        token = response.data['token']
+
+        response = self.setup_sync_request(token)
+        self.assertEqual((response.data['articles'], response.data['comments'], response.data['token']),
+                         ([], [], token))
+
+        other_article = Article.objects.create(title='other article', content='some content')
+        other_comment = Comment.objects.create(article=other_article, username='reader', content='other comment')
+        Comment.objects.filter(pk=self.comment.pk).update(content='edited')
+        bulk_insert_comments([Comment(article=self.article, username='reader', content='bulk comment')])
+        other_article_pk = other_article.pk
+        other_article.delete()
+
+        response = self.setup_sync_request(token)
+        self.assertEqual([article['id'] for article in response.data['articles']], [self.article.pk])
+        self.assertEqual(response.data['articles'][0]['comment_count'], 2)
+        self.assertEqual([comment['content'] for comment in response.data['comments']], ['edited', 'bulk comment'])
+        self.assertEqual(response.data['deleted'], {'articles': [other_article_pk], 'comments': [other_comment.pk]})
+        self.assertGreater(response.data['token'], token)
+
+    @override_settings(SYNC_PAGE_SIZE=2)
+    def test_sync_pages(self):
+        """ Check that changes are listed a page at a time, each object once, in the order of their last change. """
+        for i in range(3):
+            Comment.objects.create(article=self.article, username='reader', content='comment %d' % i)
+        self.comment.save()
+
+        listed, token, more = [], None, True
+        while more:
+            response = self.setup_sync_request(token)
+            self.assertLessEqual(len(response.data['articles']) + len(response.data['comments']), 2)
+            listed += [comment['content'] for comment in response.data['comments']]
+            token, more = response.data['token'], response.data['more']
+        self.assertEqual(listed, ['comment 0', 'comment 1', 'comment 2', 'a comment'])
+
+    def test_sync_invalid_token(self):
+        """ Check that a token that is not one is rejected. """
+        for since in ('yesterday', '-1'):
+            self.assertEqual(self.setup_sync_request(since).status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(REPLICA_DATABASES=['replica_1', 'replica_2'])
+class SyncReplicaTestCase(ReplicaTestMixin, TransactionTestCase):
+    replicas = ('replica_1', 'replica_2')
+    databases = {'default', 'replica_1', 'replica_2'}
+
+    def test_sync_with_lagging_replica(self):
+        """ Check that the log and the objects of a sync are read from the same replica, so that a replica lagging
+         behind another never moves the token past a change whose object it did not list. """
+        article = Article.objects.create(title='test article', content='this is some content')
+        self.copy_to_replicas()
+        token = SyncTestCase.setup_sync_request().data['token']
+        comment = Comment.objects.create(article=article, username='reader', content='a comment')
+        self.copy_to_replicas('replica_1')
+
+        aliases = itertools.cycle(['replica_1', 'replica_2'])
+        with mock.patch('blog_rest.routers.random.choice', side_effect=lambda choices: next(aliases)):
+            up_to_date = SyncTestCase.setup_sync_request(token)
+            lagging = SyncTestCase.setup_sync_request(token)
+        self.assertEqual([comment['id'] for comment in up_to_date.data['comments']], [comment.pk])
+        self.assertGreater(up_to_date.data['token'], token)
+        self.assertEqual((lagging.data['comments'], lagging.data['token']), ([], token))
@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.db import router, transaction
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from articles.models import Article
+from articles.serializers import ArticleValuesSerializer
+from blog_rest.routers import use_replicas
+from comments.models import Comment
+from comments.serializers import CommentValuesSerializer
+from sync.changes import changes_since
+from sync.models import Change
+
+# the model and serializer of the objects of each kind of change, and the key they are listed under
+SERIALIZERS = (
+    ('article', 'articles', Article, ArticleValuesSerializer),
+    ('comment', 'comments', Comment, CommentValuesSerializer),
+)
+
+
+class SyncView(APIView):
+    """ Lists the articles and comments created, modified or deleted since the change token in the `since` query
+    parameter, for clients to keep a copy up to date without downloading it all again. Without a token, every
+    article and comment is listed.
+
+    Objects are listed once however often they changed, those deleted by id only. The `token` of the response is
+    passed as `since` to the next request, straight away while `more` is true, as a page lists at most
+    SYNC_PAGE_SIZE changes.
+
+    The log and the objects are read from a single database, a replica if there are any, within one transaction: read
+    from different replicas, or from one between two of its updates, an object could be left out of the page which
+    moves the token past its change. """
+    permission_classes = [AllowAny]
+
+    def get(self, request, *args, **kwargs):
+        try:
+            token = int(request.query_params.get('since', 0))
+            if token < 0:
+                raise ValueError
+        except ValueError:
+            raise ValidationError({'since': ['Expected the token of an earlier sync.']})
+
+        with use_replicas():
+            using = router.db_for_read(Change)
+        with transaction.atomic(using=using):
+            changed, deleted, token, more = changes_since(token, settings.SYNC_PAGE_SIZE, using=using)
+            data = {'token': token, 'more': more}
+            for kind, key, model, serializer_class in SERIALIZERS:
+                ids = changed[kind]
+                rows = model.objects.using(using).filter(id__in=ids) if ids else model.objects.none()
+                rows = rows.values(*serializer_class.get_columns())
+                rows = {row['id']: row for row in rows}
+                data[key] = serializer_class([rows[pk] for pk in ids if pk in rows], many=True).data
+        data['deleted'] = {key: deleted[kind] for kind, key, model, serializer_class in SERIALIZERS}
+        return Response(data)